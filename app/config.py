@@ -0,0 +1,92 @@
+from pydantic import BaseModel
+import os
+
+
+class Settings(BaseModel):
+    """
+    Runtime settings, each one overridable by the environment variable with
+    the upper-cased field name (e.g. BULK_MAX_ITEMS=5000).
+    """
+    # MongoDB connection, one client (and pool) per worker process
+    mongodb_url: str = "mongodb://localhost:27017"
+    mongodb_database: str = "bookstore"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    # 0 leaves idle connections open / waits for a free connection forever
+    mongodb_max_idle_seconds: float = 0
+    mongodb_wait_queue_timeout_seconds: float = 0
+    mongodb_server_selection_timeout_seconds: float = 5
+    mongodb_socket_timeout_seconds: float = 10
+    # Wire compression, e.g. "zstd,snappy,zlib" in order of preference, empty for none
+    mongodb_compressors: str = ""
+    mongodb_zlib_compression_level: int = -1
+    # Empty keeps the server defaults, e.g. "majority" for both
+    mongodb_read_concern: str = ""
+    mongodb_write_concern: str = ""
+
+    # Drop the database and load the sample data at startup. Local demos only: it wipes
+    # everything and concurrent workers race each other, prefer `python -m app.manage seed`
+    seed_on_startup: bool = False
+    # Connecting and ensuring indexes at startup is attempted this many times, waiting
+    # startup_retry_seconds and doubling between attempts, before the worker gives up and exits
+    startup_attempts: int = 5
+    startup_retry_seconds: float = 1
+
+    # Largest array accepted by the bulk insert endpoints
+    bulk_max_items: int = 1000
+
+    # Read-through cache in front of get_book / get_bookstore / get_client. Writes invalidate
+    # the entry in their own worker only: other workers may serve the old document for up to the TTL
+    entity_cache_size: int = 10000
+    entity_cache_ttl_seconds: float = 60
+
+    # JWT signing
+    jwt_secret_key: str = "my-secret-key"
+    jwt_algorithm: str = "HS256"
+    jwt_expire_minutes: int = 60
+    # Verified tokens kept in memory so repeated requests skip jwt.decode
+    token_cache_size: int = 10000
+
+    # Logging: root level, per-module overrides ("app.routes=DEBUG,app.db=WARNING") and JSON output
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_json: bool = True
+
+    # Background task moving active borrowings past their due date to OVERDUE
+    overdue_sweep_enabled: bool = True
+    overdue_sweep_interval_seconds: float = 300
+    overdue_sweep_chunk_size: int = 1000
+    # Leader lease, longer than the interval so the leader keeps it between runs
+    overdue_sweep_lock_ttl_seconds: float = 900
+
+    # Decrement stock and insert the sale in one transaction when the server supports it
+    # (replica set or mongos, detected at startup); on a standalone mongod, or with this
+    # off, the decrement is compensated if the insert fails
+    sale_transactions: bool = True
+    # Group commit: concurrent sale and borrowing inserts wait up to max_wait_ms (or until
+    # max_batch are waiting) and are written with one insert_many. Sales then compensate
+    # the stock decrement instead of using a transaction
+    group_commit_enabled: bool = False
+    group_commit_max_wait_ms: float = 2
+    group_commit_max_batch: int = 256
+    # Number of documents the stock of a hot item is striped across
+    inventory_stripe_slots: int = 8
+
+    # In-process prefix index for book autocomplete, refreshed with new books periodically and
+    # rebuilt from scratch every search_rebuild_seconds to drop books other workers deleted or edited
+    search_prefix_index: bool = True
+    search_refresh_seconds: float = 30
+    search_rebuild_seconds: float = 900
+
+
+def load_settings() -> Settings:
+    """Build the settings from the environment."""
+    overrides = {
+        name: os.environ[name.upper()]
+        for name in Settings.model_fields
+        if name.upper() in os.environ
+    }
+    return Settings(**overrides)
+
+
+settings = load_settings()
@@ -1,13 +1,204 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Any
+"""
+MongoDB client and database handles.
+
+The client is created lazily, from the settings, the first time it is used
+in a process; the app opens it in its startup handler. A process forked
+after that (pre-forked uvicorn/gunicorn workers) gets a fresh client of its
+own instead of sharing the parent's sockets. `client` and `db` are proxies
+to the current process's client, so `from ..db import db` keeps working
+wherever it is imported.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.uri_parser import parse_uri
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+import logging
 import os
 
-# MongoDB connection
-print(f"MongoDB URL: {os.getenv('MONGODB_URL', 'NOT SET')}")
-mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client : AsyncIOMotorClient[Any] = AsyncIOMotorClient(
-    mongo_url,
-    serverSelectionTimeoutMS=5000,
-    socketTimeoutMS=10000
-)
-db : AsyncIOMotorDatabase = client.bookstore
\ No newline at end of file
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters of one client, summed over the servers it talks to."""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self.created = 0
+        self.closed = 0
+        self.check_outs_started = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.check_out_failures = 0
+        self.pools_cleared = 0
+        self.check_out_wait_seconds = 0.0
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        self.pools_cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self.created += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self.closed += 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self.check_outs_started += 1
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self.check_out_failures += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self.checked_out += 1
+        self.check_out_wait_seconds += getattr(event, "duration", None) or 0.0
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self.checked_in += 1
+
+    def stats(self) -> dict:
+        in_use = self.checked_out - self.checked_in
+        return {
+            "pid": os.getpid(),
+            "open": self.created - self.closed,
+            "in_use": in_use,
+            "waiting": self.check_outs_started - self.checked_out - self.check_out_failures,
+            "max_pool_size": self.max_pool_size,
+            "utilization": round(in_use / self.max_pool_size, 3) if self.max_pool_size else None,
+            "check_outs": self.checked_out,
+            "check_out_failures": self.check_out_failures,
+            "avg_check_out_wait_ms": round(self.check_out_wait_seconds / self.checked_out * 1000, 3) if self.checked_out else 0.0,
+            "pools_cleared": self.pools_cleared,
+        }
+
+
+def client_options() -> dict[str, Any]:
+    """Driver options from the settings; options left unset keep the driver (or URL) defaults."""
+    options: dict[str, Any] = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": int(settings.mongodb_server_selection_timeout_seconds * 1000),
+        "socketTimeoutMS": int(settings.mongodb_socket_timeout_seconds * 1000),
+    }
+    if settings.mongodb_max_idle_seconds:
+        options["maxIdleTimeMS"] = int(settings.mongodb_max_idle_seconds * 1000)
+    if settings.mongodb_wait_queue_timeout_seconds:
+        options["waitQueueTimeoutMS"] = int(settings.mongodb_wait_queue_timeout_seconds * 1000)
+    if settings.mongodb_compressors:
+        # snappy and zstd need python-snappy / zstandard installed, zlib always works
+        options["compressors"] = settings.mongodb_compressors
+        options["zlibCompressionLevel"] = settings.mongodb_zlib_compression_level
+    if settings.mongodb_read_concern:
+        options["readConcernLevel"] = settings.mongodb_read_concern
+    if settings.mongodb_write_concern:
+        write_concern = settings.mongodb_write_concern
+        options["w"] = int(write_concern) if write_concern.isdigit() else write_concern
+    return options
+
+
+_client: Optional[AsyncIOMotorClient] = None
+_client_pid: Optional[int] = None
+_pool_stats: Optional[PoolStats] = None
+_transactions: Optional[bool] = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    """The client of this process, created on first use."""
+    global _client, _client_pid, _pool_stats, _transactions
+    if _client is None or _client_pid != os.getpid():
+        # a client inherited through fork is dropped, never closed: its sockets belong to the parent
+        _transactions = None
+        _pool_stats = PoolStats(settings.mongodb_max_pool_size)
+        _client = AsyncIOMotorClient(settings.mongodb_url, event_listeners=[_pool_stats], **client_options())
+        _client_pid = os.getpid()
+        logger.info(
+            f"MongoDB client created for hosts {parse_uri(settings.mongodb_url)['nodelist']}",  # never log credentials
+            extra={"pid": _client_pid, "max_pool_size": settings.mongodb_max_pool_size}
+        )
+    return _client
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    return get_client()[settings.mongodb_database]
+
+
+def close_client() -> bool:
+    """Close this process's client, the next use creates a new one. Returns whether there was one to close."""
+    global _client, _client_pid, _transactions
+    _transactions = None
+    closed = _client is not None and _client_pid == os.getpid()
+    if closed:
+        _client.close()
+    _client = None
+    _client_pid = None
+    return closed
+
+
+def pool_stats() -> Optional[dict]:
+    """Pool utilization of this process's client, None before it is created."""
+    if _pool_stats is None or _client_pid != os.getpid():
+        return None
+    return _pool_stats.stats()
+
+
+class _ClientProxy:
+    """`client` as if it were a module global: forwards to this process's client."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_client(), name)
+
+    def __getitem__(self, name: str) -> AsyncIOMotorDatabase:
+        return get_client()[name]
+
+    def close(self) -> None:
+        close_client()
+
+
+class _DatabaseProxy:
+    """`db` as if it were a module global: forwards to the database of this process's client."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_database(), name)
+
+    def __getitem__(self, name: str) -> Any:
+        return get_database()[name]
+
+
+client: AsyncIOMotorClient = _ClientProxy()  # type: ignore[assignment]
+db: AsyncIOMotorDatabase = _DatabaseProxy()  # type: ignore[assignment]
+
+T = TypeVar("T")
+
+async def transactions_supported() -> bool:
+    """
+    Whether the server runs multi-document transactions: a replica set member
+    or a mongos do, a standalone mongod does not. Asked once per client.
+    """
+    global _transactions
+    get_client()  # a new client forgets the previous answer
+    if _transactions is None:
+        hello = await client.admin.command("hello")
+        _transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions
+
+
+async def run_transaction(callback: Callable[[AsyncIOMotorClientSession], Awaitable[T]]) -> T:
+    """
+    Run `callback(session)` inside a transaction.
+    Transient errors such as write conflicts are retried by the driver.
+    Requires a replica set or sharded cluster.
+    """
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
@@ -0,0 +1,84 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+from .models.book import BOOK_INDEXES
+from .models.bookstore import BOOK_INVENTORY_INDEXES
+from .models.borrowing import BORROWING_INDEXES
+from .models.sale import SALE_INDEXES, SALES_ROLLUP_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Collection name -> indexes declared next to the models stored in it
+INDEXES: dict[str, list[IndexModel]] = {
+    "books": BOOK_INDEXES,
+    "borrowings": BORROWING_INDEXES,
+    "sales": SALE_INDEXES,
+    "sales_rollups": SALES_ROLLUP_INDEXES,
+    "book_inventories": BOOK_INVENTORY_INDEXES,
+}
+
+# Index options that make two indexes with the same name different
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "weights")
+
+
+def _normalize(spec: dict) -> dict:
+    """Reduce an index document to the parts that matter when comparing."""
+    key = spec["key"]
+    key = list(key.items()) if isinstance(key, dict) else [tuple(k) for k in key]
+    normalized = {option: spec[option] for option in _COMPARED_OPTIONS if option in spec}
+    # text indexes are reported with internal _fts keys, compare them by weights only
+    if not any(field in ("_fts", "_ftsx") or direction == "text" for field, direction in key):
+        normalized["key"] = key
+    return normalized
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> dict[str, list[str]]:
+    """
+    Create every declared index that does not exist yet.
+
+    Safe to run on every startup: creating an index that already exists with
+    the same definition is a no-op on the server. Each index is created on
+    its own, so one that cannot build does not keep the others from it.
+    """
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = []
+        for index in indexes:
+            try:
+                created[collection_name] += await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                if e.code == 11000:
+                    # a unique index over existing duplicates, e.g. books.isbn before `migrate isbn`
+                    logger.error(
+                        f"Could not build unique index {index.document['name']} on {collection_name}, "
+                        f"the collection holds duplicates: {e}. Resolve them (python -m app.manage migrate isbn "
+                        f"reports the ISBNs) and apply the indexes again"
+                    )
+                else:
+                    # e.g. an index with the same name but different options, fix it with the CLI
+                    logger.error(f"Could not ensure index {index.document['name']} on {collection_name}: {e}")
+    return created
+
+
+async def diff_indexes(db: AsyncIOMotorDatabase) -> dict[str, dict[str, list[str]]]:
+    """
+    Compare declared indexes against the ones that exist in the database.
+
+    Returns per collection the names of indexes that are missing, extra
+    (present but not declared) or changed (same name, different definition).
+    """
+    diff = {}
+    for collection_name, indexes in INDEXES.items():
+        declared = {index.document["name"]: _normalize(index.document) for index in indexes}
+        existing = await db[collection_name].index_information()
+        existing.pop("_id_", None)
+        actual = {name: _normalize(spec) for name, spec in existing.items()}
+
+        diff[collection_name] = {
+            "missing": sorted(set(declared) - set(actual)),
+            "extra": sorted(set(actual) - set(declared)),
+            "changed": sorted(name for name in set(declared) & set(actual) if declared[name] != actual[name]),
+        }
+    return diff
@@ -1,7 +1,19 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import logging
 
-from .db import client
+from .db import client, close_client, db, get_client, pool_stats, transactions_supported
+from .indexes import ensure_indexes
+from .repository import loader_stats
+from .utils.pagination import NEXT_CURSOR_HEADER
+from .utils.cache import cache_stats
+from .config import settings
+from .services.overdue import overdue_sweeper
+from .services.write_buffer import drain_write_buffers, write_buffer_stats
+from .services.search import prefix_index, start_prefix_index, stop_prefix_index
+from .utils.log import REQUEST_ID_HEADER, RequestIdMiddleware, setup_logging, shutdown_logging
 
 from app.routes.book import router as book_router
 from app.routes.bookstore import router as bookstore_router
@@ -10,11 +22,15 @@ from app.routes.client import router as client_router
 from app.routes.sale import router as sale_router
 from app.routes.login import router as login_router
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Main app
 app = FastAPI(
     title="Bookstore Project",
     description="A simple bookstore API built with FastAPI",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS configuration
@@ -22,9 +38,11 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", REQUEST_ID_HEADER],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
+app.add_middleware(RequestIdMiddleware)
 
 # Include routers
 app.include_router(book_router)
@@ -34,26 +52,53 @@ app.include_router(client_router)
 app.include_router(sale_router)
 app.include_router(login_router)
 
-# MongoDB connection
-async def startup_event():
-    try:
-        await client.admin.command('ping')
-        print("MongoDB connected")
+# Startup only connects and prepares, data is never touched unless SEED_ON_STARTUP is set
+app.state.ready = False
+
+async def prepare_database():
+    # created here, inside the worker process, never at import time
+    get_client()
+    await client.admin.command('ping')
+    logger.info("MongoDB connected", extra={"transactions": await transactions_supported()})
+
+    if settings.seed_on_startup:
+        from .utils.utils import seed_db
+        await seed_db()
+        logger.warning("Database reseeded with sample data (SEED_ON_STARTUP)")
 
-        from .utils.utils import populate_db_with_books, populate_db, clear_db
+    await ensure_indexes(db)
+    logger.info("MongoDB indexes ensured")
 
-        await clear_db()
-        await populate_db()
-        await populate_db_with_books() # test pagination
-        print("Database populated with sample books")
-    except Exception as e:
-        print(f"MongoDB connection failed: {e}")
+async def startup_event():
+    # a transient failure (mongod restarting, a failover) is retried with backoff; past the
+    # last attempt the error fails the startup and the worker exits for the orchestrator to restart
+    for attempt in range(1, settings.startup_attempts + 1):
+        try:
+            await prepare_database()
+            break
+        except Exception as e:
+            if attempt == settings.startup_attempts:
+                logger.exception(f"Startup failed after {attempt} attempts: {e}")
+                raise
+            delay = settings.startup_retry_seconds * 2 ** (attempt - 1)
+            logger.warning(f"Startup attempt {attempt} failed, retrying in {delay:g}s: {e}")
+            await asyncio.sleep(delay)
+
+    if settings.overdue_sweep_enabled:
+        overdue_sweeper.start()
+    start_prefix_index()  # warms up in the background, /ready waits for it
+    app.state.ready = True
 
 app.add_event_handler("startup", startup_event)
 
 async def shutdown_event():
-    client.close()
-    print("MongoDB connection closed")
+    app.state.ready = False
+    await overdue_sweeper.stop()
+    await stop_prefix_index()
+    await drain_write_buffers()  # before the client goes away
+    if close_client():  # never created if startup failed before connecting
+        logger.info("MongoDB connection closed")
+    shutdown_logging()
 
 app.add_event_handler("shutdown", shutdown_event)
 
@@ -66,6 +111,28 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Ready to take traffic: startup finished and the in-memory search index is built"""
+    checks = {
+        "startup": app.state.ready,
+        "search_prefix_index": prefix_index.ready or not settings.search_prefix_index,
+    }
+    if not all(checks.values()):
+        return ORJSONResponse({"status": "starting", "checks": checks}, status_code=503)
+    return {"status": "ready", "checks": checks}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "cache": cache_stats(),
+        "overdue_sweeper": overdue_sweeper.stats(),
+        "search_prefix_index": {"ready": prefix_index.ready, "books": len(prefix_index)},
+        "batch_loaders": loader_stats(),
+        "group_commit": write_buffer_stats(),
+        "mongodb_pool": pool_stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     # local host
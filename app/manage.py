@@ -0,0 +1,176 @@
+"""
+Operational commands for the bookstore database.
+
+Usage:
+    python -m app.manage indexes diff
+    python -m app.manage indexes apply
+    python -m app.manage rollups rebuild
+    python -m app.manage inventory stripe <bookstore_id> <isbn> [--slots N]
+    python -m app.manage seed --yes
+    python -m app.manage generate --yes [--books N] [--clients N] [--sales N] ... [--seed N]
+    python -m app.manage migrate refs [--batch-size N] [--restart]
+    python -m app.manage migrate isbn [--batch-size N] [--restart]
+    python -m app.manage migrate status
+
+`migrate isbn` has to run before the unique books.isbn index can build: it
+rewrites legacy ISBNs and exits non-zero listing the ISBNs shared by more
+than one book, which have to be resolved by hand first.
+"""
+from bson import ObjectId
+from datetime import datetime
+import argparse
+import asyncio
+import json
+
+from .config import settings
+from .db import client, db
+from .indexes import diff_indexes, ensure_indexes
+from .services.sales_rollup import rebuild_rollups
+from .services.inventory import stripe_stock
+from .services.migrations import MIGRATIONS, migration_status, run_migration
+from .utils.datagen import DatasetSpec, insert_dataset
+from .utils.isbn import normalize_isbn
+from .utils.utils import seed_db
+
+
+async def indexes_command(args: argparse.Namespace) -> int:
+    """Show or apply the difference between declared and actual indexes."""
+    if args.action == "apply":
+        created = await ensure_indexes(db)
+        print(json.dumps(created, indent=2))
+        return 0
+
+    diff = await diff_indexes(db)
+    print(json.dumps(diff, indent=2))
+    # non-zero exit when something is out of sync, handy as a deploy gate
+    return int(any(changes["missing"] or changes["changed"] for changes in diff.values()))
+
+
+async def rollups_command(args: argparse.Namespace) -> int:
+    """Recompute the sales rollups from the raw sales."""
+    buckets = await rebuild_rollups()
+    print(f"Rebuilt {buckets} sales rollup buckets")
+    return 0
+
+
+async def inventory_command(args: argparse.Namespace) -> int:
+    """Spread the stock of a hot item across several documents."""
+    total = await stripe_stock(args.bookstore_id, args.isbn, args.slots)
+    print(f"Striped {total} copies of {args.isbn} across {args.slots or 'the configured'} slots")
+    return 0
+
+
+async def seed_command(args: argparse.Namespace) -> int:
+    """Replace the whole database with the sample data."""
+    if not args.yes:
+        print("seed drops the whole database before loading the sample data, pass --yes to go ahead")
+        return 1
+    await seed_db()
+    await ensure_indexes(db)
+    print("Database seeded with sample data")
+    return 0
+
+
+async def generate_command(args: argparse.Namespace) -> int:
+    """Replace the whole database with a generated dataset of the given size."""
+    if not args.yes:
+        print("generate drops the whole database before generating the dataset, pass --yes to go ahead")
+        return 1
+    spec = DatasetSpec(**{name: getattr(args, name) for name in GENERATE_OPTIONS if getattr(args, name) is not None})
+
+    await client.drop_database(settings.mongodb_database)
+    report = await insert_dataset(db, spec, batch_size=args.batch_size, concurrency=args.concurrency)
+    for collection, stats in report.items():
+        print(f"{collection}: {stats['documents']} documents in {stats['seconds']}s ({stats['per_second']}/s)")
+
+    # indexes after the data, one build per index instead of maintaining them on every insert
+    await ensure_indexes(db)
+    buckets = await rebuild_rollups()
+    print(f"Indexes built, {buckets} sales rollup buckets")
+    return 0
+
+
+async def migrate_command(args: argparse.Namespace) -> int:
+    """Run a data migration from its last checkpoint, or show where every migration stands."""
+    if args.name == "status":
+        print(json.dumps(await migration_status(), indent=2, default=str))
+        return 0
+
+    status = 0
+    for migration in MIGRATIONS[args.name]:
+        checkpoint = await run_migration(migration, args.batch_size, args.restart)
+        print(f"{migration.name}: {checkpoint['scanned']} scanned, {checkpoint['updated']} updated, {checkpoint['skipped']} skipped")
+        for failed in checkpoint["failed"]:
+            print(f"  not rewritten: {json.dumps(failed, default=str)}")
+        for conflict in checkpoint.get("conflicts", []):
+            print(f"  conflict: {json.dumps(conflict, default=str)}")
+        if checkpoint["failed"] or checkpoint.get("conflicts"):
+            # e.g. two books with one ISBN: the unique books.isbn index cannot build until a human resolves them
+            print(f"  resolve these, then run `migrate {args.name} --restart` and `indexes apply`")
+            status = 1
+    return status
+
+
+# DatasetSpec fields settable from the command line, with their argument type
+GENERATE_OPTIONS = {
+    "books": int, "clients": int, "bookstores": int, "stock_per_bookstore": int, "borrowings": int, "sales": int,
+    "seed": int, "end": datetime.fromisoformat, "days": int, "book_skew": float, "client_skew": float,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="Bookstore database commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexes = commands.add_parser("indexes", help="Compare or create declared indexes")
+    indexes.add_argument("action", choices=["diff", "apply"])
+    indexes.set_defaults(handler=indexes_command)
+
+    rollups = commands.add_parser("rollups", help="Maintain the sales analytics rollups")
+    rollups.add_argument("action", choices=["rebuild"])
+    rollups.set_defaults(handler=rollups_command)
+
+    inventory = commands.add_parser("inventory", help="Manage bookstore stock")
+    inventory.add_argument("action", choices=["stripe"])
+    inventory.add_argument("bookstore_id", type=ObjectId)
+    inventory.add_argument("isbn", type=normalize_isbn)
+    inventory.add_argument("--slots", type=int, default=None, help="1 merges the stripes back")
+    inventory.set_defaults(handler=inventory_command)
+
+    migrate = commands.add_parser("migrate", help="Rewrite stored documents to the current schema, resumable")
+    migrate.add_argument("name", choices=[*MIGRATIONS, "status"])
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    migrate.set_defaults(handler=migrate_command)
+
+    seed = commands.add_parser("seed", help="Drop the database and load the sample data")
+    seed.add_argument("--yes", action="store_true", help="confirm dropping the database")
+    seed.set_defaults(handler=seed_command)
+
+    generate = commands.add_parser("generate", help="Drop the database and generate a dataset at scale")
+    generate.add_argument("--yes", action="store_true", help="confirm dropping the database")
+    for name in GENERATE_OPTIONS:
+        field = DatasetSpec.model_fields[name]
+        default = "today" if name == "end" else field.default
+        generate.add_argument(f"--{name.replace('_', '-')}", type=GENERATE_OPTIONS[name], help=f"default {default}")
+    generate.add_argument("--batch-size", type=int, default=5000)
+    generate.add_argument("--concurrency", type=int, default=4, help="insert_many batches in flight")
+    generate.set_defaults(handler=generate_command)
+
+    return parser
+
+
+async def run(args: argparse.Namespace) -> int:
+    try:
+        return await args.handler(args)
+    finally:
+        client.close()
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
-from .book import Book, BookCondition
-from .client import Client
+from .book import Book, BookAvailability, BookCondition, BookSearchMode, BookSearchResult, StoreAvailability
+from .client import Client, ClientUpdate
 from .bookstore import Bookstore, BookInventory
-from .borrowing import Borrowing, BorrowingStatus, SourceType
-from .sale import Sale
+from .borrowing import Borrowing, BorrowingExpand, BorrowingExpanded, BorrowingStatus, SourceType
+from .sale import Sale, SalesRollup, RollupDimension, RollupGranularity
+from .bulk import BulkItemResult, BulkResult
+from .object_id import ObjectIdRef
 
 __all__ = [
     "Book",
+    "BookAvailability",
     "BookCondition", 
+    "BookSearchMode",
+    "BookSearchResult",
+    "StoreAvailability",
     "Client",
+    "ClientUpdate",
     "Bookstore",
     "BookInventory",
     "Borrowing",
+    "BorrowingExpand",
+    "BorrowingExpanded",
     "BorrowingStatus",
     "SourceType",
-    "Sale"
+    "Sale",
+    "SalesRollup",
+    "RollupDimension",
+    "RollupGranularity",
+    "BulkItemResult",
+    "BulkResult",
+    "ObjectIdRef"
 ]
\ No newline at end of file
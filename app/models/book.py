@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from enum import Enum
+from pymongo import ASCENDING, TEXT, IndexModel
+
+from ..utils.isbn import Isbn
 
 
 class BookCondition(str, Enum):
@@ -12,7 +15,7 @@ class BookCondition(str, Enum):
 
 class Book(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
-    isbn: str = Field(..., min_length=10, max_length=13)
+    isbn: Isbn  # ISBN-10 or ISBN-13 in, canonical ISBN-13 stored and returned
     title: str = Field(..., min_length=1, max_length=200)
     author: str = Field(..., min_length=1, max_length=100)
     genre: Optional[str] = None
@@ -21,4 +24,46 @@ class Book(BaseModel):
     
     class Config:
         from_attributes = True
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+
+class StoreAvailability(BaseModel):
+    bookstore_id: str
+    quantity: int
+
+
+class BookAvailability(BaseModel):
+    """Copies of one ISBN in stock, per bookstore, most stocked first."""
+    isbn: str
+    total: int
+    stores: list[StoreAvailability]
+
+
+class BookSearchMode(str, Enum):
+    TEXT = "text"  # ranked full-text search
+    PREFIX = "prefix"  # autocomplete on word prefixes
+
+
+class BookSearchResult(BaseModel):
+    id: str = Field(..., alias="_id")
+    title: str
+    author: str
+    genre: Optional[str] = None
+    score: Optional[float] = None  # text relevance, only in text mode
+
+    class Config:
+        populate_by_name = True
+
+
+# Indexes backing the book query patterns in app/routes/book.py
+BOOK_INDEXES = [
+    # GET /books/search, titles weigh the most in the ranking
+    IndexModel(
+        [("title", TEXT), ("author", TEXT), ("genre", TEXT)],
+        weights={"title": 10, "author": 5, "genre": 1},
+        name="book_text"
+    ),
+    # GET /books/isbn/{isbn}, one catalog entry per ISBN. Cannot build while stored ISBNs
+    # collide: run `python -m app.manage migrate isbn` and resolve what it reports first
+    IndexModel([("isbn", ASCENDING)], unique=True),
+]
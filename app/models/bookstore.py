@@ -1,12 +1,17 @@
 from pydantic import BaseModel, Field
 from typing import Optional
+from pymongo import ASCENDING, IndexModel
+
+from ..utils.isbn import Isbn
+from .object_id import ObjectIdRef
 
 
 class BookInventory(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
-    bookstore_id: str
-    isbn: int
+    bookstore_id: ObjectIdRef
+    isbn: Isbn
     quantity_available: int = Field(..., ge=0)
+    slot: Optional[int] = None  # stripe number when the stock of a hot item is split across documents
     
     class Config:
         from_attributes = True
@@ -23,3 +28,13 @@ class Bookstore(BaseModel):
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+# Indexes backing the inventory query patterns in app/routes/bookstore.py
+# and the stock decrement in app/services/inventory.py
+BOOK_INVENTORY_INDEXES = [
+    IndexModel([("bookstore_id", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("bookstore_id", ASCENDING), ("isbn", ASCENDING), ("slot", ASCENDING)]),
+    # GET /books/isbn/{isbn}/availability, covers the whole aggregation
+    IndexModel([("isbn", ASCENDING), ("bookstore_id", ASCENDING), ("quantity_available", ASCENDING)]),
+]
@@ -1,7 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 from enum import Enum
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from .book import Book
+from .bookstore import Bookstore
+from .client import Client
+from .object_id import ObjectIdRef
 
 
 class BorrowingStatus(str, Enum):
@@ -18,10 +24,10 @@ class SourceType(str, Enum):
 
 class Borrowing(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
-    borrower_id: str  # client who borrowed
+    borrower_id: ObjectIdRef  # client who borrowed
     source_type: SourceType  # More robust than separate lender_id/bookstore_id fields
-    source_id: str  # ID of bookstore or client providing the book
-    book_id: str
+    source_id: ObjectIdRef  # ID of bookstore or client providing the book
+    book_id: ObjectIdRef
     borrow_date: datetime = Field(default_factory=datetime.now)
     due_date: datetime
     return_date: Optional[datetime] = None
@@ -30,3 +36,28 @@ class Borrowing(BaseModel):
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class BorrowingExpand(str, Enum):
+    """References of a borrowing that can be returned inline with `expand=`."""
+    BOOK = "book"  # book_id
+    BORROWER = "borrower"  # borrower_id, a client
+    SOURCE = "source"  # source_id, a bookstore or a client depending on source_type
+
+
+class BorrowingExpanded(Borrowing):
+    """Borrowing with the documents it references, only the expanded ones are present."""
+    book: Optional[Book] = None
+    borrower: Optional[Client] = None
+    source: Optional[Union[Bookstore, Client]] = None
+
+
+# Indexes backing the borrowing query patterns in app/routes/borrowing.py
+# Each one ends with (borrow_date, _id) so keyset pages are sorted by the index
+BORROWING_INDEXES = [
+    IndexModel([("borrow_date", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("borrower_id", ASCENDING), ("source_type", ASCENDING), ("borrow_date", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("source_id", ASCENDING), ("source_type", ASCENDING), ("borrow_date", DESCENDING), ("_id", DESCENDING)]),
+    # overdue sweeper: {status: active, due_date: {$lt: now}}
+    IndexModel([("status", ASCENDING), ("due_date", ASCENDING)]),
+]
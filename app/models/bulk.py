@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class BulkItemResult(BaseModel):
+    index: int  # position of the item in the request array
+    id: Optional[str] = None  # set when the item was inserted
+    error: Optional[str] = None  # set when the item was rejected
+
+
+class BulkResult(BaseModel):
+    inserted_count: int
+    error_count: int
+    results: list[BulkItemResult]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional
 
 
@@ -9,7 +9,26 @@ class Client(BaseModel):
     email: EmailStr
     address: Optional[str] = Field(None, max_length=200)
     is_active: bool = True  # Allows soft deletion while preserving borrowing history
+    version: int = 0  # Bumped on every update, used for optimistic concurrency
     
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class ClientUpdate(BaseModel):
+    """Partial client update, only the fields that are sent are changed."""
+    first_name: Optional[str] = Field(None, min_length=1, max_length=50)
+    last_name: Optional[str] = Field(None, min_length=1, max_length=50)
+    email: Optional[EmailStr] = None
+    address: Optional[str] = Field(None, max_length=200)
+    is_active: Optional[bool] = None
+    version: Optional[int] = None  # Expected current version, the update fails with 409 if it moved on
+
+    @field_validator("first_name", "last_name", "email", "is_active", "version")
+    @classmethod
+    def not_null(cls, value):
+        # only address can be cleared, the other fields are required on a client
+        if value is None:
+            raise ValueError("may not be null")
+        return value
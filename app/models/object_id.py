@@ -0,0 +1,28 @@
+from bson import ObjectId
+from pydantic import BeforeValidator, AfterValidator, PlainSerializer, SerializationInfo
+from typing import Annotated, Any
+
+
+def _from_bson(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+def _check_object_id(value: str) -> str:
+    if not ObjectId.is_valid(value):
+        raise ValueError("must be a 24 character hex ObjectId")
+    return value
+
+
+def _serialize(value: str, info: SerializationInfo) -> Any:
+    # JSON gets the string, model_dump() (what is written to Mongo) the ObjectId
+    return value if info.mode_is_json() else ObjectId(value)
+
+
+# Reference to another document. Always stored as an ObjectId, so one form
+# is queried and indexed everywhere, and exchanged as its hex string in JSON.
+ObjectIdRef = Annotated[
+    str,
+    BeforeValidator(_from_bson),
+    AfterValidator(_check_object_id),
+    PlainSerializer(_serialize),
+]
@@ -1,16 +1,56 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from enum import Enum
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from .object_id import ObjectIdRef
 
 
 class Sale(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
-    client_id: str
-    book_id: str
-    bookstore_id: str
+    client_id: ObjectIdRef
+    book_id: ObjectIdRef
+    bookstore_id: ObjectIdRef
     amount: float = Field(..., ge=0)
     sale_date: datetime = Field(default_factory=datetime.now)
     
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class RollupDimension(str, Enum):
+    BOOKSTORE = "bookstore"
+    BOOK = "book"
+
+
+class RollupGranularity(str, Enum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class SalesRollup(BaseModel):
+    """Revenue and number of sales of one bookstore or book over one day or month."""
+    dimension: RollupDimension
+    key: str  # bookstore_id or book_id
+    granularity: RollupGranularity
+    period: datetime  # start of the day or month
+    revenue: float
+    count: int
+
+
+# Indexes backing the sale query patterns in app/routes/sale.py
+# Each one ends with (sale_date, _id) so keyset pages are sorted by the index
+SALE_INDEXES = [
+    IndexModel([("client_id", ASCENDING), ("sale_date", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("bookstore_id", ASCENDING), ("sale_date", DESCENDING), ("_id", DESCENDING)]),
+]
+
+# One bucket per (dimension, key, granularity, period), also the $merge key of the rebuild
+SALES_ROLLUP_INDEXES = [
+    IndexModel(
+        [("dimension", ASCENDING), ("key", ASCENDING), ("granularity", ASCENDING), ("period", ASCENDING)],
+        unique=True
+    ),
+]
@@ -0,0 +1,111 @@
+"""
+By-id reads shared by the routes and services.
+
+Lookups go through the entity cache first; misses are handed to a
+`BatchLoader`, which answers every lookup issued in the same event loop
+tick with one `$in` query. A page that fires one GET /books/{id} per row
+of a borrowing list, or a join over a list of ids, costs one round trip
+instead of one per document.
+"""
+from bson import ObjectId
+from typing import Iterable, Optional
+import asyncio
+
+from .db import db
+from .utils.cache import EntityCache, book_cache, bookstore_cache, client_cache
+
+# Ids per $in query, larger batches are split
+MAX_BATCH_SIZE = 1000
+
+
+class BatchLoader:
+    """
+    Coalesces `find_one({"_id": ...})` calls on one collection.
+
+    `load` only registers the id and waits; the query runs once the current
+    tick is over, so every lookup made meanwhile, by this request or by
+    concurrent ones, shares it. Results are not kept after the batch
+    resolves (that is the entity cache's job), so one loader can safely
+    serve the whole process.
+    """
+
+    def __init__(self, collection_name: str, max_batch_size: int = MAX_BATCH_SIZE):
+        self.collection_name = collection_name
+        self.max_batch_size = max_batch_size
+        self._pending: dict[ObjectId, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()  # referenced until done, the loop only keeps weak ones
+        self.batches = 0
+        self.loads = 0
+
+    async def load(self, document_id: ObjectId) -> Optional[dict]:
+        """The document with `document_id`, None if there is none."""
+        self.loads += 1
+        future = self._pending.get(document_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = self._pending[document_id] = loop.create_future()
+
+        # a cancelled caller must not cancel the lookup for the others waiting on it
+        return await asyncio.shield(future)
+
+    async def load_many(self, document_ids: Iterable[ObjectId]) -> list[Optional[dict]]:
+        return await asyncio.gather(*(self.load(document_id) for document_id in document_ids))
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        ids = list(pending)
+        for start in range(0, len(ids), self.max_batch_size):
+            chunk = {document_id: pending[document_id] for document_id in ids[start:start + self.max_batch_size]}
+            task = asyncio.create_task(self._fetch(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, pending: dict[ObjectId, asyncio.Future]) -> None:
+        self.batches += 1
+        try:
+            documents = await db[self.collection_name].find({"_id": {"$in": list(pending)}}).to_list(length=None)
+        except Exception as error:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        found = {document["_id"]: document for document in documents}
+        for document_id, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(document_id))
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "batches": self.batches}
+
+
+class Repository:
+    """Cached, batched by-id reads of one collection."""
+
+    def __init__(self, collection_name: str, cache: EntityCache):
+        self.cache = cache
+        self.loader = BatchLoader(collection_name)
+
+    async def get(self, document_id: ObjectId) -> Optional[dict]:
+        return await self.cache.get_or_load(str(document_id), lambda: self.loader.load(document_id))
+
+    async def get_many(self, document_ids: Iterable[ObjectId]) -> list[dict]:
+        """Documents found for `document_ids`, in the order asked, missing ones left out."""
+        documents = await asyncio.gather(*(self.get(document_id) for document_id in document_ids))
+        return [document for document in documents if document is not None]
+
+    async def invalidate(self, document_id: ObjectId) -> None:
+        await self.cache.invalidate(str(document_id))
+
+
+books = Repository("books", book_cache)
+bookstores = Repository("bookstores", bookstore_cache)
+clients = Repository("clients", client_cache)
+
+REPOSITORIES = {"books": books, "bookstores": bookstores, "clients": clients}
+
+
+def loader_stats() -> dict:
+    return {name: repository.loader.stats() for name, repository in REPOSITORIES.items()}
@@ -1,60 +1,172 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status, Query
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
-from ..models.book import Book
+import logging
+from ..models.book import Book, BookAvailability, BookSearchMode, BookSearchResult
+from pymongo.errors import DuplicateKeyError
+from ..models.bulk import BulkResult
 
 from ..db import db
+from ..repository import books as book_repository
 from ..utils.utils import *
+from ..utils.pagination import encode_cursor, keyset_filter, keyset_sort
+from ..utils.projection import FieldSelection, select_fields
+from ..services.bulk import bulk_insert
+from ..services.search import autocomplete_books, prefix_index, search_books
+from ..services.inventory import get_availability
+from ..utils.isbn import normalize_isbn
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+book_fields = select_fields(Book)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_book(book: Book) -> Book:
     """Create a new book in the database"""
     book_dict = book.model_dump(by_alias=True, exclude_none=True)
     book_dict.pop("_id", None)
 
-    result = await db.books.insert_one(book_dict)
+    try:
+        result = await db.books.insert_one(book_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A book with this ISBN already exists")
     if not result.acknowledged:
         raise HTTPException(status_code=500, detail="Failed to create book")
 
     book_dict["_id"] = str(result.inserted_id)
+    prefix_index.add(book_dict)
     return Book(**book_dict)
 
 
+async def index_books(books: list[dict]) -> None:
+    """Make new books searchable by prefix right away in this worker"""
+    for book in books:
+        prefix_index.add(book)
+
+
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_books(response: Response, books: List[dict] = Body(...)) -> BulkResult:
+    """Create many books at once, reporting the outcome of every item"""
+    result = await bulk_insert(db.books, books, Book, on_inserted=index_books)
+    if result.error_count:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return result
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: BookSearchMode = BookSearchMode.TEXT,
+    limit: int = Query(10, ge=1, le=50),
+) -> List[BookSearchResult]:
+    """
+    Search books by title, author and genre.
+    `text` ranks whole-word matches by relevance, `prefix` autocompletes partial words.
+    """
+    if mode == BookSearchMode.PREFIX:
+        return await autocomplete_books(q, limit)
+    return await search_books(q, limit)
+
+
+def validate_isbn(isbn: str) -> str:
+    """Canonical ISBN-13 of a path parameter, 400 if it is not a valid ISBN"""
+    try:
+        return normalize_isbn(isbn)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/isbn/{isbn}")
+async def get_book_by_isbn(isbn: str, fields: FieldSelection = Depends(book_fields)) -> Book:
+    """Get a single book by its ISBN-10 or ISBN-13, hyphens allowed"""
+    book_data = await db.books.find_one({"isbn": validate_isbn(isbn)}, fields.projection)
+    if not book_data:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    return fields.response(book_data)
+
+
+@router.get("/isbn/{isbn}/availability")
+async def get_book_availability(isbn: str) -> BookAvailability:
+    """Which bookstores have a book in stock and how many copies, most stocked first"""
+    isbn = validate_isbn(isbn)
+
+    stores = await get_availability(isbn)
+    return BookAvailability(
+        isbn=isbn,
+        total=sum(store["quantity"] for store in stores),
+        stores=[{"bookstore_id": str(store["_id"]), "quantity": store["quantity"]} for store in stores]
+    )
+
+
 @router.get("/{book_id}")
-async def get_book(book_id: str) -> Book:
+async def get_book(book_id: str, fields: FieldSelection = Depends(book_fields)) -> Book:
     """Get a single book by its MongoDB ObjectId"""
     book_object_id = validate_object_id(book_id, "book")
-    
-    book_data = await db.books.find_one({"_id": book_object_id})
+
+    # the cache holds whole books, fields are picked from the cached copy
+    book_data = await book_repository.get(book_object_id)
     if not book_data:
         raise HTTPException(status_code=404, detail="Book not found")
-    
-    book_data["_id"] = str(book_data["_id"])
-    return Book(**book_data)
+
+    return fields.response(book_data)
 
 @router.get("/")
-async def get_books(limit: int = Query(20, le=100), skip: int = Query(0)) -> dict:
-    """Get all books in the database"""
-    print(f"Fetching books and limit: {limit}")
-    query = {}
-    # cursor is the object Id in string format that bookmarks the last fetched book
+async def get_books(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque `next_cursor` returned by the previous page"),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Use `cursor` instead"),
+    ids: Optional[str] = Query(None, description="Comma-separated book ids to fetch instead of a page, at most 100"),
+    fields: FieldSelection = Depends(book_fields),
+) -> dict:
+    """Get all books in the database, one keyset page at a time, or the books with the given ids"""
+    logger.debug("Fetching books", extra={"limit": limit, "cursor": cursor})
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+    if ids is not None:
+        if cursor or skip:
+            raise HTTPException(status_code=400, detail="ids cannot be combined with cursor or skip")
+        return await get_books_by_ids(ids, fields)
+
+    # cursor bookmarks the last fetched book, so every page is an index seek on _id
+    query = keyset_filter(cursor)
+    books_cursor = db.books.find(query, fields.projection).sort(keyset_sort())
+    if skip:
+        books_cursor = books_cursor.skip(skip)
 
-    books_data = await db.books.find().skip(skip).limit(limit).to_list(limit)
+    # fetch one extra document to know whether another page exists
+    books_data = await books_cursor.limit(limit + 1).to_list(limit + 1)
     if not books_data:
         raise HTTPException(status_code=404, detail="No books found")
-    
-    for book in books_data:
-        book["_id"] = str(book["_id"])
 
-    # prepare return
-    books = [Book(**book) for book in books_data]
+    has_more = len(books_data) > limit
+    books_data = books_data[:limit]
+    next_cursor = encode_cursor(books_data[-1]["_id"]) if has_more else None
 
-    return {
-        "books": books,
-        "skip": skip + len(books_data),
-        "has_more": len(books_data) == limit
+    # prepare return
+    response = {
+        "books": fields.codec.rows(books_data),
+        "next_cursor": next_cursor,
+        "has_more": has_more
     }
+    if skip is not None:
+        response["skip"] = skip + len(books_data)
+    return ORJSONResponse(response)
+
+async def get_books_by_ids(ids: str, fields: FieldSelection) -> ORJSONResponse:
+    """Books in the order of `ids`, unknown ids are left out"""
+    # lookups of concurrent requests are answered by the same $in query
+    books_data = await book_repository.get_many(validate_object_ids(ids, "book"))
+    if not books_data:
+        raise HTTPException(status_code=404, detail="No books found")
+
+    return ORJSONResponse({
+        "books": fields.codec.rows(books_data),
+        "next_cursor": None,
+        "has_more": False
+    })
 
 @router.delete("/{book_id}")
 async def delete_book(book_id: str) -> None:
@@ -63,6 +175,8 @@ async def delete_book(book_id: str) -> None:
 
     
     result = await db.books.delete_one({"_id": book_object_id})
+    await book_repository.invalidate(book_object_id)
+    prefix_index.remove(str(book_object_id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Book not found")
 
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
 from typing import List
 from ..models.bookstore import Bookstore, BookInventory
+from ..models.bulk import BulkResult
 from bson import ObjectId
 from bson.errors import InvalidId
 
 from ..db import db
+from ..repository import bookstores as bookstore_repository
 from ..utils.utils import validate_object_id
+from ..utils.streaming import stream_ndjson, wants_ndjson
+from ..utils.pagination import Page, paginate
+from ..utils.projection import FieldSelection, select_fields
+from ..services.bulk import bulk_insert
 
 router = APIRouter(prefix="/bookstores", tags=["bookstores"])
 
+bookstore_fields = select_fields(Bookstore)
+inventory_fields = select_fields(BookInventory)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_bookstore(bookstore: Bookstore) -> Bookstore:
     """Create a new bookstore in the database"""
@@ -24,16 +33,15 @@ async def create_bookstore(bookstore: Bookstore) -> Bookstore:
 
 
 @router.get("/{bookstore_id}")
-async def get_bookstore(bookstore_id: str) -> Bookstore:
+async def get_bookstore(bookstore_id: str, fields: FieldSelection = Depends(bookstore_fields)) -> Bookstore:
     """Get a single bookstore by its MongoDB ObjectId"""
     bookstore_object_id = validate_object_id(bookstore_id, "bookstore")
 
-    bookstore_data = await db.bookstores.find_one({"_id": bookstore_object_id})
+    bookstore_data = await bookstore_repository.get(bookstore_object_id)
     if not bookstore_data:
         raise HTTPException(status_code=404, detail="Bookstore not found")
 
-    bookstore_data["_id"] = str(bookstore_data["_id"])
-    return Bookstore(**bookstore_data)
+    return fields.response(bookstore_data)
 
 
 @router.post("/{bookstore_id}/inventory", status_code=status.HTTP_201_CREATED)
@@ -52,16 +60,37 @@ async def add_book_inventory(bookstore_id: str, inventory: BookInventory) -> Boo
     return BookInventory(**inventory_dict)
 
 
+@router.post("/{bookstore_id}/inventory/bulk", status_code=status.HTTP_201_CREATED)
+async def add_book_inventories(bookstore_id: str, response: Response, inventories: List[dict] = Body(...)) -> BulkResult:
+    """Add many book inventories to a bookstore, reporting the outcome of every item"""
+    validate_object_id(bookstore_id, "bookstore")
+
+    # every item belongs to the bookstore in the path
+    inventories = [{**inventory, "bookstore_id": bookstore_id} for inventory in inventories]
+
+    result = await bulk_insert(db.book_inventories, inventories, BookInventory)
+    if result.error_count:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return result
+
+
 @router.get("/{bookstore_id}/inventory")
-async def get_bookstore_inventory(bookstore_id: str) -> List[BookInventory]:
+async def get_bookstore_inventory(
+    bookstore_id: str,
+    request: Request,
+    response: Response,
+    page: Page = Depends(paginate()),
+    fields: FieldSelection = Depends(inventory_fields),
+) -> List[BookInventory]:
     """Get all book inventories for a specific bookstore by its MongoDB ObjectId"""
-    validate_object_id(bookstore_id, "bookstore")
+    bookstore_object_id = validate_object_id(bookstore_id, "bookstore")
 
-    inventories_data = await db.book_inventories.find({"bookstore_id": bookstore_id}).to_list(length=None)
+    inventories_cursor = page.find(db.book_inventories, {"bookstore_id": bookstore_object_id}, fields.projection)
+    if wants_ndjson(request):
+        return stream_ndjson(inventories_cursor, fields.codec)
+
+    inventories_data = await page.fetch(inventories_cursor, response)
     if not inventories_data:
         raise HTTPException(status_code=404, detail="No inventories found for this bookstore")
 
-    for inventory in inventories_data:
-        inventory["_id"] = str(inventory["_id"])
-
-    return [BookInventory(**inventory) for inventory in inventories_data]
\ No newline at end of file
+    return fields.response(inventories_data, response)
\ No newline at end of file
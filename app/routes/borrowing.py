@@ -1,100 +1,124 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List
-from ..models.borrowing import Borrowing, SourceType
+from ..models.borrowing import Borrowing, BorrowingExpanded, SourceType
 
 from ..db import db
 from ..services.borrowing import *
+from ..services.write_buffer import borrowings_buffer
 from ..utils.utils import validate_object_id
+from ..utils.streaming import stream_ndjson, wants_ndjson
+from ..utils.pagination import Page, SortOrder, paginate
+from ..utils.projection import FieldSelection, select_fields
+from ..utils.codec import json_response
 
 router = APIRouter(prefix="/borrowings", tags=["borrowings"])
 
+# Newest borrowings first, backed by the borrow_date indexes in BORROWING_INDEXES
+borrowing_page = paginate("borrow_date", SortOrder.DESC)
+borrowing_fields = select_fields(Borrowing)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_borrowing(borrowing: Borrowing) -> Borrowing:
     """Create a new borrowing in the database"""
     borrowing_dict = borrowing.model_dump(by_alias=True, exclude_none=True)
     borrowing_dict.pop("_id", None)
 
-    result = await db.borrowings.insert_one(borrowing_dict)
-    if not result.acknowledged:
-        raise HTTPException(status_code=500, detail="Failed to create borrowing")
-
-    borrowing_dict["_id"] = str(result.inserted_id)
-    borrowing_dict["source_id"] = str(borrowing_dict["source_id"])
-    borrowing_dict["borrower_id"] = str(borrowing_dict["borrower_id"])
-    borrowing_dict["book_id"] = str(borrowing_dict["book_id"])
+    borrowing_dict["_id"] = str(await borrowings_buffer.insert(borrowing_dict))
     return Borrowing(**borrowing_dict)
 
 
 @router.get("/{borrowing_id}")
-async def get_borrowing(borrowing_id: str) -> Borrowing:
-    """Get a single borrowing by its MongoDB ObjectId"""
+async def get_borrowing(
+    borrowing_id: str,
+    fields: FieldSelection = Depends(borrowing_fields),
+    expansion: BorrowingExpansion = Depends(borrowing_expansion),
+) -> BorrowingExpanded:
+    """Get a single borrowing by its MongoDB ObjectId, `expand` inlines the book, borrower or source"""
     borrowing_object_id = validate_object_id(borrowing_id, "borrowing")
 
-    borrowing_data = await db.borrowings.find_one({"_id": borrowing_object_id})
+    borrowing_data = await db.borrowings.find_one({"_id": borrowing_object_id}, expansion.projection(fields.projection))
     if not borrowing_data:
         raise HTTPException(status_code=404, detail="Borrowing not found")
 
-    borrowing_data["_id"] = str(borrowing_data["_id"])
-    borrowing_data["source_id"] = str(borrowing_data["source_id"])
-    borrowing_data["borrower_id"] = str(borrowing_data["borrower_id"])
-    borrowing_data["book_id"] = str(borrowing_data["book_id"])
-    return Borrowing(**borrowing_data)
+    row = fields.codec.row(borrowing_data)
+    await expansion.apply([borrowing_data], [row])
+    return json_response(row)
 
 @router.get("/")
-async def get_borrowings() -> List[Borrowing]:
-    """Get all borrowings in the database"""
-    borrowings_data = await db.borrowings.find().to_list(length=None)
+async def get_borrowings(
+    request: Request,
+    response: Response,
+    page: Page = Depends(borrowing_page),
+    fields: FieldSelection = Depends(borrowing_fields),
+    expansion: BorrowingExpansion = Depends(borrowing_expansion),
+) -> List[BorrowingExpanded]:
+    """Get all borrowings in the database, `expand` inlines the books, borrowers or sources"""
+    borrowings_cursor = page.find(db.borrowings, {}, expansion.projection(fields.projection))
+    if wants_ndjson(request):
+        return stream_ndjson(borrowings_cursor, fields.codec, expansion.apply)
+
+    borrowings_data = await page.fetch(borrowings_cursor, response)
     if not borrowings_data:
         raise HTTPException(status_code=404, detail="No borrowings found")
 
-    for borrowing in borrowings_data:
-        borrowing["_id"] = str(borrowing["_id"])
-        borrowing["source_id"] = str(borrowing["source_id"])
-        borrowing["borrower_id"] = str(borrowing["borrower_id"])
-        borrowing["book_id"] = str(borrowing["book_id"])
-
-    return [Borrowing(**borrowing) for borrowing in borrowings_data]
+    rows = fields.codec.rows(borrowings_data)
+    await expansion.apply(borrowings_data, rows)
+    return json_response(rows, response)
 
 @router.get("/client/{client_id}")
-async def get_borrowings_by_client(client_id: str) -> List[Borrowing]:
+async def get_borrowings_by_client(
+    client_id: str,
+    request: Request,
+    response: Response,
+    page: Page = Depends(borrowing_page),
+    fields: FieldSelection = Depends(borrowing_fields),
+    expansion: BorrowingExpansion = Depends(borrowing_expansion),
+) -> List[BorrowingExpanded]:
     """Get all borrowings for a specific client by their MongoDB ObjectId"""
     client_object_id = validate_object_id(client_id, "client")
 
-    borrowings_data = await db.borrowings.find({
-        "borrower_id": str(client_object_id),
+    borrowings_cursor = page.find(db.borrowings, {
+        "borrower_id": client_object_id,
         "source_type": SourceType.CLIENT
-    }).to_list(length=None)
+    }, expansion.projection(fields.projection))
+    if wants_ndjson(request):
+        return stream_ndjson(borrowings_cursor, fields.codec, expansion.apply)
+
+    borrowings_data = await page.fetch(borrowings_cursor, response)
     if not borrowings_data:
         raise HTTPException(status_code=404, detail="No borrowings found for this client")
 
-    for borrowing in borrowings_data:
-        borrowing["_id"] = str(borrowing["_id"])
-        borrowing["source_id"] = str(borrowing["source_id"])
-        borrowing["borrower_id"] = str(borrowing["borrower_id"])
-        borrowing["book_id"] = str(borrowing["book_id"])
-
-    return [Borrowing(**borrowing) for borrowing in borrowings_data]
+    rows = fields.codec.rows(borrowings_data)
+    await expansion.apply(borrowings_data, rows)
+    return json_response(rows, response)
 
 
 @router.get("/bookstore/{bookstore_id}")
-async def get_borrowings_by_bookstore(bookstore_id: str) -> List[Borrowing]:
+async def get_borrowings_by_bookstore(
+    bookstore_id: str,
+    request: Request,
+    response: Response,
+    page: Page = Depends(borrowing_page),
+    fields: FieldSelection = Depends(borrowing_fields),
+    expansion: BorrowingExpansion = Depends(borrowing_expansion),
+) -> List[BorrowingExpanded]:
     """Get all borrowings from a specific bookstore by its MongoDB ObjectId"""
     bookstore_object_id = validate_object_id(bookstore_id, "bookstore")
 
-    borrowings_data = await db.borrowings.find({
-        "source_id": str(bookstore_object_id),
+    borrowings_cursor = page.find(db.borrowings, {
+        "source_id": bookstore_object_id,
         "source_type": SourceType.BOOKSTORE
-    }).to_list(length=None)
+    }, expansion.projection(fields.projection))
+    if wants_ndjson(request):
+        return stream_ndjson(borrowings_cursor, fields.codec, expansion.apply)
+
+    borrowings_data = await page.fetch(borrowings_cursor, response)
     if not borrowings_data:
         raise HTTPException(status_code=404, detail="No borrowings found for this bookstore")
 
-    for borrowing in borrowings_data:
-        borrowing["_id"] = str(borrowing["_id"])
-        borrowing["source_id"] = str(borrowing["source_id"])
-        borrowing["borrower_id"] = str(borrowing["borrower_id"])
-        borrowing["book_id"] = str(borrowing["book_id"])
-
-    return [Borrowing(**borrowing) for borrowing in borrowings_data]
+    rows = fields.codec.rows(borrowings_data)
+    await expansion.apply(borrowings_data, rows)
+    return json_response(rows, response)
 
 @router.get("/return/{borrowing_id}")
 async def return_borrowing(borrowing_id: str) -> Borrowing:
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from ..models.client import Client
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import Optional
+from ..models.client import Client, ClientUpdate
+from pymongo import ReturnDocument
 from bson import ObjectId
 from bson.errors import InvalidId
 
 from ..db import db
+from ..repository import clients as client_repository
 from ..utils.utils import *
 from ..utils.auth import verify_token
+from ..utils.streaming import stream_ndjson, wants_ndjson
+from ..utils.projection import FieldSelection, select_fields
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
+client_fields = select_fields(Client)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_client(client: Client) -> Client:
     """Create a new client in the database"""
     client_dict = client.model_dump(by_alias=True, exclude_none=True)
     client_dict.pop("_id", None)
+    client_dict["version"] = 0
 
     result = await db.clients.insert_one(client_dict)
     if not result.acknowledged:
@@ -23,47 +31,101 @@ async def create_client(client: Client) -> Client:
     return Client(**client_dict)
 
 @router.get("/")
-async def get_clients(token_data: dict = Depends(verify_token)) -> list[Client]:
-    """Get all clients in the database"""
-    clients_data = await db.clients.find().to_list(length=None)
+async def get_clients(
+    request: Request,
+    ids: Optional[str] = Query(None, description="Comma-separated client ids to fetch instead of all clients, at most 100"),
+    token_data: dict = Depends(verify_token),
+    fields: FieldSelection = Depends(client_fields),
+) -> list[Client]:
+    """Get all clients in the database, or the clients with the given ids"""
+    if ids is not None:
+        # in the order of ids, unknown ids are left out
+        clients_data = await client_repository.get_many(validate_object_ids(ids, "client"))
+        if not clients_data:
+            raise HTTPException(status_code=404, detail="No clients found")
+
+        return fields.response(clients_data)
+
+    clients_cursor = db.clients.find({}, fields.projection)
+    if wants_ndjson(request):
+        return stream_ndjson(clients_cursor, fields.codec)
+
+    clients_data = await clients_cursor.to_list(length=None)
     if not clients_data:
         raise HTTPException(status_code=404, detail="No clients found")
 
-    for client in clients_data:
-        client["_id"] = str(client["_id"])
-
-    return [Client(**client) for client in clients_data]
+    return fields.response(clients_data)
 
 @router.get("/{client_id}")
-async def get_client(client_id: str) -> Client:
+async def get_client(client_id: str, fields: FieldSelection = Depends(client_fields)) -> Client:
     """Get a single client by its MongoDB ObjectId"""
     client_object_id = validate_object_id(client_id, "client")
-   
-    client_data = await db.clients.find_one({"_id": client_object_id})
+
+    client_data = await client_repository.get(client_object_id)
     if not client_data:
         raise HTTPException(status_code=404, detail="Client not found")
-   
-    client_data["_id"] = str(client_data["_id"])
-    return Client(**client_data)
+
+    return fields.response(client_data)
+
+
+async def _update_versioned(client_object_id: ObjectId, changes: dict, expected_version: Optional[int]) -> Client:
+    """
+    $set `changes` and bump the version, only if the client is still at
+    `expected_version` when one is given: 409 when it moved on, 404 when it is gone.
+    """
+    query = {"_id": client_object_id}
+    if expected_version is not None:
+        # clients created before versioning have no version field, they are at 0
+        query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+
+    updated_client = await db.clients.find_one_and_update(
+        query,
+        {"$set": changes, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    await client_repository.invalidate(client_object_id)
+    if not updated_client:
+        if expected_version is not None and await db.clients.count_documents({"_id": client_object_id}, limit=1):
+            raise HTTPException(status_code=409, detail="Client was modified by another request")
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    updated_client["_id"] = str(updated_client["_id"])
+    return Client(**updated_client)
 
 
 @router.put("/{client_id}")
 async def update_client(client_id: str, client: Client) -> Client:
-    """Update a client by its MongoDB ObjectId"""
+    """
+    Update a client by its MongoDB ObjectId.
+    When `version` is sent the update only applies if the client is still at
+    that version, otherwise it fails with 409 and nothing is written.
+    """
     client_object_id = validate_object_id(client_id, "client")
     
     client_dict = client.model_dump(by_alias=True, exclude_none=True)
     client_dict.pop("_id", None)
+    client_dict.pop("version", None)
+    # the model defaults version to 0, only a version the caller sent is a precondition
+    expected_version = client.version if "version" in client.model_fields_set else None
 
-    result = await db.clients.update_one({"_id": client_object_id}, {"$set": client_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Client not found")
+    return await _update_versioned(client_object_id, client_dict, expected_version)
 
-    updated_client = await db.clients.find_one({"_id": client_object_id})
-    if not updated_client:
-        raise HTTPException(status_code=404, detail="Client not found after update")
-    updated_client["_id"] = str(updated_client["_id"])
-    return Client(**updated_client)
+
+@router.patch("/{client_id}")
+async def patch_client(client_id: str, update: ClientUpdate) -> Client:
+    """
+    Partially update a client by its MongoDB ObjectId.
+    When `version` is sent the update only applies if the client is still at
+    that version, otherwise it fails with 409 and nothing is written.
+    """
+    client_object_id = validate_object_id(client_id, "client")
+
+    changes = update.model_dump(exclude_unset=True)
+    expected_version = changes.pop("version", None)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    return await _update_versioned(client_object_id, changes, expected_version)
 
 
 @router.delete("/{client_id}")
@@ -72,6 +134,7 @@ async def delete_client(client_id: str) -> None:
     client_object_id = validate_object_id(client_id, "client")
    
     result = await db.clients.delete_one({"_id": client_object_id})
+    await client_repository.invalidate(client_object_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -1,66 +1,130 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
 from typing import List
-from ..models.sale import Sale
+from ..models.sale import Sale, SalesRollup, RollupDimension, RollupGranularity
+from datetime import datetime
+from typing import Optional
+import logging
+from ..models.bulk import BulkResult
 from bson import ObjectId
 from bson.errors import InvalidId
 
 from ..db import db
 from ..utils.utils import validate_object_id
+from ..utils.streaming import stream_ndjson, wants_ndjson
+from ..utils.pagination import Page, SortOrder, paginate
+from ..utils.projection import FieldSelection, select_fields
+from ..services.bulk import bulk_insert
+from ..services.sales_rollup import get_rollups, record_sales
+from ..services.sale import insert_sale
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
+# Newest sales first, backed by the sale_date indexes in SALE_INDEXES
+sale_page = paginate("sale_date", SortOrder.DESC)
+sale_fields = select_fields(Sale)
+
+async def update_rollups(sales: list[dict]) -> None:
+    """Keep the analytics rollups in step with new sales without failing the sale itself"""
+    try:
+        await record_sales(sales)
+    except Exception:
+        # python -m app.manage rollups rebuild recomputes the buckets from the sales
+        logger.exception("Failed to update sales rollups")
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_sale(sale: Sale) -> Sale:
-    """Create a new sale in the database"""
+    """Create a new sale in the database, taking the book out of the bookstore's stock"""
     sale_dict = sale.model_dump(by_alias=True, exclude_none=True)
     sale_dict.pop("_id", None)
 
-    result = await db.sales.insert_one(sale_dict)
-    if not result.acknowledged:
-        raise HTTPException(status_code=500, detail="Failed to create sale")
+    inserted_id = await insert_sale(sale_dict)
 
-    sale_dict["_id"] = str(result.inserted_id)
+    await update_rollups([sale_dict])
+
+    sale_dict["_id"] = str(inserted_id)
     return Sale(**sale_dict)
 
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_sales(response: Response, sales: List[dict] = Body(...)) -> BulkResult:
+    """
+    Create many sales at once, reporting the outcome of every item.
+    Meant for syncing sales already settled at the point of sale, so stock is not touched.
+    """
+    result = await bulk_insert(db.sales, sales, Sale, on_inserted=update_rollups)
+    if result.error_count:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return result
+
+
+@router.get("/rollups/{dimension}/{key}")
+async def get_sales_rollups(
+    dimension: RollupDimension,
+    key: str,
+    granularity: RollupGranularity = RollupGranularity.DAY,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[SalesRollup]:
+    """Get revenue and sale counts of a bookstore or book per day or month"""
+    validate_object_id(key, dimension.value)
+
+    return await get_rollups(dimension, key, granularity, start, end)
+
+
 @router.get("/{sale_id}")
-async def get_sale(sale_id: str) -> Sale:
+async def get_sale(sale_id: str, fields: FieldSelection = Depends(sale_fields)) -> Sale:
     """Get a single sale by its MongoDB ObjectId"""
     sale_object_id = validate_object_id(sale_id, "sale")
 
-    sale_data = await db.sales.find_one({"_id": sale_object_id})
+    sale_data = await db.sales.find_one({"_id": sale_object_id}, fields.projection)
     if not sale_data:
         raise HTTPException(status_code=404, detail="Sale not found")
 
-    sale_data["_id"] = str(sale_data["_id"])
-    return Sale(**sale_data)
+    return fields.response(sale_data)
 
 
 @router.get("/client/{client_id}")
-async def get_sales_by_client(client_id: str) -> List[Sale]:
+async def get_sales_by_client(
+    client_id: str,
+    request: Request,
+    response: Response,
+    page: Page = Depends(sale_page),
+    fields: FieldSelection = Depends(sale_fields),
+) -> List[Sale]:
     """Get all sales for a specific client by their MongoDB ObjectId"""
     client_object_id = validate_object_id(client_id, "client")
 
-    sales_data = await db.sales.find({"client_id": str(client_object_id)}).to_list(length=None)
+    sales_cursor = page.find(db.sales, {"client_id": client_object_id}, fields.projection)
+    if wants_ndjson(request):
+        return stream_ndjson(sales_cursor, fields.codec)
+
+    sales_data = await page.fetch(sales_cursor, response)
     if not sales_data:
         raise HTTPException(status_code=404, detail="No sales found for this client")
 
-    for sale in sales_data:
-        sale["_id"] = str(sale["_id"])
-
-    return [Sale(**sale) for sale in sales_data]
+    return fields.response(sales_data, response)
 
 
 @router.get("/bookstore/{bookstore_id}")
-async def get_sales_by_bookstore(bookstore_id: str) -> List[Sale]:
+async def get_sales_by_bookstore(
+    bookstore_id: str,
+    request: Request,
+    response: Response,
+    page: Page = Depends(sale_page),
+    fields: FieldSelection = Depends(sale_fields),
+) -> List[Sale]:
     """Get all sales for a specific bookstore by its MongoDB ObjectId"""
     bookstore_object_id = validate_object_id(bookstore_id, "bookstore")
 
-    sales_data = await db.sales.find({"bookstore_id": str(bookstore_object_id)}).to_list(length=None)
+    sales_cursor = page.find(db.sales, {"bookstore_id": bookstore_object_id}, fields.projection)
+    if wants_ndjson(request):
+        return stream_ndjson(sales_cursor, fields.codec)
+
+    sales_data = await page.fetch(sales_cursor, response)
     if not sales_data:
         raise HTTPException(status_code=404, detail="No sales found for this bookstore")
 
-    for sale in sales_data:
-        sale["_id"] = str(sale["_id"])
-
-    return [Sale(**sale) for sale in sales_data]
\ No newline at end of file
+    return fields.response(sales_data, response)
\ No newline at end of file
@@ -1,44 +1,142 @@
-from fastapi import HTTPException
-from ..models.borrowing import Borrowing, BorrowingStatus
+from fastapi import HTTPException, Query
+from ..models.book import Book
+from ..models.bookstore import Bookstore
+from ..models.client import Client
+from ..models.borrowing import Borrowing, BorrowingExpand, BorrowingStatus, SourceType
 from datetime import datetime
+from typing import Optional
+import asyncio
 import logging
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
 
 from ..db import db
+from ..repository import Repository, books, bookstores, clients
+from ..utils.codec import ReadCodec, read_codec
+
+logger = logging.getLogger(__name__)
 
 async def process_borrowing_return(borrowing_id : ObjectId) -> Borrowing:
-    """Mark a borrowing as returned by its MongoDB ObjectId"""
+    """
+    Mark a borrowing as returned by its MongoDB ObjectId.
+
+    One conditional find_one_and_update: only loans that are not returned yet
+    match, the RETURNED vs RETURNED_OVERDUE status is decided by the server
+    against the stored due_date, and the updated document comes back.
+    """
     now = datetime.now()
 
-    borrowing_data = await db.borrowings.find_one({'_id': borrowing_id})
-    print(f"Found borrowing data: {borrowing_data}")
+    borrowing_data = await db.borrowings.find_one_and_update(
+        {"_id": borrowing_id, "status": {"$in": [BorrowingStatus.ACTIVE, BorrowingStatus.OVERDUE]}},
+        [{"$set": {
+            "return_date": now,
+            "status": {"$cond": [
+                {"$gt": [now, "$due_date"]},
+                BorrowingStatus.RETURNED_OVERDUE,
+                BorrowingStatus.RETURNED
+            ]}
+        }}],
+        return_document=ReturnDocument.AFTER,
+    )
     if not borrowing_data:
-        raise HTTPException(status_code=404, detail="Borrowing not found")
-    
+        # only on failure: tell a missing borrowing from an already returned one
+        if not await db.borrowings.count_documents({"_id": borrowing_id}, limit=1):
+            raise HTTPException(status_code=404, detail="Borrowing not found")
+        raise HTTPException(status_code=409, detail="Borrowing already returned")
+    logger.debug(f"Returned borrowing {borrowing_id}: {borrowing_data['status']}")
 
     borrowing_data["_id"] = str(borrowing_data["_id"])
-    borrowing_data["source_id"] = str(borrowing_data["source_id"])
-    borrowing_data["borrower_id"] = str(borrowing_data["borrower_id"])
-    borrowing_data["book_id"] = str(borrowing_data["book_id"])
     borrowing = Borrowing(**borrowing_data)
-    overdue : bool = now > borrowing.due_date
 
-    result = await db.borrowings.update_one(
-        {"_id": borrowing_id},
-        {"$set": {"return_date": now, "status": BorrowingStatus.RETURNED_OVERDUE if overdue else BorrowingStatus.RETURNED}},
-    )
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Borrowing already returned")
-    
-    if overdue:
+    if borrowing.status == BorrowingStatus.RETURNED_OVERDUE:
         apply_overdue_fee(borrowing.borrower_id, borrowing)
-    
-    borrowing.return_date = now
-    borrowing.status = BorrowingStatus.RETURNED_OVERDUE if overdue else BorrowingStatus.RETURNED
+
     return borrowing
-        
+
 def apply_overdue_fee(borrower_id: str, borrowing: Borrowing) -> None:
     """Apply an overdue fee to the borrower if the borrowing is overdue"""
-    logging.warning(f"TODO: Apply overdue fee to borrower {borrower_id}")
-    logging.warning(f"Due date: {borrowing.due_date}; Return date: {borrowing.return_date}")
-    pass
\ No newline at end of file
+    logger.warning(f"TODO: Apply overdue fee to borrower {borrower_id}")
+    logger.warning(f"Due date: {borrowing.due_date}; Return date: {borrowing.return_date}")
+    pass
+
+
+# Field holding the id of each expandable reference
+REFERENCE_FIELDS = {
+    BorrowingExpand.BOOK: "book_id",
+    BorrowingExpand.BORROWER: "borrower_id",
+    BorrowingExpand.SOURCE: "source_id",
+}
+
+
+def _reference_id(value) -> Optional[ObjectId]:
+    # every writer stores ObjectIds; hex strings are legacy rows `migrate refs` has not rewritten yet
+    if value is None:
+        return None
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+class BorrowingExpansion:
+    """
+    References to inline in borrowing responses, picked with `expand=`.
+
+    The referenced documents of a whole page are looked up together: cache
+    misses of every row go through the repositories' batch loaders, so a
+    page costs at most one $in query per referenced collection, whatever
+    its size.
+    """
+
+    def __init__(self, expand: frozenset[BorrowingExpand] = frozenset()):
+        self.expand = expand
+
+    def projection(self, projection: Optional[dict]) -> Optional[dict]:
+        """`projection` widened with the reference fields the expansion reads."""
+        if projection is None or not self.expand:
+            return projection
+        return {**projection, "source_type": 1, **{REFERENCE_FIELDS[name]: 1 for name in self.expand}}
+
+    def _target(self, name: BorrowingExpand, document: dict) -> tuple[Repository, ReadCodec]:
+        if name == BorrowingExpand.BOOK:
+            return books, read_codec(Book)
+        if name == BorrowingExpand.SOURCE and document.get("source_type") == SourceType.BOOKSTORE:
+            return bookstores, read_codec(Bookstore)
+        return clients, read_codec(Client)
+
+    async def apply(self, documents: list[dict], rows: list[dict]) -> None:
+        """Add the expanded references of `documents` to their rendered `rows`, None when missing."""
+        if not self.expand:
+            return
+
+        lookups = []
+        for document, row in zip(documents, rows):
+            for name in self.expand:
+                reference = _reference_id(document.get(REFERENCE_FIELDS[name]))
+                if reference is None:
+                    row[name.value] = None
+                    continue
+                repository, codec = self._target(name, document)
+                lookups.append((row, name.value, codec, repository.get(reference)))
+
+        found = await asyncio.gather(*(lookup for *_, lookup in lookups))
+        for (row, key, codec, _), document in zip(lookups, found):
+            row[key] = codec.row(document) if document else None
+
+
+def borrowing_expansion(
+    expand: Optional[str] = Query(None, description="Comma-separated references to include: book, borrower, source"),
+) -> BorrowingExpansion:
+    """Dependency reading `expand` from the query string, 400 on unknown references."""
+    if not expand:
+        return BorrowingExpansion()
+
+    names = [name.strip() for name in expand.split(",") if name.strip()]
+    try:
+        return BorrowingExpansion(frozenset(BorrowingExpand(name) for name in names))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown expand value in {expand!r}, use {', '.join(name.value for name in BorrowingExpand)}"
+        )
@@ -0,0 +1,78 @@
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+from typing import Awaitable, Callable, Optional
+
+from ..config import settings
+from ..models.bulk import BulkItemResult, BulkResult
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors(include_url=False)
+    )
+
+
+async def bulk_insert(
+    collection: AsyncIOMotorCollection,
+    items: list[dict],
+    model: type[BaseModel],
+    on_inserted: Optional[Callable[[list[dict]], Awaitable[None]]] = None,
+) -> BulkResult:
+    """
+    Validate `items` one by one against `model` and insert the valid ones
+    with a single unordered `insert_many`.
+
+    Invalid items and items rejected by the server (e.g. duplicate keys) are
+    reported per index and do not stop the rest of the batch. `on_inserted`
+    receives the documents that were actually written.
+    """
+    if len(items) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} items can be inserted per request"
+        )
+
+    results = [BulkItemResult(index=index) for index in range(len(items))]
+    documents = []
+    positions = []  # request index of every document sent to Mongo
+
+    for index, item in enumerate(items):
+        try:
+            document = model.model_validate(item).model_dump(by_alias=True, exclude_none=True)
+        except ValidationError as e:
+            results[index].error = _validation_message(e)
+            continue
+
+        # assign ids up front so inserted documents map back to request items
+        document["_id"] = ObjectId()
+        documents.append(document)
+        positions.append(index)
+
+    write_errors = {}
+    if documents:
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+
+    inserted = []
+    for position, (index, document) in enumerate(zip(positions, documents)):
+        if position in write_errors:
+            results[index].error = write_errors[position]
+        else:
+            results[index].id = str(document["_id"])
+            inserted.append(document)
+
+    if inserted and on_inserted is not None:
+        await on_inserted(inserted)
+
+    error_count = sum(1 for result in results if result.error)
+    return BulkResult(
+        inserted_count=len(results) - error_count,
+        error_count=error_count,
+        results=results
+    )
@@ -0,0 +1,106 @@
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from bson import ObjectId
+from typing import Optional
+import logging
+import random
+
+from ..config import settings
+from ..db import db, run_transaction, transactions_supported
+from ..utils.isbn import normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+
+def inventory_isbn(isbn: str) -> Optional[str]:
+    """ISBN of a book as stored in book_inventories, None if it cannot be stocked."""
+    try:
+        return normalize_isbn(isbn)
+    except ValueError:
+        # books stored before ISBNs were validated, see `python -m app.manage migrate isbn`
+        return None
+
+
+async def reserve_stock(bookstore_id: ObjectId, isbn: str, session: Optional[AsyncIOMotorClientSession] = None) -> bool:
+    """
+    Take one copy of a book from a bookstore's stock.
+
+    The decrement is a conditional $inc, so stock never goes below zero and
+    concurrent buyers cannot oversell. Hot items can have their stock striped
+    across several `slot` documents (see `stripe_stock`): every buyer starts on
+    a random stripe so concurrent purchases of the same item rarely update the
+    same document. Returns False when the bookstore is out of stock.
+    """
+    in_stock = {"bookstore_id": bookstore_id, "isbn": isbn, "quantity_available": {"$gte": 1}}
+    take_one = {"$inc": {"quantity_available": -1}}
+
+    # unstriped stock has no slot, so it matches here too in a single round trip
+    slot = random.randrange(settings.inventory_stripe_slots)
+    result = await db.book_inventories.update_one({**in_stock, "slot": {"$in": [slot, None]}}, take_one, session=session)
+    if result.modified_count:
+        return True
+
+    # that stripe ran dry, take from any stripe that still has stock
+    result = await db.book_inventories.update_one(in_stock, take_one, session=session)
+    return result.modified_count == 1
+
+
+async def release_stock(bookstore_id: ObjectId, isbn: str, session: Optional[AsyncIOMotorClientSession] = None) -> None:
+    """Put one copy of a book back into a bookstore's stock."""
+    await db.book_inventories.update_one(
+        {"bookstore_id": bookstore_id, "isbn": isbn},
+        {"$inc": {"quantity_available": 1}},
+        session=session
+    )
+
+
+async def stripe_stock(bookstore_id: ObjectId, isbn: str, slots: Optional[int] = None) -> int:
+    """
+    Split the stock of a book in a bookstore evenly across `slots` documents.
+
+    Use it for bestsellers whose single inventory document becomes a write
+    hotspot; `slots=1` merges the stripes back into one document. Stripe
+    counts above INVENTORY_STRIPE_SLOTS are never picked first by
+    `reserve_stock`. Returns the total quantity.
+
+    On a standalone mongod there is no transaction to make the restripe
+    atomic: run it while the item is not selling.
+    """
+    slots = slots or settings.inventory_stripe_slots
+    key = {"bookstore_id": bookstore_id, "isbn": isbn}
+
+    async def restripe(session: Optional[AsyncIOMotorClientSession]) -> int:
+        stock = await db.book_inventories.find(key, session=session).to_list(length=None)
+        total = sum(inventory["quantity_available"] for inventory in stock)
+
+        await db.book_inventories.delete_many(key, session=session)
+        if slots == 1:
+            await db.book_inventories.insert_one({**key, "quantity_available": total}, session=session)
+        else:
+            await db.book_inventories.insert_many([
+                {**key, "quantity_available": total // slots + (1 if slot < total % slots else 0), "slot": slot}
+                for slot in range(slots)
+            ], session=session)
+        return total
+
+    if await transactions_supported():
+        total = await run_transaction(restripe)
+    else:
+        logger.warning("No transactions on a standalone mongod, restriping without one")
+        total = await restripe(None)
+    logger.info(f"Striped stock of {isbn} in bookstore {bookstore_id}", extra={"slots": slots, "quantity": total})
+    return total
+
+
+async def get_availability(isbn: str) -> list[dict]:
+    """
+    Copies of a book in stock per bookstore, most stocked first.
+
+    One aggregation covered by the (isbn, bookstore_id, quantity_available)
+    index: only the inventory entries of this ISBN are read, stripes
+    included, and no document is fetched.
+    """
+    return await db.book_inventories.aggregate([
+        {"$match": {"isbn": isbn, "quantity_available": {"$gt": 0}}},
+        {"$group": {"_id": "$bookstore_id", "quantity": {"$sum": "$quantity_available"}}},
+        {"$sort": {"quantity": -1, "_id": 1}},
+    ]).to_list(length=None)
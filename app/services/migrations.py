@@ -0,0 +1,203 @@
+"""
+Resumable in-place data migrations.
+
+A migration walks one collection in _id order, a batch at a time, and
+rewrites the documents that still have the old shape. Its progress is
+checkpointed in the `migrations` collection after every batch, so an
+interrupted run picks up where it stopped. Updates only apply if the
+fields are still as they were read, so the API can keep writing while a
+migration runs.
+"""
+from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Awaitable, Callable, Optional
+import logging
+import time
+
+from ..db import db
+from ..utils.isbn import ISBN13_PATTERN, normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+# Failed rewrites and conflicts kept in a checkpoint, enough to act on without bloating it
+MAX_REPORTED = 100
+
+
+class Migration:
+    """
+    Rewrite of the documents of `collection` matching `query` with the `$set` returned by `transform`.
+
+    `check`, if given, looks for what the migration cannot fix by itself once
+    it is done (e.g. duplicates a unique index would refuse) and returns it.
+    """
+
+    def __init__(self, name: str, collection: str, query: dict, fields: list[str], transform: Callable[[dict], dict],
+                 check: Optional[Callable[..., Awaitable[list[dict]]]] = None):
+        self.name = name
+        self.collection = collection
+        self.query = query
+        self.fields = fields
+        self.transform = transform
+        self.check = check
+
+
+def references_to_object_ids(name: str, collection: str, fields: list[str]) -> Migration:
+    """Migration storing the reference `fields` of `collection` as ObjectIds instead of hex strings."""
+
+    def transform(document: dict) -> dict:
+        # strings that are not ObjectIds are left alone and counted as skipped
+        return {
+            field: ObjectId(document[field])
+            for field in fields
+            if isinstance(document.get(field), str) and ObjectId.is_valid(document[field])
+        }
+
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    return Migration(name, collection, query, fields, transform)
+
+
+async def duplicate_isbns(collection) -> list[dict]:
+    """ISBNs stored on more than one document, with their ids: what keeps the unique books.isbn index from building."""
+    return await collection.aggregate([
+        {"$group": {"_id": "$isbn", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"_id": 1}},
+        {"$limit": MAX_REPORTED},
+        {"$project": {"_id": 0, "isbn": "$_id", "ids": 1}},
+    ], allowDiskUse=True).to_list(length=None)
+
+
+def normalize_isbns(name: str, collection: str, check: Optional[Callable[..., Awaitable[list[dict]]]] = None) -> Migration:
+    """Migration storing the `isbn` of `collection` as its canonical ISBN-13 string."""
+
+    def transform(document: dict) -> dict:
+        # values that are not ISBNs at all are left alone and counted as skipped
+        try:
+            return {"isbn": normalize_isbn(document["isbn"])}
+        except (KeyError, TypeError, ValueError):
+            return {}
+
+    query = {"isbn": {"$exists": True, "$not": {"$regex": ISBN13_PATTERN}}}
+    return Migration(name, collection, query, ["isbn"], transform, check)
+
+
+# Migrations by command name, each one runs its steps in order
+MIGRATIONS: dict[str, list[Migration]] = {
+    "refs": [
+        references_to_object_ids("refs.borrowings", "borrowings", ["borrower_id", "source_id", "book_id"]),
+        references_to_object_ids("refs.sales", "sales", ["client_id", "book_id", "bookstore_id"]),
+        references_to_object_ids("refs.book_inventories", "book_inventories", ["bookstore_id"]),
+    ],
+    "isbn": [
+        # books are unique per ISBN: two spellings of one ISBN are reported, not merged
+        normalize_isbns("isbn.books", "books", check=duplicate_isbns),
+        normalize_isbns("isbn.book_inventories", "book_inventories"),
+    ],
+}
+
+
+async def run_migration(migration: Migration, batch_size: int = 1000, restart: bool = False) -> dict:
+    """
+    Run `migration` from its last checkpoint, or from the start with `restart`.
+
+    Returns the checkpoint: documents scanned, updated and skipped (matched
+    the query but had nothing to rewrite, or changed since they were read),
+    the rewrites the server refused (`failed`) and what the migration's check
+    found (`conflicts`). The check runs again on every call, so a finished
+    migration reports whether the conflicts have been resolved since.
+    """
+    if restart:
+        await db.migrations.delete_one({"_id": migration.name})
+    checkpoint = await db.migrations.find_one({"_id": migration.name}) or {
+        "_id": migration.name, "last_id": None, "scanned": 0, "updated": 0, "skipped": 0, "done": False,
+    }
+    checkpoint.setdefault("failed", [])  # checkpoints written before failures were recorded
+    collection = db[migration.collection]
+    if checkpoint["done"]:
+        logger.info(f"Migration {migration.name} already done")
+        return await _check(migration, collection, checkpoint)
+
+    started = time.monotonic()
+    scanned_at_start = checkpoint["scanned"]
+
+    while True:
+        query = migration.query
+        if checkpoint["last_id"] is not None:
+            query = {"$and": [query, {"_id": {"$gt": checkpoint["last_id"]}}]}
+        batch = await collection.find(query, migration.fields).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        updates, rewrites = [], []
+        for document in batch:
+            changes = migration.transform(document)
+            if changes:
+                # only documents nobody rewrote since we read them
+                unchanged = {field: document[field] for field in changes}
+                updates.append(UpdateOne({"_id": document["_id"], **unchanged}, {"$set": changes}))
+                rewrites.append({"_id": document["_id"], **unchanged, "to": changes})
+
+        updated, failed = await _write(collection, migration, updates) if updates else (0, {})
+        checkpoint["failed"] = (
+            checkpoint["failed"] + [{**rewrites[index], "error": message} for index, message in failed.items()]
+        )[:MAX_REPORTED]
+        checkpoint["last_id"] = batch[-1]["_id"]
+        checkpoint["scanned"] += len(batch)
+        checkpoint["updated"] += updated
+        checkpoint["skipped"] += len(batch) - updated
+        await _save(checkpoint)
+
+        rate = (checkpoint["scanned"] - scanned_at_start) / max(time.monotonic() - started, 1e-9)
+        logger.info(
+            f"Migration {migration.name}: {checkpoint['scanned']} scanned, {checkpoint['updated']} updated",
+            extra={"skipped": checkpoint["skipped"], "last_id": str(checkpoint["last_id"]), "docs_per_second": round(rate)}
+        )
+
+    checkpoint["done"] = True
+    logger.info(f"Migration {migration.name} done", extra={"updated": checkpoint["updated"], "skipped": checkpoint["skipped"]})
+    return await _check(migration, collection, checkpoint)
+
+
+async def _check(migration: Migration, collection, checkpoint: dict) -> dict:
+    """Run the migration's check, if any, and save its findings with the checkpoint."""
+    if migration.check is not None:
+        checkpoint["conflicts"] = await migration.check(collection)
+        if checkpoint["conflicts"]:
+            logger.warning(f"Migration {migration.name} left {len(checkpoint['conflicts'])} conflicts to resolve")
+    await _save(checkpoint)
+    return checkpoint
+
+
+async def _write(collection, migration: Migration, updates: list[UpdateOne]) -> tuple[int, dict[int, str]]:
+    """Apply a batch of updates, returns how many documents were modified and the error of each refused update by index."""
+    try:
+        return (await collection.bulk_write(updates, ordered=False)).modified_count, {}
+    except BulkWriteError as error:
+        # e.g. two spellings of one ISBN colliding on a unique index: the rest of the batch still applies
+        for write_error in error.details["writeErrors"]:
+            logger.warning(
+                f"Migration {migration.name} could not rewrite a document: {write_error['errmsg']}",
+                extra={"code": write_error["code"]}
+            )
+        failed = {write_error["index"]: write_error["errmsg"] for write_error in error.details["writeErrors"]}
+        return error.details["nModified"], failed
+
+
+async def _save(checkpoint: dict) -> None:
+    await db.migrations.replace_one(
+        {"_id": checkpoint["_id"]},
+        {**checkpoint, "updated_at": datetime.now()},
+        upsert=True
+    )
+
+
+async def migration_status(name: Optional[str] = None) -> list[dict]:
+    """Checkpoints of every migration step, or of the steps of `name`."""
+    steps = MIGRATIONS[name] if name else [step for steps in MIGRATIONS.values() for step in steps]
+    status = []
+    for migration in steps:
+        checkpoint = await db.migrations.find_one({"_id": migration.name}) or {"_id": migration.name, "done": False}
+        status.append(checkpoint)
+    return status
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from ..config import settings
+from ..db import db
+from ..models.borrowing import BorrowingStatus
+
+logger = logging.getLogger(__name__)
+
+LOCK_ID = "overdue_sweeper"
+
+
+class OverdueSweeper:
+    """
+    Periodically moves active borrowings past their due date to OVERDUE.
+
+    Every worker runs the loop but only the holder of a lease in the `locks`
+    collection sweeps, so one deployment does the work once per interval.
+    """
+
+    def __init__(self, interval: float, chunk_size: int, lock_ttl: float):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.lock_ttl = lock_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+        # metrics
+        self.is_leader = False
+        self.runs = 0
+        self.transitioned_total = 0
+        self.last_transitioned = 0
+        self.last_run_at: Optional[datetime] = None
+
+    async def acquire_lock(self) -> bool:
+        """Take or renew the lease. Returns whether this worker is the leader."""
+        now = datetime.now()
+        try:
+            lock = await db.locks.find_one_and_update(
+                {"_id": LOCK_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lock_ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # the lock exists and is held by another worker
+            lock = None
+
+        self.is_leader = lock is not None
+        return self.is_leader
+
+    async def release_lock(self) -> None:
+        await db.locks.delete_one({"_id": LOCK_ID, "owner": self.owner})
+        self.is_leader = False
+
+    async def sweep(self) -> int:
+        """
+        Transition overdue borrowings in chunks of `chunk_size`.
+
+        Each chunk is an index-backed lookup on (status, due_date) followed by
+        one update_many, so a large backlog never becomes one huge write.
+        """
+        now = datetime.now()
+        overdue = {"status": BorrowingStatus.ACTIVE, "due_date": {"$lt": now}}
+        transitioned = 0
+
+        while True:
+            chunk = await db.borrowings.find(overdue, {"_id": 1}).limit(self.chunk_size).to_list(self.chunk_size)
+            if not chunk:
+                break
+
+            result = await db.borrowings.update_many(
+                {"_id": {"$in": [borrowing["_id"] for borrowing in chunk]}, **overdue},
+                {"$set": {"status": BorrowingStatus.OVERDUE}},
+            )
+            transitioned += result.modified_count
+            if len(chunk) < self.chunk_size:
+                break
+
+        self.runs += 1
+        self.last_run_at = now
+        self.last_transitioned = transitioned
+        self.transitioned_total += transitioned
+        logger.info("Overdue sweep finished", extra={"transitioned": transitioned})
+        return transitioned
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if await self.acquire_lock():
+                    await self.sweep()
+            except Exception:
+                logger.exception("Overdue sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self.is_leader:
+            try:
+                await self.release_lock()
+            except Exception:
+                # the lease simply expires after lock_ttl
+                logger.exception("Could not release the overdue sweeper lock")
+
+    def stats(self) -> dict:
+        return {
+            "is_leader": self.is_leader,
+            "runs": self.runs,
+            "transitioned_total": self.transitioned_total,
+            "last_transitioned": self.last_transitioned,
+            "last_run_at": self.last_run_at,
+        }
+
+
+overdue_sweeper = OverdueSweeper(
+    interval=settings.overdue_sweep_interval_seconds,
+    chunk_size=settings.overdue_sweep_chunk_size,
+    lock_ttl=settings.overdue_sweep_lock_ttl_seconds,
+)
@@ -0,0 +1,48 @@
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from bson import ObjectId
+from typing import Optional
+
+from ..config import settings
+from ..db import db, run_transaction, transactions_supported
+from ..repository import books
+from .inventory import inventory_isbn, release_stock, reserve_stock
+from .write_buffer import sales_buffer
+
+
+async def insert_sale(sale_dict: dict) -> ObjectId:
+    """
+    Insert a sale and take the sold copy out of the bookstore's stock.
+
+    With SALE_TRANSACTIONS the decrement and the insert commit together, and
+    write conflicts on the inventory document are retried by the driver.
+    Without it, on a standalone mongod (no transactions there) or with
+    GROUP_COMMIT_ENABLED (a batched insert cannot join the request's
+    transaction), the decrement is undone if the insert fails.
+
+    Raises: HTTPException: 404 if the book does not exist, 409 if it is out of stock
+    """
+    book_data = await books.get(sale_dict["book_id"])
+    if not book_data:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    bookstore_id = sale_dict["bookstore_id"]
+    isbn = inventory_isbn(book_data["isbn"])
+
+    async def sell(session: Optional[AsyncIOMotorClientSession] = None) -> ObjectId:
+        if isbn is None or not await reserve_stock(bookstore_id, isbn, session=session):
+            raise HTTPException(status_code=409, detail="Book is out of stock at this bookstore")
+
+        try:
+            if session is None:
+                return await sales_buffer.insert(sale_dict)
+            return (await db.sales.insert_one(sale_dict, session=session)).inserted_id
+        except Exception:
+            if session is None:
+                # no transaction to roll back, give the copy back ourselves
+                await release_stock(bookstore_id, isbn)
+            raise
+
+    if settings.sale_transactions and not settings.group_commit_enabled and await transactions_supported():
+        return await run_transaction(sell)
+    return await sell()
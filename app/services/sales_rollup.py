@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from typing import Iterable, Optional
+import logging
+
+from ..db import db
+from ..models.sale import SALES_ROLLUP_INDEXES, RollupDimension, RollupGranularity, SalesRollup
+
+logger = logging.getLogger(__name__)
+
+# Sale field holding the key of every rollup dimension
+DIMENSION_FIELDS = {
+    RollupDimension.BOOKSTORE: "bookstore_id",
+    RollupDimension.BOOK: "book_id",
+}
+
+# Where rebuild_rollups writes before swapping the buckets in
+REBUILD_COLLECTION = "sales_rollups_rebuild"
+
+
+def bucket_start(date: datetime, granularity: RollupGranularity) -> datetime:
+    """Start of the day or month `date` falls in, in UTC as $dateTrunc in `rebuild_rollups` does."""
+    if date.tzinfo is not None:
+        # Mongo stores aware datetimes as UTC, bucket them as the rebuild will read them back
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    if granularity == RollupGranularity.MONTH:
+        return datetime(date.year, date.month, 1)
+    return datetime(date.year, date.month, date.day)
+
+
+async def record_sales(sales: Iterable[dict]) -> None:
+    """
+    Add sales to their rollup buckets with one unordered bulk of $inc upserts.
+
+    Sales hitting the same bucket are summed here first, so a bulk insert of
+    many sales for one store costs a handful of updates, not one per sale.
+    """
+    increments: dict[tuple, list] = defaultdict(lambda: [0.0, 0])
+    for sale in sales:
+        for dimension, field in DIMENSION_FIELDS.items():
+            for granularity in RollupGranularity:
+                bucket = (dimension.value, str(sale[field]), granularity.value, bucket_start(sale["sale_date"], granularity))
+                increments[bucket][0] += sale["amount"]
+                increments[bucket][1] += 1
+
+    if not increments:
+        return
+
+    await db.sales_rollups.bulk_write([
+        UpdateOne(
+            {"dimension": dimension, "key": key, "granularity": granularity, "period": period},
+            {"$inc": {"revenue": revenue, "count": count}},
+            upsert=True
+        )
+        for (dimension, key, granularity, period), (revenue, count) in increments.items()
+    ], ordered=False)
+
+
+async def get_rollups(
+    dimension: RollupDimension,
+    key: str,
+    granularity: RollupGranularity,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list[SalesRollup]:
+    """Buckets of one bookstore or book in [start, end), oldest first."""
+    query = {"dimension": dimension, "key": key, "granularity": granularity}
+    if start or end:
+        query["period"] = {}
+        if start:
+            query["period"]["$gte"] = bucket_start(start, granularity)
+        if end:
+            query["period"]["$lt"] = end
+
+    rollups = await db.sales_rollups.find(query, {"_id": 0}).sort("period", 1).to_list(length=None)
+    return [SalesRollup(**rollup) for rollup in rollups]
+
+
+async def rebuild_rollups() -> int:
+    """
+    Recompute every rollup bucket from the raw sales.
+
+    The buckets are built into a scratch collection and swapped in with one
+    rename, so readers keep the old rollups until the new ones are complete
+    and a failed rebuild leaves them untouched. Sales recorded while it runs
+    may be missing from the new buckets until the next rebuild. Returns the
+    number of buckets written.
+    """
+    rebuild = db[REBUILD_COLLECTION]
+    await rebuild.drop()  # leftovers of an interrupted rebuild
+    await rebuild.create_indexes(SALES_ROLLUP_INDEXES)  # $merge needs the unique bucket index
+
+    for dimension, field in DIMENSION_FIELDS.items():
+        for granularity in RollupGranularity:
+            logger.info(f"Rebuilding {dimension.value} rollups by {granularity.value}")
+            pipeline = [
+                {"$group": {
+                    # keys may be stored as strings or ObjectIds, rollups always use strings
+                    "_id": {
+                        "key": {"$toString": f"${field}"},
+                        "period": {"$dateTrunc": {"date": "$sale_date", "unit": granularity.value}},
+                    },
+                    "revenue": {"$sum": "$amount"},
+                    "count": {"$sum": 1},
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "dimension": {"$literal": dimension.value},
+                    "key": "$_id.key",
+                    "granularity": {"$literal": granularity.value},
+                    "period": "$_id.period",
+                    "revenue": 1,
+                    "count": 1,
+                }},
+                {"$merge": {
+                    "into": REBUILD_COLLECTION,
+                    "on": ["dimension", "key", "granularity", "period"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                }},
+            ]
+            await db.sales.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+    buckets = await rebuild.count_documents({})
+    # the indexes move with the collection; the old rollups are dropped in the same step
+    await rebuild.rename("sales_rollups", dropTarget=True)
+    logger.info(f"Swapped in {buckets} rebuilt rollup buckets")
+    return buckets
@@ -0,0 +1,228 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+from bson import ObjectId
+from datetime import timedelta
+from typing import Iterable, Optional
+import asyncio
+import bisect
+import logging
+import re
+import time
+import unicodedata
+
+from ..config import settings
+from ..db import db
+from ..models.book import BookSearchResult
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# Highest code point: prefix + _MAX_CHAR sorts after every word starting with prefix
+_MAX_CHAR = chr(0x10FFFF)
+
+# ObjectIds are made by the clients: a book inserted by another worker can commit after one
+# with a higher _id. Refreshes read back this far behind the watermark to pick those up
+_REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Lower-cased words of `text` with accents removed ("Émile" -> "emile")."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(char for char in text if not unicodedata.combining(char)))
+
+
+class PrefixIndex:
+    """
+    In-memory autocomplete index over book titles, authors and genres.
+
+    Keeps the sorted vocabulary of distinct words and, per word, the ids of the
+    books using it. A prefix lookup is a binary search for the range of words
+    starting with it, so queries stay in the microseconds even on millions of
+    books. Built from the `books` collection and kept up to date with `add`,
+    `remove` and `refresh` (new books written by other workers). Deletes and
+    edits made by other workers are only seen by `rebuild`.
+    """
+
+    def __init__(self):
+        self._words: list[str] = []  # sorted vocabulary
+        self._postings: dict[str, list[str]] = {}
+        self._books: dict[str, tuple[str, str, Optional[str], tuple[str, ...]]] = {}
+        self.watermark: Optional[ObjectId] = None  # highest _id loaded from Mongo
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def _index(self, book: dict) -> list[str]:
+        """Index a book and return the words that were new to the vocabulary."""
+        book_id = str(book["_id"])
+        if book_id in self._books:
+            return []
+
+        new_words = []
+        words = tuple(set(tokenize(book["title"]) + tokenize(book["author"]) + tokenize(book.get("genre"))))
+        self._books[book_id] = (book["title"], book["author"], book.get("genre"), words)
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = []
+                new_words.append(word)
+            postings.append(book_id)
+        return new_words
+
+    def add(self, book: dict) -> None:
+        for word in self._index(book):
+            bisect.insort(self._words, word)
+
+    def remove(self, book_id: str) -> None:
+        # postings are cleaned lazily, search skips ids that are gone
+        self._books.pop(book_id, None)
+
+    def _words_with_prefix(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + _MAX_CHAR, start)
+        return self._words[start:end]
+
+    def _count_postings(self, words: list[str], cap: int = 100000) -> int:
+        """Number of book ids behind `words`, counted up to `cap`."""
+        count = 0
+        for word in words:
+            count += len(self._postings[word])
+            if count >= cap:
+                break
+        return count
+
+    def search(self, query: str, limit: int = 10) -> list[BookSearchResult]:
+        """
+        Books having a word starting with every word of `query`.
+
+        Words are visited in vocabulary order, so an exact word match comes
+        before longer words sharing the prefix ("harry" before "harrying").
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # walk the postings of the most selective term, check the others per book
+        matches = {term: self._words_with_prefix(term) for term in terms}
+        driver = min(terms, key=lambda term: self._count_postings(matches[term]))
+        others = [term for term in terms if term != driver]
+        results = []
+        seen = set()
+
+        for word in matches[driver]:
+            for book_id in self._postings[word]:
+                book = self._books.get(book_id)
+                if book is None or book_id in seen:
+                    continue
+                seen.add(book_id)
+
+                if others and not all(any(other.startswith(term) for other in book[3]) for term in others):
+                    continue
+
+                results.append(BookSearchResult(_id=book_id, title=book[0], author=book[1], genre=book[2]))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _load(self, books: Iterable[dict]) -> None:
+        # one sort per batch instead of one sorted insert per new word
+        new_words = []
+        for book in books:
+            new_words.extend(self._index(book))
+            if self.watermark is None or book["_id"] > self.watermark:
+                self.watermark = book["_id"]
+
+        if new_words:
+            self._words.extend(new_words)
+            self._words.sort()
+
+    async def refresh(self, collection: AsyncIOMotorCollection, batch_size: int = 10000) -> int:
+        """Load the books inserted since the last build or refresh, returns how many were read."""
+        query = {}
+        if self.watermark:
+            # books already indexed are read again but skipped
+            query = {"_id": {"$gt": ObjectId.from_datetime(self.watermark.generation_time - _REFRESH_OVERLAP)}}
+        books = collection.find(query, {"title": 1, "author": 1, "genre": 1}).sort("_id", 1).batch_size(batch_size)
+
+        loaded = 0
+        batch = []
+        async for book in books:
+            batch.append(book)
+            if len(batch) >= batch_size:
+                self._load(batch)
+                loaded += len(batch)
+                batch = []
+                await asyncio.sleep(0)  # let requests run between batches
+        self._load(batch)
+        return loaded + len(batch)
+
+    async def rebuild(self, collection: AsyncIOMotorCollection, batch_size: int = 10000) -> int:
+        """Build a fresh index from `collection` and swap it in, dropping deleted books and stale words."""
+        fresh = PrefixIndex()
+        loaded = await fresh.refresh(collection, batch_size)
+        # searches keep using the old index until here, nothing awaits during the swap
+        self._words, self._postings, self._books = fresh._words, fresh._postings, fresh._books
+        self.watermark = fresh.watermark
+        return loaded
+
+
+prefix_index = PrefixIndex()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _maintain_prefix_index() -> None:
+    rebuilt_at = time.monotonic()
+    while True:
+        try:
+            if prefix_index.ready and time.monotonic() - rebuilt_at >= settings.search_rebuild_seconds:
+                loaded = await prefix_index.rebuild(db.books)
+                rebuilt_at = time.monotonic()
+                logger.info(f"Book prefix index rebuilt with {loaded} books")
+            else:
+                loaded = await prefix_index.refresh(db.books)
+            if not prefix_index.ready:
+                prefix_index.ready = True
+                logger.info(f"Book prefix index built with {loaded} books")
+        except Exception:
+            logger.exception("Failed to refresh the book prefix index")
+        await asyncio.sleep(settings.search_refresh_seconds)
+
+
+def start_prefix_index() -> None:
+    """Build the prefix index in the background, then keep loading new books and rebuild it now and then."""
+    global _refresh_task
+    if settings.search_prefix_index and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_maintain_prefix_index())
+
+
+async def stop_prefix_index() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+async def search_books(query: str, limit: int) -> list[BookSearchResult]:
+    """Ranked full-text search over title, author and genre using the book_text index."""
+    books = await db.books.find(
+        {"$text": {"$search": query}},
+        {"title": 1, "author": 1, "genre": 1, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+
+    for book in books:
+        book["_id"] = str(book["_id"])
+    return [BookSearchResult(**book) for book in books]
+
+
+async def autocomplete_books(query: str, limit: int) -> list[BookSearchResult]:
+    """Prefix matches from the in-process index, falling back to text search while it builds."""
+    if prefix_index.ready:
+        return prefix_index.search(query, limit)
+    return await search_books(query, limit)
@@ -0,0 +1,137 @@
+"""
+Group commit of inserts.
+
+Under a burst of creates, one `insert_one` per request makes the Mongo
+round trip the bottleneck. A `WriteBuffer` holds the documents inserted
+within `group_commit_max_wait_ms` of the first one (or until
+`group_commit_max_batch` of them are waiting) and writes them with a single
+unordered `insert_many`. Every caller still gets its own result: the id of
+its document, or the error the server reported for it, so one duplicate
+does not fail the rest of the batch.
+
+With GROUP_COMMIT_ENABLED off, `insert` is a plain `insert_one`.
+"""
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError, WriteError
+from typing import Optional
+import asyncio
+import logging
+
+from ..config import settings
+from ..db import db
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Coalesces concurrent inserts into one collection."""
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()  # referenced until done, the loop only keeps weak ones
+        self.inserts = 0
+        self.batches = 0
+        self.errors = 0
+        self.largest_batch = 0
+
+    async def insert(self, document: dict) -> ObjectId:
+        """
+        Insert `document` and return its id, once its batch is written.
+
+        Raises: the error of this document's write (e.g. DuplicateKeyError),
+        or the error that failed the whole batch
+        """
+        if not settings.group_commit_enabled:
+            return (await db[self.collection_name].insert_one(document)).inserted_id
+
+        self.inserts += 1
+        document.setdefault("_id", ObjectId())
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+
+        if len(self._pending) >= settings.group_commit_max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.group_commit_max_wait_ms / 1000, self.flush)
+
+        # a cancelled caller must not cancel the write of the others in its batch
+        return await asyncio.shield(future)
+
+    def flush(self) -> None:
+        """Write what is waiting now instead of at the end of the window."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """Flush and wait for every write in flight, at shutdown."""
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        failed: dict[int, Exception] = {}
+        try:
+            await db[self.collection_name].insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as error:
+            for write_error in error.details["writeErrors"]:
+                failed[write_error["index"]] = _write_error(write_error)
+            if error.details.get("writeConcernErrors"):
+                # the documents were written, but not with the durability asked for: as insert_one would
+                concern_error = error.details["writeConcernErrors"][0]
+                failed = {
+                    index: failed.get(index) or WriteConcernError(concern_error["errmsg"], concern_error["code"], concern_error)
+                    for index in range(len(batch))
+                }
+        except Exception as error:
+            logger.warning(f"Group commit of {len(batch)} {self.collection_name} failed: {error}")
+            failed = {index: error for index in range(len(batch))}
+
+        self.errors += len(failed)
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(failed[index])
+            else:
+                future.set_result(document["_id"])
+
+    def stats(self) -> dict:
+        return {
+            "inserts": self.inserts,
+            "batches": self.batches,
+            "errors": self.errors,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.inserts / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def _write_error(write_error: dict) -> WriteError:
+    """The exception `insert_one` would have raised for this document."""
+    error_class = DuplicateKeyError if write_error["code"] == 11000 else WriteError
+    return error_class(write_error["errmsg"], write_error["code"], write_error)
+
+
+sales_buffer = WriteBuffer("sales")
+borrowings_buffer = WriteBuffer("borrowings")
+
+WRITE_BUFFERS = {"sales": sales_buffer, "borrowings": borrowings_buffer}
+
+
+def write_buffer_stats() -> dict:
+    return {name: buffer.stats() for name, buffer in WRITE_BUFFERS.items()}
+
+
+async def drain_write_buffers() -> None:
+    await asyncio.gather(*(buffer.drain() for buffer in WRITE_BUFFERS.values()))
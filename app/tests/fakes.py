@@ -0,0 +1,348 @@
+"""
+In-memory stand-ins for the Motor collections the services use.
+
+Only the query and update operators the services actually send are
+supported; anything else fails loudly instead of matching by accident.
+"""
+from bson import ObjectId
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import copy
+
+_MISSING = object()
+
+_COMPARE = {
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+}
+
+
+def matches(document: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif not _matches_field(document.get(field, _MISSING), condition):
+            return False
+    return True
+
+
+def _matches_field(value, condition) -> bool:
+    if condition is None:
+        # null also matches a missing field, as in Mongo
+        return value is None or value is _MISSING
+    if not (isinstance(condition, dict) and condition and next(iter(condition)).startswith("$")):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$in":
+            # None in $in also matches a missing field, as in Mongo
+            ok = value in operand or (value is _MISSING and None in operand)
+        elif operator == "$ne":
+            ok = not _matches_field(value, operand)
+        elif operator == "$exists":
+            ok = (value is not _MISSING) == operand
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            ok = value is not _MISSING and value is not None and _COMPARE[operator](value, operand)
+        else:
+            raise NotImplementedError(operator)
+        if not ok:
+            return False
+    return True
+
+
+def _evaluate(expression, document: dict):
+    """The aggregation expressions the services use: field paths, $cond, comparisons and a few conversions."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = document
+        for part in expression[1:].split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if isinstance(expression, dict) and not any(key.startswith("$") for key in expression):
+        return {key: _evaluate(value, document) for key, value in expression.items()}
+    if isinstance(expression, dict) and len(expression) == 1:
+        operator, operands = next(iter(expression.items()))
+        if operator == "$literal":
+            return operands
+        if operator == "$toString":
+            return str(_evaluate(operands, document))
+        if operator == "$dateTrunc" and operands["unit"] in ("day", "month"):
+            date = _evaluate(operands["date"], document)
+            return datetime(date.year, date.month, 1 if operands["unit"] == "month" else date.day)
+        if operator == "$cond":
+            condition, then, otherwise = operands
+            return _evaluate(then if _evaluate(condition, document) else otherwise, document)
+        if operator in ("$gt", "$lt"):
+            left, right = (_evaluate(operand, document) for operand in operands)
+            return left > right if operator == "$gt" else left < right
+        raise NotImplementedError(operator)
+    return expression
+
+
+_ACCUMULATORS = {
+    "$sum": lambda values: sum(values),
+    "$push": lambda values: list(values),
+}
+
+
+def _group(documents: list, stage: dict) -> list:
+    groups: dict = {}
+    for document in documents:
+        key = _evaluate(stage["_id"], document)
+        groups.setdefault(key if not isinstance(key, dict) else tuple(key.items()), (key, []))[1].append(document)
+    grouped = []
+    for key, members in groups.values():
+        result = {"_id": key}
+        for field, accumulator in stage.items():
+            if field != "_id":
+                (operator, expression), = accumulator.items()
+                result[field] = _ACCUMULATORS[operator]([_evaluate(expression, member) for member in members])
+        grouped.append(result)
+    return grouped
+
+
+def _project(document: dict, spec: dict) -> dict:
+    projected = {} if spec.get("_id", 1) == 0 else {"_id": document["_id"]}
+    for field, value in spec.items():
+        if field != "_id" or value not in (0, 1):
+            projected[field] = document.get(field) if value == 1 else _evaluate(value, document)
+    return projected
+
+
+def aggregate(documents: list, pipeline: list) -> list:
+    """The pipeline stages the services use: $match, $group, $sort, $limit and $project."""
+    for stage in pipeline:
+        (operator, spec), = stage.items()
+        if operator == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif operator == "$group":
+            documents = _group(documents, spec)
+        elif operator == "$sort":
+            # last key first, the sorts are stable
+            for field, direction in reversed(spec.items()):
+                documents = sorted(documents, key=lambda document: document.get(field), reverse=direction == -1)
+        elif operator == "$limit":
+            documents = documents[:spec]
+        elif operator == "$project":
+            documents = [_project(document, spec) for document in documents]
+        else:
+            raise NotImplementedError(operator)
+    return documents
+
+
+def apply_update(document: dict, update) -> None:
+    if isinstance(update, list):
+        for stage in update:
+            document.update({field: _evaluate(value, document) for field, value in stage["$set"].items()})
+        return
+    for operator, changes in update.items():
+        if operator == "$set":
+            document.update(changes)
+        elif operator == "$inc":
+            for field, amount in changes.items():
+                document[field] = document.get(field, 0) + amount
+        else:
+            raise NotImplementedError(operator)
+
+
+class FakeResult:
+    def __init__(self, modified_count=0, deleted_count=0, inserted_id=None, inserted_ids=None):
+        self.modified_count = modified_count
+        self.deleted_count = deleted_count
+        self.inserted_id = inserted_id
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+def _sort_value(value):
+    # missing and null sort before any value, as in Mongo
+    return (0, 0) if value is None else (1, value)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        # one field and direction, or a list of (field, direction) pairs
+        keys = [(key, direction)] if isinstance(key, str) else key
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda document: _sort_value(document.get(field)), reverse=direction == -1)
+        return self
+
+    def limit(self, count):
+        # the last limit wins, as with Motor
+        self._limit = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def _results(self) -> list:
+        return self.documents[:self._limit] if self._limit else self.documents
+
+    async def to_list(self, length=None):
+        return self._results()[:length] if length else self._results()
+
+    async def __aiter__(self):
+        for document in self._results():
+            yield document
+
+
+class FakeCollection:
+    """A collection kept in a dict by _id; documents go in and come out as copies."""
+
+    def __init__(self, documents=(), unique=()):
+        self.documents = {}
+        self.unique = unique  # fields whose values must be unique
+        self.indexes: list[str] = []
+        self.name = self.database = None  # set by the FakeDatabase holding it
+        for document in documents:
+            document = dict(document)
+            document.setdefault("_id", ObjectId())
+            self.documents[document["_id"]] = document
+
+    def _find(self, query):
+        return [document for document in self.documents.values() if matches(document, query)]
+
+    def find(self, query=None, projection=None, session=None):
+        documents = [copy.deepcopy(document) for document in self._find(query or {})]
+        if isinstance(projection, dict) and not any(projection.values()):
+            documents = [{key: value for key, value in document.items() if key not in projection} for document in documents]
+        elif projection:
+            fields = set(projection) | {"_id"}
+            documents = [{key: value for key, value in document.items() if key in fields} for document in documents]
+        return FakeCursor(documents)
+
+    async def find_one(self, query=None, projection=None, session=None):
+        found = self._find(query or {})
+        return copy.deepcopy(found[0]) if found else None
+
+    def aggregate(self, pipeline, allowDiskUse=False, session=None):
+        merge = pipeline[-1].get("$merge")
+        results = aggregate([copy.deepcopy(document) for document in self.documents.values()], pipeline[:-1] if merge else pipeline)
+        if merge:
+            self._merge(results, merge)
+            results = []
+        return FakeCursor(results)
+
+    def _merge(self, results: list, merge: dict) -> None:
+        if (merge["whenMatched"], merge["whenNotMatched"]) != ("replace", "insert"):
+            raise NotImplementedError(merge)
+        target = self.database[merge["into"]]
+        for result in results:
+            found = target._find({field: result[field] for field in merge["on"]})
+            result["_id"] = found[0]["_id"] if found else ObjectId()
+            target.documents[result["_id"]] = result
+
+    async def create_indexes(self, indexes):
+        names = [index.document["name"] for index in indexes]
+        self.indexes.extend(names)
+        return names
+
+    async def drop(self):
+        self.documents.clear()
+        self.indexes.clear()
+
+    async def rename(self, new_name, dropTarget=False):
+        if new_name in self.database and not dropTarget:
+            raise OperationFailure("target namespace exists", code=48)
+        self.database[new_name] = self.database.pop(self.name)
+        self.name = new_name
+
+    async def count_documents(self, query, limit=None, session=None):
+        count = len(self._find(query))
+        return min(count, limit) if limit else count
+
+    async def insert_one(self, document, session=None):
+        document.setdefault("_id", ObjectId())
+        for field in self.unique:
+            if any(other.get(field) == document.get(field) for other in self.documents.values()):
+                raise DuplicateKeyError(f"E11000 duplicate key error on {field}")
+        self.documents[document["_id"]] = copy.deepcopy(document)
+        return FakeResult(inserted_id=document["_id"])
+
+    async def insert_many(self, documents, ordered=True, session=None):
+        ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return FakeResult(inserted_ids=ids)
+
+    def _upsert(self, query, update) -> dict:
+        if "_id" in query and query["_id"] in self.documents:
+            # the upsert tries to insert an _id that exists but did not match
+            raise DuplicateKeyError("E11000 duplicate key error on _id")
+        document = {field: value for field, value in query.items() if not field.startswith("$")}
+        document.setdefault("_id", ObjectId())
+        self.documents[document["_id"]] = document
+        apply_update(document, update)
+        return document
+
+    async def update_one(self, query, update, upsert=False, session=None):
+        found = self._find(query)
+        if not found:
+            if upsert:
+                self._upsert(query, update)
+            return FakeResult()
+        apply_update(found[0], update)
+        return FakeResult(modified_count=1)
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        """UpdateOne requests, applied in order."""
+        modified = 0
+        for request in requests:
+            modified += (await self.update_one(request._filter, request._doc, upsert=request._upsert)).modified_count
+        return FakeResult(modified_count=modified)
+
+    async def update_many(self, query, update, session=None):
+        found = self._find(query)
+        for document in found:
+            apply_update(document, update)
+        return FakeResult(modified_count=len(found))
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=ReturnDocument.BEFORE, session=None):
+        found = self._find(query)
+        if not found:
+            if not upsert:
+                return None
+            document = self._upsert(query, update)
+            return copy.deepcopy(document) if return_document == ReturnDocument.AFTER else None
+        before = copy.deepcopy(found[0])
+        apply_update(found[0], update)
+        return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else before
+
+    async def delete_one(self, query, session=None):
+        found = self._find(query)
+        if found:
+            del self.documents[found[0]["_id"]]
+        return FakeResult(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query, session=None):
+        found = self._find(query)
+        for document in found:
+            del self.documents[document["_id"]]
+        return FakeResult(deleted_count=len(found))
+
+
+class FakeDatabase(dict):
+    """`db.name` and `db["name"]`, collections created on first use."""
+
+    def __init__(self, collections=(), **named):
+        super().__init__()
+        for name, collection in {**dict(collections), **named}.items():
+            self[name] = collection
+
+    def __setitem__(self, name, collection):
+        collection.name, collection.database = name, self
+        super().__setitem__(name, collection)
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
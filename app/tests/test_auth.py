@@ -0,0 +1,38 @@
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from datetime import datetime, timedelta, timezone
+import jwt
+import pytest
+
+from ..config import settings
+from ..utils import auth
+
+def credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+@pytest.mark.asyncio
+async def test_verified_tokens_are_cached(monkeypatch):
+    """A token is only decoded the first time it is seen."""
+    token = auth.create_access_token({"sub": "demo_user"})
+    decodes = []
+    decode = jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+
+    first = await auth.verify_token(credentials(token))
+    second = await auth.verify_token(credentials(token))
+
+    assert first["sub"] == second["sub"] == "demo_user"
+    assert len(decodes) == 1
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected():
+    """Expired tokens are refused and never cached."""
+    token = jwt.encode(
+        {"sub": "demo_user", "exp": datetime.now(timezone.utc) - timedelta(minutes=1)},
+        settings.jwt_secret_key,
+        algorithm=settings.jwt_algorithm
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.verify_token(credentials(token))
+    assert exc_info.value.status_code == 401
@@ -0,0 +1,73 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+import pytest
+
+from ..models.borrowing import BorrowingStatus
+from ..services import borrowing as borrowing_service
+from ..services.borrowing import process_borrowing_return
+from .fakes import FakeCollection, FakeDatabase
+
+def borrowing(due_in_days: float, status: BorrowingStatus = BorrowingStatus.ACTIVE) -> dict:
+    return {
+        "_id": ObjectId(), "borrower_id": ObjectId(), "source_type": "bookstore", "source_id": ObjectId(),
+        "book_id": ObjectId(), "borrow_date": datetime.now() - timedelta(days=14),
+        "due_date": datetime.now() + timedelta(days=due_in_days), "status": status,
+    }
+
+@pytest.fixture
+def returns(monkeypatch):
+    """The borrowings collection, and the borrowings an overdue fee was applied for."""
+    borrowings = FakeCollection()
+    monkeypatch.setattr(borrowing_service, "db", FakeDatabase(borrowings=borrowings))
+    fees = []
+    monkeypatch.setattr(borrowing_service, "apply_overdue_fee", lambda borrower_id, loan: fees.append(loan.id))
+    return borrowings, fees
+
+async def add(borrowings: FakeCollection, document: dict) -> ObjectId:
+    return (await borrowings.insert_one(document)).inserted_id
+
+@pytest.mark.asyncio
+async def test_return_before_due_date(returns):
+    borrowings, fees = returns
+    borrowing_id = await add(borrowings, borrowing(due_in_days=3))
+
+    returned = await process_borrowing_return(borrowing_id)
+
+    assert returned.status == BorrowingStatus.RETURNED
+    assert returned.return_date is not None
+    assert borrowings.documents[borrowing_id]["status"] == BorrowingStatus.RETURNED
+    assert fees == []
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [BorrowingStatus.ACTIVE, BorrowingStatus.OVERDUE])
+async def test_return_after_due_date(returns, status):
+    """Late returns are RETURNED_OVERDUE and charged, whether or not the sweeper got to them first."""
+    borrowings, fees = returns
+    borrowing_id = await add(borrowings, borrowing(due_in_days=-2, status=status))
+
+    returned = await process_borrowing_return(borrowing_id)
+
+    assert returned.status == BorrowingStatus.RETURNED_OVERDUE
+    assert borrowings.documents[borrowing_id]["return_date"] == returned.return_date
+    assert fees == [str(borrowing_id)]
+
+@pytest.mark.asyncio
+async def test_return_unknown_borrowing(returns):
+    with pytest.raises(HTTPException) as error:
+        await process_borrowing_return(ObjectId())
+    assert error.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_second_return_conflicts(returns):
+    """Returning twice is refused and leaves the first return as it was."""
+    borrowings, fees = returns
+    borrowing_id = await add(borrowings, borrowing(due_in_days=-2))
+    first = await process_borrowing_return(borrowing_id)
+
+    with pytest.raises(HTTPException) as error:
+        await process_borrowing_return(borrowing_id)
+
+    assert error.value.status_code == 409
+    assert borrowings.documents[borrowing_id]["return_date"] == first.return_date
+    assert fees == [str(borrowing_id)]
@@ -0,0 +1,48 @@
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+import pytest
+
+from ..config import settings
+from ..models.book import Book
+from ..services.bulk import bulk_insert
+
+class FakeCollection:
+    """Collection stub that rejects the documents at the given positions."""
+
+    def __init__(self, failing_positions=()):
+        self.failing_positions = set(failing_positions)
+        self.inserted = []
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.inserted = [doc for i, doc in enumerate(documents) if i not in self.failing_positions]
+        if self.failing_positions:
+            raise BulkWriteError({"writeErrors": [
+                {"index": i, "errmsg": "E11000 duplicate key error"} for i in sorted(self.failing_positions)
+            ]})
+
+def book(title: str) -> dict:
+    return {"isbn": "9780451524935", "title": title, "author": "George Orwell", "price": 12.99}
+
+@pytest.mark.asyncio
+async def test_bulk_insert_reports_every_item():
+    """Validation and write errors are reported against the request index."""
+    collection = FakeCollection(failing_positions=[1])
+
+    result = await bulk_insert(collection, [book("1984"), {"title": ""}, book("Animal Farm"), book("Homage")], Book)
+
+    assert result.inserted_count == 2
+    assert result.error_count == 2
+    assert result.results[0].id is not None
+    assert "isbn" in result.results[1].error
+    assert "duplicate key" in result.results[2].error
+    assert result.results[3].id == str(collection.inserted[1]["_id"])
+
+@pytest.mark.asyncio
+async def test_bulk_insert_cap(monkeypatch):
+    """Arrays above the configured cap are refused."""
+    monkeypatch.setattr(settings, "bulk_max_items", 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await bulk_insert(FakeCollection(), [book("1984"), book("Animal Farm")], Book)
+    assert exc_info.value.status_code == 413
@@ -0,0 +1,92 @@
+from bson import ObjectId
+import asyncio
+import pytest
+
+from ..utils.cache import EntityCache, LRUCache, MemoryCacheBackend
+
+def test_lru_evicts_least_recently_used():
+    """The oldest untouched entry is evicted once the cache is full."""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_lru_expires_entries(monkeypatch):
+    """Entries are dropped once their time-to-live has passed."""
+    now = [100.0]
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now[0])
+
+    cache = LRUCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    now[0] += 10
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+@pytest.mark.asyncio
+async def test_entity_cache_read_through_and_invalidate():
+    """Loads on a miss, serves hits from the cache and reloads after invalidation."""
+    cache = EntityCache("book", MemoryCacheBackend(maxsize=10))
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"_id": "1", "title": "1984"}
+
+    assert await cache.get_or_load("1", loader) == {"_id": "1", "title": "1984"}
+    await cache.get_or_load("1", loader)
+    await cache.invalidate("1")
+    await cache.get_or_load("1", loader)
+
+    assert len(loads) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "discarded": 0}
+
+@pytest.mark.asyncio
+async def test_cached_documents_are_not_shared():
+    """Callers changing the document they got, on a miss or a hit, leave the cached one alone."""
+    cache = EntityCache("book", MemoryCacheBackend(maxsize=10))
+    book_id = ObjectId()
+
+    async def loader():
+        return {"_id": book_id, "title": "1984", "genres": ["Dystopia"]}
+
+    loaded = await cache.get_or_load("1", loader)
+    loaded["_id"] = str(loaded["_id"])
+    hit = await cache.get_or_load("1", loader)
+    hit["genres"].append("Classic")
+
+    assert await cache.get_or_load("1", loader) == {"_id": book_id, "title": "1984", "genres": ["Dystopia"]}
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_cached():
+    """A read that started before a write returns what it read but does not cache it."""
+    cache = EntityCache("book", MemoryCacheBackend(maxsize=10))
+    stored = {"_id": "1", "price": 10.0}
+    read_started = asyncio.Event()
+    write_done = asyncio.Event()
+
+    async def slow_loader():
+        document = dict(stored)  # read before the write
+        read_started.set()
+        await write_done.wait()
+        return document
+
+    async def loader():
+        return dict(stored)
+
+    read = asyncio.create_task(cache.get_or_load("1", slow_loader))
+    await read_started.wait()
+    stored["price"] = 12.0
+    await cache.invalidate("1")
+    write_done.set()
+
+    assert (await read)["price"] == 10.0
+    assert (await cache.get_or_load("1", loader))["price"] == 12.0
+    assert cache.stats() == {"hits": 0, "misses": 2, "discarded": 1}
+    assert cache._loads == {}
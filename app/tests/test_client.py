@@ -0,0 +1,68 @@
+from bson import ObjectId
+from fastapi import HTTPException
+import pytest
+
+from ..models.client import Client, ClientUpdate
+from ..routes import client as client_routes
+from ..routes.client import patch_client, update_client
+from .fakes import FakeCollection, FakeDatabase
+
+@pytest.fixture
+def clients(monkeypatch):
+    """One client at version 2 and one created before versioning."""
+    clients = FakeCollection([
+        {"_id": ObjectId(), "first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "version": 2},
+        {"_id": ObjectId(), "first_name": "Alan", "last_name": "Turing", "email": "alan@example.com"},
+    ])
+    monkeypatch.setattr(client_routes, "db", FakeDatabase(clients=clients))
+    return clients
+
+def client_id(clients: FakeCollection, index: int) -> str:
+    return str(list(clients.documents)[index])
+
+def replacement(**fields) -> Client:
+    return Client(first_name="Ada", last_name="King", email="ada@example.com", **fields)
+
+@pytest.mark.asyncio
+async def test_put_increments_version(clients):
+    """A PUT at the current version applies and moves the client to the next one."""
+    updated = await update_client(client_id(clients, 0), replacement(version=2))
+
+    assert (updated.last_name, updated.version) == ("King", 3)
+    assert clients.documents[ObjectId(updated.id)]["version"] == 3
+
+@pytest.mark.asyncio
+async def test_put_with_stale_version_conflicts(clients):
+    """A PUT made from an older read fails and writes nothing."""
+    with pytest.raises(HTTPException) as error:
+        await update_client(client_id(clients, 0), replacement(version=1))
+
+    assert error.value.status_code == 409
+    assert clients.documents[ObjectId(client_id(clients, 0))]["last_name"] == "Lovelace"
+
+@pytest.mark.asyncio
+async def test_put_without_version_is_unconditional(clients):
+    updated = await update_client(client_id(clients, 0), replacement())
+    assert updated.version == 3
+
+@pytest.mark.asyncio
+async def test_put_unknown_client(clients):
+    with pytest.raises(HTTPException) as error:
+        await update_client(str(ObjectId()), replacement(version=0))
+    assert error.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_unversioned_client_is_at_version_0(clients):
+    """Clients stored before versioning match version 0 and get version 1."""
+    updated = await update_client(client_id(clients, 1), replacement(version=0))
+    assert updated.version == 1
+
+@pytest.mark.asyncio
+async def test_patch_checks_version(clients):
+    updated = await patch_client(client_id(clients, 0), ClientUpdate(address="12 St James's Square", version=2))
+    assert (updated.address, updated.version) == ("12 St James's Square", 3)
+
+    with pytest.raises(HTTPException) as error:
+        await patch_client(client_id(clients, 0), ClientUpdate(address="Marylebone", version=2))
+    assert error.value.status_code == 409
+    assert clients.documents[ObjectId(updated.id)]["address"] == "12 St James's Square"
@@ -0,0 +1,61 @@
+from collections import Counter
+from datetime import datetime
+import pytest
+
+from ..models.book import Book
+from ..utils.datagen import Dataset, DatasetSpec, insert_dataset
+from ..utils.isbn import normalize_isbn
+
+SPEC = DatasetSpec(
+    books=500, clients=200, bookstores=5, stock_per_bookstore=40, borrowings=300, sales=2000, end=datetime(2025, 1, 1)
+)
+
+def test_same_spec_same_documents():
+    """Generation is deterministic for a given spec, and the seed changes it."""
+    assert list(Dataset(SPEC).sales()) == list(Dataset(SPEC).sales())
+    assert list(Dataset(SPEC).books()) != list(Dataset(SPEC.model_copy(update={"seed": 7})).books())
+
+def test_books_are_valid_and_unique():
+    books = list(Dataset(SPEC).books())
+    assert len({book["isbn"] for book in books}) == len(books)
+    for book in books[:50]:
+        Book(**{**book, "_id": str(book["_id"])})
+        assert normalize_isbn(book["isbn"]) == book["isbn"]
+
+def test_references_are_consistent():
+    """Sales and bookstore borrowings are of books the bookstore stocks, every id exists."""
+    dataset = Dataset(SPEC)
+    ids = {name: {document["_id"] for document in generate()} for name, generate in dataset.collections().items()}
+    isbn_of = {book["_id"]: book["isbn"] for book in dataset.books()}
+    stocked = {(item["bookstore_id"], item["isbn"]) for item in dataset.book_inventories()}
+
+    for sale in dataset.sales():
+        assert sale["client_id"] in ids["clients"]
+        assert (sale["bookstore_id"], isbn_of[sale["book_id"]]) in stocked
+    for borrowing in dataset.borrowings():
+        assert borrowing["borrower_id"] in ids["clients"]
+        if borrowing["source_type"] == "bookstore":
+            assert (borrowing["source_id"], isbn_of[borrowing["book_id"]]) in stocked
+
+def test_popularity_is_skewed():
+    """A handful of bestsellers make a large share of the sales."""
+    sales = Counter(sale["book_id"] for sale in Dataset(SPEC).sales())
+    assert sum(count for _, count in sales.most_common(5)) > 0.25 * SPEC.sales
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.batches.append(len(documents))
+
+@pytest.mark.asyncio
+async def test_insert_dataset_streams_batches():
+    database = {name: FakeCollection() for name in Dataset(SPEC).collections()}
+
+    report = await insert_dataset(database, SPEC, collections=["books", "sales"], batch_size=300)
+
+    assert database["books"].batches == [300, 200]
+    assert sum(database["sales"].batches) == report["sales"]["documents"] == SPEC.sales
+    assert database["clients"].batches == []
@@ -0,0 +1,67 @@
+import pytest
+
+from .. import db as db_module
+from ..config import settings
+
+@pytest.fixture
+def fresh_client():
+    db_module.close_client()
+    yield
+    db_module.close_client()
+
+def test_client_options_follow_settings(monkeypatch):
+    """Pool, compression and concern settings become driver options, unset ones are left out."""
+    monkeypatch.setattr(settings, "mongodb_max_pool_size", 20)
+    monkeypatch.setattr(settings, "mongodb_wait_queue_timeout_seconds", 2.5)
+    monkeypatch.setattr(settings, "mongodb_compressors", "zstd,zlib")
+    monkeypatch.setattr(settings, "mongodb_write_concern", "1")
+
+    options = db_module.client_options()
+    assert options["maxPoolSize"] == 20
+    assert options["waitQueueTimeoutMS"] == 2500
+    assert options["compressors"] == "zstd,zlib"
+    assert options["w"] == 1
+    assert "maxIdleTimeMS" not in options
+    assert "readConcernLevel" not in options
+
+def test_client_is_lazy(fresh_client):
+    """Importing the module creates nothing, the proxies create the client on first use."""
+    assert db_module._client is None
+    assert db_module.pool_stats() is None
+
+    books = db_module.db.books
+    assert books.name == "books"
+    assert db_module._client is not None
+    assert db_module.pool_stats()["max_pool_size"] == settings.mongodb_max_pool_size
+
+def test_forked_process_gets_its_own_client(fresh_client, monkeypatch):
+    """A child process does not reuse the client it inherited from its parent."""
+    parent_client = db_module.get_client()
+    assert db_module.get_client() is parent_client
+
+    monkeypatch.setattr(db_module.os, "getpid", lambda: -1)
+    assert db_module.get_client() is not parent_client
+    parent_client.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hello, supported", [
+    ({"isWritablePrimary": True}, False),  # standalone mongod
+    ({"isWritablePrimary": True, "setName": "rs0"}, True),
+    ({"isWritablePrimary": True, "msg": "isdbgrid"}, True),  # mongos
+])
+async def test_transactions_supported_follows_topology(fresh_client, monkeypatch, hello, supported):
+    """The topology is asked once per client with `hello`."""
+    calls = []
+
+    class FakeAdmin:
+        async def command(self, name):
+            calls.append(name)
+            return hello
+
+    class FakeClient:
+        admin = FakeAdmin()
+    monkeypatch.setattr(db_module, "client", FakeClient())
+
+    assert await db_module.transactions_supported() is supported
+    assert await db_module.transactions_supported() is supported
+    assert calls == ["hello"]
@@ -0,0 +1,59 @@
+from bson import ObjectId
+from datetime import datetime
+from fastapi import HTTPException
+import pytest
+
+from .. import repository
+from ..models.borrowing import Borrowing, BorrowingExpand
+from ..services.borrowing import BorrowingExpansion, borrowing_expansion
+from ..utils.codec import read_codec
+from .test_repository import FakeCollection
+
+def borrowing(source_type: str, **references) -> dict:
+    return {
+        "_id": ObjectId(),
+        "borrower_id": ObjectId(),
+        "source_type": source_type,
+        "source_id": ObjectId(),
+        "book_id": ObjectId(),
+        "due_date": datetime(2025, 2, 14),
+        **references,
+    }
+
+def test_expand_parsing():
+    """Unknown references are rejected with a 400."""
+    assert borrowing_expansion("book, source").expand == {BorrowingExpand.BOOK, BorrowingExpand.SOURCE}
+    with pytest.raises(HTTPException) as exc_info:
+        borrowing_expansion("book,lender")
+    assert exc_info.value.status_code == 400
+
+def test_projection_keeps_references():
+    """A sparse fieldset still fetches the fields the expansion reads."""
+    expansion = BorrowingExpansion(frozenset({BorrowingExpand.SOURCE}))
+    assert expansion.projection(None) is None
+    assert expansion.projection({"status": 1}) == {"status": 1, "source_type": 1, "source_id": 1}
+
+@pytest.mark.asyncio
+async def test_expand_page_with_one_query_per_collection(monkeypatch):
+    """References of a whole page are resolved by one $in per collection, sources by source_type."""
+    book = {"_id": ObjectId(), "isbn": "9780000000002", "title": "Dune", "author": "Herbert", "price": 9.99}
+    client = {"_id": ObjectId(), "first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com"}
+    store = {"_id": ObjectId(), "name": "Corner Books", "address": "1 Main St"}
+    collections = {"books": FakeCollection([book]), "clients": FakeCollection([client]), "bookstores": FakeCollection([store])}
+    monkeypatch.setattr(repository, "db", collections)
+
+    documents = [
+        borrowing("bookstore", book_id=str(book["_id"]), borrower_id=client["_id"], source_id=str(store["_id"])),
+        borrowing("client", book_id=book["_id"], borrower_id=str(client["_id"]), source_id=client["_id"]),
+        borrowing("client", source_id="not-an-id"),
+    ]
+    rows = read_codec(Borrowing).rows(documents)
+
+    await BorrowingExpansion(frozenset(BorrowingExpand)).apply(documents, rows)
+
+    assert all(len(collection.queries) == 1 for collection in collections.values())
+    assert rows[0]["book"]["title"] == "Dune"
+    assert rows[0]["borrower"]["_id"] == str(client["_id"])
+    assert rows[0]["source"]["name"] == "Corner Books"
+    assert rows[1]["source"]["first_name"] == "Ada"
+    assert rows[2]["book"] is None and rows[2]["source"] is None
@@ -0,0 +1,107 @@
+from bson import ObjectId
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo.errors import OperationFailure
+import pytest
+
+from ..indexes import ensure_indexes
+from ..models.book import Book
+from ..routes.book import get_book_availability
+from ..services import inventory
+from ..services.migrations import MIGRATIONS, duplicate_isbns
+from ..utils.isbn import complete_isbn13, normalize_isbn
+from .fakes import FakeCollection, FakeDatabase
+
+ISBN = "9780451524935"
+
+@pytest.mark.parametrize("value", [
+    "9780451524935",
+    "978-0-451-52493-5",
+    "978 0 451 52493 5",
+    "0451524934",
+    "0-451-52493-4",
+    9780451524935,
+])
+def test_normalize_isbn(value):
+    """ISBN-10s, ISBN-13s, hyphenated or stored as ints all become the same ISBN-13."""
+    assert normalize_isbn(value) == "9780451524935"
+
+def test_normalize_isbn10_with_x_and_leading_zero():
+    """'X' check digits are accepted, and ints get their leading zeros back."""
+    assert normalize_isbn("080442957x") == "9780804429573"
+    assert normalize_isbn(306406152) == normalize_isbn("0306406152") == "9780306406157"
+
+@pytest.mark.parametrize("value", ["9780451524936", "0451524935", "978045152493", "1234567890123", "isbn"])
+def test_normalize_isbn_rejects_invalid(value):
+    """Wrong check digits, lengths and prefixes are refused."""
+    with pytest.raises(ValueError):
+        normalize_isbn(value)
+
+def test_complete_isbn13():
+    assert complete_isbn13("978045152493") == "9780451524935"
+
+def test_book_stores_canonical_isbn():
+    """Books validate their ISBN and keep the canonical form."""
+    assert Book(isbn="0-451-52493-4", title="1984", author="George Orwell", price=12.99).isbn == "9780451524935"
+    with pytest.raises(ValidationError):
+        Book(isbn="0-451-52493-5", title="1984", author="George Orwell", price=12.99)
+
+def test_isbn_migration_transform():
+    """Legacy ISBNs are rewritten, values that are not ISBNs are left for a human."""
+    books, _ = MIGRATIONS["isbn"]
+    assert books.transform({"isbn": 451524934}) == {"isbn": "9780451524935"}
+    assert books.transform({"isbn": "not an isbn"}) == {}
+
+@pytest.fixture
+def stores(monkeypatch):
+    first, second, empty = ObjectId(), ObjectId(), ObjectId()
+    book_inventories = FakeCollection([
+        {"bookstore_id": first, "isbn": ISBN, "quantity_available": 2},
+        {"bookstore_id": second, "isbn": ISBN, "quantity_available": 3},
+        {"bookstore_id": first, "isbn": ISBN, "quantity_available": 2},  # a stock stripe
+        {"bookstore_id": empty, "isbn": ISBN, "quantity_available": 0},
+        {"bookstore_id": second, "isbn": "9780306406157", "quantity_available": 9},
+    ])
+    monkeypatch.setattr(inventory, "db", FakeDatabase({"book_inventories": book_inventories}))
+    return first, second
+
+@pytest.mark.asyncio
+async def test_get_book_availability(stores):
+    """Any spelling of the ISBN finds the stores with copies in stock, stripes summed, most stocked first."""
+    first, second = stores
+
+    availability = await get_book_availability("0-451-52493-4")
+
+    assert availability.isbn == ISBN
+    assert availability.total == 7
+    assert [(store.bookstore_id, store.quantity) for store in availability.stores] == [(str(first), 4), (str(second), 3)]
+
+@pytest.mark.asyncio
+async def test_get_book_availability_rejects_invalid_isbn(stores):
+    with pytest.raises(HTTPException) as error:
+        await get_book_availability("0-451-52493-5")
+    assert error.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_duplicate_isbns():
+    """ISBNs held by more than one book are reported with the ids of those books."""
+    books = FakeCollection([
+        {"_id": 1, "isbn": ISBN}, {"_id": 2, "isbn": "9780306406157"}, {"_id": 3, "isbn": ISBN},
+    ])
+    assert await duplicate_isbns(books) == [{"isbn": ISBN, "ids": [1, 3]}]
+
+@pytest.mark.asyncio
+async def test_duplicate_isbns_do_not_block_other_indexes():
+    """The unique isbn index failing on duplicates leaves the other book indexes to build."""
+    class Books:
+        async def create_indexes(self, indexes):
+            if indexes[0].document.get("unique"):
+                raise OperationFailure("E11000 duplicate key error", code=11000)
+            return [index.document["name"] for index in indexes]
+
+    class Database(dict):
+        def __missing__(self, name):
+            return Books()
+
+    created = await ensure_indexes(Database())
+    assert created["books"] == ["book_text"]
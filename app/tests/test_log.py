@@ -0,0 +1,98 @@
+import json
+import logging
+import pytest
+
+from ..config import settings
+from ..utils import log
+from ..utils.log import MAX_REQUEST_ID_LENGTH, JsonFormatter, RequestIdMiddleware, request_id_var, setup_logging, shutdown_logging
+
+def test_json_formatter_fields():
+    """Standard fields, the request id and `extra` fields end up in one JSON object."""
+    record = logging.makeLogRecord({
+        "name": "app.test", "levelname": "WARNING", "msg": "sold %d copies", "args": (3,),
+        "request_id": "abc", "isbn": "9780451524935",
+    })
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "app.test"
+    assert entry["message"] == "sold 3 copies"
+    assert entry["request_id"] == "abc"
+    assert entry["isbn"] == "9780451524935"
+    assert "time" in entry and "args" not in entry
+
+@pytest.fixture
+def json_logging(monkeypatch, capsys):
+    """JSON logging settings, the captured stdout lines and the root logger restored afterwards."""
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    running = log._listener is not None  # importing app.main sets logging up
+    shutdown_logging()
+    monkeypatch.setattr(settings, "log_json", True)
+    monkeypatch.setattr(settings, "log_level", "INFO")
+    monkeypatch.setattr(settings, "log_levels", "app.noisy=ERROR")
+    yield lambda: [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    shutdown_logging()
+    root.handlers, root.level = handlers, level
+    if running:
+        setup_logging()
+    logging.getLogger("app.noisy").setLevel(logging.NOTSET)
+
+def test_records_go_through_the_queue(json_logging):
+    """Records keep their request id, extras and exception text on the way to the listener thread."""
+    setup_logging()  # in the test, pytest resets the root level after fixtures
+    token = request_id_var.set("req-1")
+    try:
+        logging.getLogger("app.test").info("hello %s", "world", extra={"books": 2})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("app.test").exception("failed")
+        logging.getLogger("app.noisy").warning("filtered by LOG_LEVELS")
+    finally:
+        request_id_var.reset(token)
+    shutdown_logging()  # drains the queue
+
+    hello, failed = json_logging()
+    assert (hello["message"], hello["request_id"], hello["books"]) == ("hello world", "req-1", 2)
+    assert failed["message"] == "failed" and "ValueError: boom" in failed["exception"]
+
+async def call(headers: list) -> tuple[str, dict]:
+    """Run a request through the middleware, returns the request id seen inside and the response headers."""
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["request_id"] = request_id_var.get()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await RequestIdMiddleware(app)({"type": "http", "headers": headers}, None, send)
+    return seen["request_id"], dict(sent[0]["headers"])
+
+@pytest.mark.asyncio
+async def test_request_id_is_propagated():
+    request_id, headers = await call([(b"x-request-id", b"from-the-client")])
+    assert request_id == "from-the-client"
+    assert headers[b"x-request-id"] == b"from-the-client"
+    assert request_id_var.get() == "-"
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated():
+    request_id, headers = await call([])
+    assert len(request_id) == 32
+    assert headers[b"x-request-id"] == request_id.encode()
+
+@pytest.mark.asyncio
+async def test_odd_request_ids_are_tamed():
+    """Non UTF-8 bytes do not fail the request, and long ids are cut."""
+    request_id, headers = await call([(b"x-request-id", b"\xff\xfeid")])
+    assert headers[b"x-request-id"] == b"\xff\xfeid"
+
+    request_id, headers = await call([(b"x-request-id", b"x" * 1000)])
+    assert len(request_id) == MAX_REQUEST_ID_LENGTH
@@ -1,5 +1,9 @@
 from fastapi.testclient import TestClient
+import pytest
 
+from .. import db as db_module
+from .. import main
+from ..config import settings
 from ..main import app
 
 client = TestClient(app)
@@ -12,4 +16,58 @@ def test_read_main():
 def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "healthy"}
\ No newline at end of file
+    assert response.json() == {"status": "healthy"}
+
+def test_not_ready_before_startup():
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["startup"] is False
+
+@pytest.fixture
+def startup(monkeypatch):
+    """startup_event with the database step replaced, failing as many times as asked."""
+    attempts = []
+    failures = [0]
+
+    async def prepare_database():
+        attempts.append(1)
+        if len(attempts) <= failures[0]:
+            raise ConnectionError("mongod is restarting")
+
+    monkeypatch.setattr(main, "prepare_database", prepare_database)
+    monkeypatch.setattr(main, "start_prefix_index", lambda: None)
+    monkeypatch.setattr(settings, "overdue_sweep_enabled", False)
+    monkeypatch.setattr(settings, "startup_attempts", 3)
+    monkeypatch.setattr(settings, "startup_retry_seconds", 0)
+    yield failures, attempts
+    app.state.ready = False
+
+@pytest.mark.asyncio
+async def test_startup_retries_transient_failures(startup):
+    failures, attempts = startup
+    failures[0] = 2
+
+    await main.startup_event()
+
+    assert len(attempts) == 3
+    assert app.state.ready
+
+@pytest.mark.asyncio
+async def test_startup_gives_up_and_raises(startup):
+    failures, attempts = startup
+    failures[0] = 3
+
+    with pytest.raises(ConnectionError):
+        await main.startup_event()
+
+    assert len(attempts) == 3
+    assert not app.state.ready
+
+@pytest.mark.asyncio
+async def test_shutdown_without_a_client(monkeypatch):
+    monkeypatch.setattr(main, "shutdown_logging", lambda: None)
+    db_module.close_client()
+
+    await main.shutdown_event()
+
+    assert db_module._client is None
@@ -0,0 +1,147 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import pytest
+
+from ..services import migrations
+from ..services.migrations import references_to_object_ids, run_migration
+
+def matches(document, query):
+    """The few query operators the migrations use."""
+    if "$and" in query:
+        return all(matches(document, part) for part in query["$and"])
+    if "$or" in query:
+        return any(matches(document, part) for part in query["$or"])
+    field, condition = next(iter(query.items()))
+    if "$type" in condition:
+        return isinstance(document.get(field), str)
+    return document[field] > condition["$gt"]
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, field, direction):
+        self.documents.sort(key=lambda document: document[field])
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(document) for document in self.documents]
+
+class FakeResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = {document["_id"]: document for document in documents}
+
+    def find(self, query, projection=None):
+        return FakeCursor([document for document in self.documents.values() if matches(document, query)])
+
+    async def bulk_write(self, requests, ordered=True):
+        modified = 0
+        for request in requests:
+            document = self.documents[request._filter["_id"]]
+            if all(document.get(field) == value for field, value in request._filter.items()):
+                document.update(request._doc["$set"])
+                modified += 1
+        return FakeResult(modified)
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    async def replace_one(self, query, document, upsert=False):
+        self.documents[query["_id"]] = document
+
+    async def delete_one(self, query):
+        self.documents.pop(query["_id"], None)
+
+@pytest.fixture
+def sales(monkeypatch):
+    client_id = ObjectId()
+    documents = [
+        {"_id": ObjectId(), "client_id": str(client_id), "bookstore_id": client_id},
+        {"_id": ObjectId(), "client_id": client_id, "bookstore_id": client_id},  # already migrated
+        {"_id": ObjectId(), "client_id": "legacy", "bookstore_id": str(client_id)},
+        {"_id": ObjectId(), "client_id": str(client_id), "bookstore_id": str(client_id)},
+    ]
+    collections = {"sales": FakeCollection(documents), "migrations": FakeCollection()}
+
+    class FakeDatabase(dict):
+        def __getattr__(self, name):
+            return self[name]
+
+    monkeypatch.setattr(migrations, "db", FakeDatabase(collections))
+    return collections
+
+@pytest.mark.asyncio
+async def test_references_become_object_ids(sales):
+    """Hex string references are rewritten as ObjectIds in batches, other values are left alone."""
+    migration = references_to_object_ids("refs.sales", "sales", ["client_id", "bookstore_id"])
+
+    checkpoint = await run_migration(migration, batch_size=2)
+
+    assert checkpoint["done"]
+    assert (checkpoint["scanned"], checkpoint["updated"], checkpoint["skipped"]) == (3, 3, 0)
+    for document in sales["sales"].documents.values():
+        assert isinstance(document["bookstore_id"], ObjectId)
+        assert document["client_id"] == "legacy" or isinstance(document["client_id"], ObjectId)
+
+@pytest.mark.asyncio
+async def test_migration_resumes_from_checkpoint(sales):
+    """A finished migration is not run again, a restart scans from the beginning."""
+    migration = references_to_object_ids("refs.sales", "sales", ["client_id", "bookstore_id"])
+    await run_migration(migration, batch_size=2)
+
+    assert (await run_migration(migration))["scanned"] == 3
+    assert (await run_migration(migration, restart=True))["scanned"] == 1  # only the "legacy" one still matches
+
+class ConflictingCollection(FakeCollection):
+    """Refuses the rewrite of one document, as a unique index would."""
+
+    def __init__(self, documents, refused):
+        super().__init__(documents)
+        self.refused = refused
+
+    async def bulk_write(self, requests, ordered=True):
+        refused = [index for index, request in enumerate(requests) if request._filter["_id"] == self.refused]
+        accepted = [request for request in requests if request._filter["_id"] != self.refused]
+        modified = (await super().bulk_write(accepted)).modified_count
+        if not refused:
+            return FakeResult(modified)
+        raise BulkWriteError({
+            "writeErrors": [{"index": index, "code": 11000, "errmsg": "E11000 duplicate key"} for index in refused],
+            "nModified": modified,
+        })
+
+@pytest.mark.asyncio
+async def test_refused_rewrites_are_recorded(sales):
+    """A rewrite the server refuses is skipped and kept in the checkpoint, the rest of the batch applies."""
+    refused = next(iter(sales["sales"].documents))
+    migrations.db["sales"] = ConflictingCollection(sales["sales"].documents.values(), refused)
+    migration = references_to_object_ids("refs.sales", "sales", ["client_id", "bookstore_id"])
+
+    checkpoint = await run_migration(migration, batch_size=10)
+
+    assert (checkpoint["updated"], checkpoint["skipped"]) == (2, 1)
+    assert [(failed["_id"], failed["error"]) for failed in checkpoint["failed"]] == [(refused, "E11000 duplicate key")]
+    assert isinstance(migrations.db["sales"].documents[refused]["client_id"], str)
+
+@pytest.mark.asyncio
+async def test_check_runs_after_every_run(sales):
+    """The migration's check reports after the scan, and again once the migration is done."""
+    found = [[{"isbn": "9780451524935", "ids": [1, 2]}], []]
+
+    async def check(collection):
+        return found.pop(0)
+
+    migration = references_to_object_ids("refs.sales", "sales", ["client_id", "bookstore_id"])
+    migration.check = check
+
+    assert (await run_migration(migration))["conflicts"] == [{"isbn": "9780451524935", "ids": [1, 2]}]
+    assert (await run_migration(migration))["conflicts"] == []
+    assert sales["migrations"].documents["refs.sales"]["conflicts"] == []
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+import asyncio
+import pytest
+
+from ..models.borrowing import BorrowingStatus
+from ..services import overdue
+from ..services.overdue import LOCK_ID, OverdueSweeper
+from .fakes import FakeCollection, FakeDatabase
+
+NOW = datetime(2024, 5, 1, 12)
+
+class Clock(datetime):
+    """datetime whose now() is whatever the test sets."""
+    current = NOW
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(overdue, "db", database)
+    monkeypatch.setattr(overdue, "datetime", Clock)
+    monkeypatch.setattr(Clock, "current", NOW)
+    return database
+
+def borrowing(status: BorrowingStatus, due_in_days: float) -> dict:
+    return {"status": status, "due_date": NOW + timedelta(days=due_in_days)}
+
+@pytest.mark.asyncio
+async def test_lease_is_acquired_and_renewed(database):
+    """The first worker takes the lease and pushes its expiry forward on every renewal."""
+    sweeper = OverdueSweeper(interval=60, chunk_size=10, lock_ttl=120)
+
+    assert await sweeper.acquire_lock()
+    assert database.locks.documents[LOCK_ID]["expires_at"] == NOW + timedelta(seconds=120)
+
+    Clock.current = NOW + timedelta(seconds=60)
+    assert await sweeper.acquire_lock()
+    assert database.locks.documents[LOCK_ID] == {
+        "_id": LOCK_ID, "owner": sweeper.owner, "expires_at": NOW + timedelta(seconds=180),
+    }
+
+@pytest.mark.asyncio
+async def test_lease_is_exclusive_until_it_expires(database):
+    """Another worker is refused while the lease runs and takes it over once it lapsed."""
+    leader = OverdueSweeper(interval=60, chunk_size=10, lock_ttl=120)
+    other = OverdueSweeper(interval=60, chunk_size=10, lock_ttl=120)
+    await leader.acquire_lock()
+
+    assert not await other.acquire_lock()
+    assert not other.is_leader
+
+    Clock.current = NOW + timedelta(seconds=121)
+    assert await other.acquire_lock()
+    assert database.locks.documents[LOCK_ID]["owner"] == other.owner
+    assert not await leader.acquire_lock()
+
+async def run_briefly(sweeper: OverdueSweeper) -> None:
+    task = asyncio.create_task(sweeper.run())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+@pytest.mark.asyncio
+async def test_non_leader_does_not_sweep(database):
+    database["borrowings"] = FakeCollection([borrowing(BorrowingStatus.ACTIVE, -1)])
+    await OverdueSweeper(interval=60, chunk_size=10, lock_ttl=120).acquire_lock()
+    follower = OverdueSweeper(interval=0.001, chunk_size=10, lock_ttl=120)
+
+    await run_briefly(follower)
+
+    assert follower.runs == 0
+    assert [document["status"] for document in database.borrowings.documents.values()] == [BorrowingStatus.ACTIVE]
+
+@pytest.mark.asyncio
+async def test_leader_sweeps(database):
+    database["borrowings"] = FakeCollection([borrowing(BorrowingStatus.ACTIVE, -1)])
+    leader = OverdueSweeper(interval=0.001, chunk_size=10, lock_ttl=120)
+
+    await run_briefly(leader)
+
+    assert leader.is_leader and leader.runs >= 1
+    assert [document["status"] for document in database.borrowings.documents.values()] == [BorrowingStatus.OVERDUE]
+
+@pytest.mark.asyncio
+async def test_sweep_only_moves_active_borrowings_past_due(database):
+    database["borrowings"] = FakeCollection([
+        borrowing(BorrowingStatus.ACTIVE, -2),
+        borrowing(BorrowingStatus.ACTIVE, 3),  # not due yet
+        borrowing(BorrowingStatus.RETURNED, -2),
+        borrowing(BorrowingStatus.RETURNED_OVERDUE, -5),
+        borrowing(BorrowingStatus.OVERDUE, -9),
+    ])
+    sweeper = OverdueSweeper(interval=60, chunk_size=10, lock_ttl=120)
+
+    assert await sweeper.sweep() == 1
+    assert [document["status"] for document in database.borrowings.documents.values()] == [
+        BorrowingStatus.OVERDUE, BorrowingStatus.ACTIVE, BorrowingStatus.RETURNED,
+        BorrowingStatus.RETURNED_OVERDUE, BorrowingStatus.OVERDUE,
+    ]
+    assert sweeper.stats()["last_run_at"] == NOW
+
+@pytest.mark.asyncio
+async def test_sweep_works_in_chunks(database):
+    """A backlog is written one chunk per update_many, a short chunk ends the sweep."""
+    database["borrowings"] = FakeCollection([borrowing(BorrowingStatus.ACTIVE, -day) for day in range(1, 8)])
+    chunks = []
+    update_many = database.borrowings.update_many
+
+    async def record(query, update, **kwargs):
+        chunks.append(len(query["_id"]["$in"]))
+        return await update_many(query, update, **kwargs)
+    database.borrowings.update_many = record
+    sweeper = OverdueSweeper(interval=60, chunk_size=3, lock_ttl=120)
+
+    assert await sweeper.sweep() == 7
+    assert chunks == [3, 3, 1]
+    assert sweeper.transitioned_total == 7
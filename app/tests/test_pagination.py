@@ -0,0 +1,135 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Response
+from fastapi.testclient import TestClient
+import base64
+import pytest
+
+from ..main import app
+from ..routes import sale as sale_routes
+from ..utils.pagination import (
+    DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER, Page, SortOrder, decode_cursor, encode_cursor, keyset_filter,
+    keyset_sort,
+)
+from .fakes import FakeCollection, FakeDatabase
+
+def test_cursor_round_trip():
+    """A cursor decodes back to the bookmarked id and sort value."""
+    last_id = ObjectId()
+    sort_value = datetime(2025, 1, 31, 12, 30)
+
+    decoded_id, decoded_value = decode_cursor(encode_cursor(last_id, sort_value))
+    assert decoded_id == last_id
+    assert decoded_value == sort_value
+
+def test_invalid_cursor():
+    """Malformed cursors are rejected with a 400."""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.parametrize("payload", [b'{"i": {"$oid": "zz"}}', b'{"i": {"$oid": "65a1b2c3d4e5f6a7b8c9d0e1"}, "k": {"$date": "x"}}'])
+def test_tampered_cursor(payload):
+    """Cursors carrying a bad ObjectId or date are a 400 too, not a 500."""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(base64.urlsafe_b64encode(payload).decode())
+    assert exc_info.value.status_code == 400
+
+def test_keyset_filter_on_id():
+    """Paging by _id seeks past the last seen id."""
+    last_id = ObjectId()
+    assert keyset_filter(None) == {}
+    assert keyset_filter(encode_cursor(last_id)) == {"_id": {"$gt": last_id}}
+    assert keyset_sort() == [("_id", 1)]
+
+def test_keyset_filter_on_sort_key():
+    """Paging by another field breaks ties on _id, documents without the field come last when descending."""
+    last_id = ObjectId()
+    last_date = datetime(2025, 1, 31)
+
+    query = keyset_filter(encode_cursor(last_id, last_date), "sale_date", descending=True)
+    assert query == {"$or": [
+        {"sale_date": {"$lt": last_date}},
+        {"sale_date": last_date, "_id": {"$lt": last_id}},
+        {"sale_date": None},
+    ]}
+    assert keyset_sort("sale_date", descending=True) == [("sale_date", -1), ("_id", -1)]
+
+def sales(count: int, **fields) -> FakeCollection:
+    """`count` sales a day apart, oldest first, on one bookstore."""
+    return FakeCollection([
+        {"_id": ObjectId(), "bookstore_id": BOOKSTORE, "sale_date": datetime(2025, 1, 1) + timedelta(days=day), **fields}
+        for day in range(count)
+    ])
+
+BOOKSTORE = ObjectId()
+
+async def walk(page_of, collection) -> list[list[dict]]:
+    """Every page of `collection`, following the next cursor until there is none."""
+    pages, cursor = [], None
+    while True:
+        page = page_of(cursor)
+        response = Response()
+        pages.append(await page.fetch(page.find(collection, {}), response))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+@pytest.mark.asyncio
+async def test_page_continues_descending_on_sort_field_and_id():
+    """Newest first across pages, ties on the sort field broken by _id, no cursor after the last page."""
+    collection = sales(4)
+    tied = {"_id": ObjectId(), "bookstore_id": BOOKSTORE, "sale_date": datetime(2025, 1, 3)}
+    await collection.insert_one(tied)
+
+    pages = await walk(lambda cursor: Page("sale_date", 2, cursor, SortOrder.DESC), collection)
+
+    dates = [[sale["sale_date"].day for sale in page] for page in pages]
+    assert dates == [[4, 3], [3, 2], [1]]
+    assert pages[0][1]["_id"] == tied["_id"]  # the higher _id first among equal dates
+
+@pytest.mark.asyncio
+async def test_page_without_limit_uses_default():
+    collection = sales(DEFAULT_PAGE_LIMIT + 1)
+    response = Response()
+
+    page = Page("sale_date", None, None, SortOrder.ASC)
+    assert len(await page.fetch(page.find(collection, {}), response)) == DEFAULT_PAGE_LIMIT
+    assert NEXT_CURSOR_HEADER in response.headers
+
+@pytest.mark.asyncio
+async def test_last_page_has_no_cursor():
+    response = Response()
+    page = Page("sale_date", 3, None, SortOrder.ASC)
+    assert len(await page.fetch(page.find(sales(3), {}), response)) == 3
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order", [SortOrder.ASC, SortOrder.DESC])
+async def test_page_walks_past_missing_sort_values(order):
+    """Documents without the sort field page like nulls instead of ending the walk."""
+    collection = sales(3)
+    for _ in range(3):
+        await collection.insert_one({"_id": ObjectId(), "bookstore_id": BOOKSTORE})
+
+    pages = await walk(lambda cursor: Page("sale_date", 2, cursor, order), collection)
+
+    ids = [sale["_id"] for page in pages for sale in page]
+    assert sorted(ids) == sorted(collection.documents) and len(set(ids)) == 6
+
+def test_sales_route_pages_and_caps_limit(monkeypatch):
+    """GET /sales/bookstore/{id} pages with the header, and refuses limits over the cap."""
+    monkeypatch.setattr(sale_routes, "db", FakeDatabase(sales=sales(3, client_id=ObjectId(), book_id=ObjectId(), amount=9.5)))
+    client = TestClient(app)
+
+    first = client.get(f"/sales/bookstore/{BOOKSTORE}?limit=2")
+    assert first.status_code == 200
+    assert [sale["sale_date"][:10] for sale in first.json()] == ["2025-01-03", "2025-01-02"]
+
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    last = client.get(f"/sales/bookstore/{BOOKSTORE}?limit=2&cursor={cursor}")
+    assert [sale["sale_date"][:10] for sale in last.json()] == ["2025-01-01"]
+    assert NEXT_CURSOR_HEADER not in last.headers
+
+    assert client.get(f"/sales/bookstore/{BOOKSTORE}?limit={MAX_PAGE_LIMIT + 1}").status_code == 422
+    assert client.get(f"/sales/bookstore/{BOOKSTORE}?cursor=tampered").status_code == 400
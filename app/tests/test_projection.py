@@ -0,0 +1,49 @@
+from bson import ObjectId
+from fastapi import HTTPException
+import json
+import pytest
+
+from ..models.book import Book
+from ..utils.projection import select_fields
+
+book_fields = select_fields(Book)
+
+def test_no_fields_selects_whole_model():
+    """Without `fields` documents are fetched and rendered whole."""
+    fields = book_fields(None)
+    assert not fields.partial
+    assert fields.projection is None
+    assert fields.codec.model is Book
+
+def test_fields_become_projection():
+    """Selected fields map to a Mongo projection, `id` is accepted for `_id`."""
+    fields = book_fields("id, title,price")
+    assert fields.partial
+    assert fields.projection == {"_id": 1, "price": 1, "title": 1}
+
+def test_unknown_field_rejected():
+    """Fields the model does not have are rejected with a 400."""
+    with pytest.raises(HTTPException) as exc_info:
+        book_fields("title,publisher")
+    assert exc_info.value.status_code == 400
+    assert "publisher" in exc_info.value.detail
+
+def test_dump_keeps_only_selected_fields():
+    """Partial documents render only the selected fields they have."""
+    fields = book_fields("_id,title,genre")
+    book_id = ObjectId()
+
+    document = {"_id": book_id, "title": "Dune", "price": 9.99}
+    assert fields.dump(document) == {"_id": str(book_id), "title": "Dune"}
+
+def test_response_carries_headers():
+    """Headers set on the endpoint response, like the next cursor, are kept."""
+    from fastapi import Response
+
+    fields = book_fields("title")
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+
+    rendered = fields.response([{"_id": ObjectId(), "title": "Dune"}], response)
+    assert json.loads(rendered.body) == [{"title": "Dune"}]
+    assert rendered.headers["X-Next-Cursor"] == "abc"
@@ -0,0 +1,68 @@
+from bson import ObjectId
+import asyncio
+import pytest
+
+from .. import repository
+from ..repository import BatchLoader
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+class FakeCollection:
+    """Collection stub answering $in queries on _id and recording them."""
+
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+        self.queries = []
+
+    def find(self, query):
+        ids = query["_id"]["$in"]
+        self.queries.append(ids)
+        return FakeCursor([self.documents[i] for i in ids if i in self.documents])
+
+@pytest.fixture
+def books(monkeypatch):
+    collection = FakeCollection([{"_id": ObjectId(), "title": f"Book {i}"} for i in range(5)])
+    monkeypatch.setattr(repository, "db", {"books": collection})
+    return collection
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_query(books):
+    """Lookups made in the same tick are answered by a single $in query."""
+    loader = BatchLoader("books")
+    ids = list(books.documents)
+    missing = ObjectId()
+
+    results = await asyncio.gather(*(loader.load(i) for i in ids + [ids[0], missing]))
+
+    assert len(books.queries) == 1
+    assert sorted(books.queries[0]) == sorted(ids + [missing])  # repeated ids are asked once
+    assert [result["_id"] for result in results[:5]] == ids
+    assert results[5] is results[0]
+    assert results[6] is None
+
+@pytest.mark.asyncio
+async def test_large_batches_are_split(books):
+    """Batches over the size limit go out as several queries."""
+    loader = BatchLoader("books", max_batch_size=2)
+
+    results = await loader.load_many(list(books.documents))
+
+    assert [len(ids) for ids in books.queries] == [2, 2, 1]
+    assert all(result is not None for result in results)
+
+@pytest.mark.asyncio
+async def test_later_ticks_query_again(books):
+    """Nothing is kept after a batch resolves, the next lookup reads Mongo again."""
+    loader = BatchLoader("books")
+    book_id = next(iter(books.documents))
+
+    await loader.load(book_id)
+    await loader.load(book_id)
+
+    assert len(books.queries) == 2
+    assert loader.stats() == {"loads": 2, "batches": 2}
@@ -0,0 +1,129 @@
+from bson import ObjectId
+from fastapi import HTTPException
+import pytest
+
+from ..config import settings
+from ..services import inventory, sale, write_buffer
+from ..services.inventory import reserve_stock, stripe_stock
+from ..services.sale import insert_sale
+from .fakes import FakeCollection, FakeDatabase
+
+ISBN = "9780451524935"
+
+class FakeRepository:
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+
+    async def get(self, document_id):
+        return self.documents.get(document_id)
+
+async def no_transaction(callback):
+    raise AssertionError("a standalone mongod cannot run transactions")
+
+async def without_session(callback):
+    return await callback(None)
+
+@pytest.fixture
+def store(monkeypatch):
+    """One book stocked with 3 copies in one bookstore, on a standalone mongod."""
+    book = {"_id": ObjectId(), "isbn": ISBN, "title": "1984", "author": "George Orwell", "price": 12.99}
+    bookstore_id = ObjectId()
+    database = FakeDatabase(book_inventories=FakeCollection([
+        {"bookstore_id": bookstore_id, "isbn": ISBN, "quantity_available": 3},
+    ]))
+    for module in (sale, inventory, write_buffer):
+        monkeypatch.setattr(module, "db", database)
+    monkeypatch.setattr(sale, "books", FakeRepository([book]))
+    monkeypatch.setattr(settings, "sale_transactions", True)
+    monkeypatch.setattr(settings, "group_commit_enabled", False)
+
+    async def standalone():
+        return False
+    monkeypatch.setattr(sale, "transactions_supported", standalone)
+    monkeypatch.setattr(inventory, "transactions_supported", standalone)
+    monkeypatch.setattr(sale, "run_transaction", no_transaction)
+    monkeypatch.setattr(inventory, "run_transaction", no_transaction)
+
+    database.sale = {"client_id": ObjectId(), "book_id": book["_id"], "bookstore_id": bookstore_id, "amount": 12.99}
+    return database
+
+def stock(database) -> int:
+    return sum(item["quantity_available"] for item in database.book_inventories.documents.values())
+
+@pytest.mark.asyncio
+async def test_sale_takes_one_copy_without_transactions(store):
+    """On a standalone mongod the sale falls back to the compensating path instead of failing."""
+    sale_id = await insert_sale(dict(store.sale))
+
+    assert sale_id in store.sales.documents
+    assert stock(store) == 2
+
+@pytest.mark.asyncio
+async def test_out_of_stock_is_409(store):
+    for _ in range(3):
+        await insert_sale(dict(store.sale))
+
+    with pytest.raises(HTTPException) as error:
+        await insert_sale(dict(store.sale))
+
+    assert error.value.status_code == 409
+    assert stock(store) == 0
+    assert len(store.sales.documents) == 3
+
+@pytest.mark.asyncio
+async def test_no_inventory_document_is_409(store):
+    """A bookstore that never stocked the book cannot sell it."""
+    with pytest.raises(HTTPException) as error:
+        await insert_sale({**store.sale, "bookstore_id": ObjectId()})
+
+    assert error.value.status_code == 409
+    assert not store.sales.documents
+
+@pytest.mark.asyncio
+async def test_unknown_book_is_404(store):
+    with pytest.raises(HTTPException) as error:
+        await insert_sale({**store.sale, "book_id": ObjectId()})
+
+    assert error.value.status_code == 404
+    assert stock(store) == 3
+
+@pytest.mark.asyncio
+async def test_failed_insert_gives_the_copy_back(store, monkeypatch):
+    async def failing_insert(document, session=None):
+        raise RuntimeError("insert failed")
+    monkeypatch.setattr(store.sales, "insert_one", failing_insert)
+
+    with pytest.raises(RuntimeError):
+        await insert_sale(dict(store.sale))
+
+    assert stock(store) == 3
+
+@pytest.mark.asyncio
+async def test_stripe_stock_keeps_the_total(store, monkeypatch):
+    """Restriping spreads the copies evenly and merging them back keeps every copy."""
+    monkeypatch.setattr(settings, "inventory_stripe_slots", 4)
+    bookstore_id = store.sale["bookstore_id"]
+    await store.book_inventories.update_one({"isbn": ISBN}, {"$set": {"quantity_available": 10}})
+
+    assert await stripe_stock(bookstore_id, ISBN, 4) == 10
+    assert sorted(item["quantity_available"] for item in store.book_inventories.documents.values()) == [2, 2, 3, 3]
+
+    # striped stock sells out exactly, whichever stripe each buyer lands on
+    sold = 0
+    while await reserve_stock(bookstore_id, ISBN):
+        sold += 1
+    assert sold == 10
+
+    await store.book_inventories.update_many({"isbn": ISBN}, {"$inc": {"quantity_available": 1}})
+    assert await stripe_stock(bookstore_id, ISBN, 1) == 4
+    assert [item.get("slot") for item in store.book_inventories.documents.values()] == [None]
+
+@pytest.mark.asyncio
+async def test_stripe_stock_uses_a_transaction_when_supported(store, monkeypatch):
+    async def replica_set():
+        return True
+    monkeypatch.setattr(inventory, "transactions_supported", replica_set)
+    monkeypatch.setattr(inventory, "run_transaction", without_session)
+
+    assert await stripe_stock(store.sale["bookstore_id"], ISBN, 3) == 3
+    assert stock(store) == 3
@@ -0,0 +1,99 @@
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from ..models.sale import RollupDimension, RollupGranularity
+from ..services import sales_rollup
+from ..services.sales_rollup import get_rollups, rebuild_rollups, record_sales
+from .fakes import FakeCollection, FakeDatabase
+
+STORE, OTHER_STORE, BOOK = ObjectId(), ObjectId(), ObjectId()
+
+SALES = [
+    {"bookstore_id": STORE, "book_id": BOOK, "amount": 10.0, "sale_date": datetime(2024, 3, 1, 9)},
+    {"bookstore_id": STORE, "book_id": BOOK, "amount": 12.5, "sale_date": datetime(2024, 3, 1, 18)},
+    {"bookstore_id": STORE, "book_id": BOOK, "amount": 7.0, "sale_date": datetime(2024, 3, 20)},
+    {"bookstore_id": str(OTHER_STORE), "book_id": BOOK, "amount": 5.0, "sale_date": datetime(2024, 4, 2)},
+]
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase(sales=FakeCollection(SALES))
+    monkeypatch.setattr(sales_rollup, "db", database)
+    return database
+
+def buckets(collection) -> set:
+    return {
+        (rollup["dimension"], rollup["key"], rollup["granularity"], rollup["period"], rollup["revenue"], rollup["count"])
+        for rollup in collection.documents.values()
+    }
+
+@pytest.mark.asyncio
+async def test_record_sales_buckets_by_day_and_month(database):
+    """Sales of a day or month land in one bucket per dimension, keyed by the string id."""
+    await record_sales(SALES)
+
+    days = await get_rollups(RollupDimension.BOOKSTORE, str(STORE), RollupGranularity.DAY)
+    assert [(rollup.period, rollup.revenue, rollup.count) for rollup in days] == [
+        (datetime(2024, 3, 1), 22.5, 2), (datetime(2024, 3, 20), 7.0, 1),
+    ]
+    months = await get_rollups(RollupDimension.BOOK, str(BOOK), RollupGranularity.MONTH)
+    assert [(rollup.period, rollup.revenue, rollup.count) for rollup in months] == [
+        (datetime(2024, 3, 1), 29.5, 3), (datetime(2024, 4, 1), 5.0, 1),
+    ]
+    assert len(database.sales_rollups.documents) == 10
+
+@pytest.mark.asyncio
+async def test_record_sales_adds_to_existing_buckets(database):
+    await record_sales(SALES[:1])
+    await record_sales(SALES[1:2])
+
+    days = await get_rollups(RollupDimension.BOOKSTORE, str(STORE), RollupGranularity.DAY)
+    assert [(rollup.revenue, rollup.count) for rollup in days] == [(22.5, 2)]
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_recorded_sales(database):
+    """A rebuild from the raw sales gives the buckets recording them did, stale ones dropped."""
+    await record_sales(SALES)
+    recorded = buckets(database.sales_rollups)
+    await record_sales([{"bookstore_id": STORE, "book_id": BOOK, "amount": 99.0, "sale_date": datetime(2023, 1, 1)}])
+
+    assert await rebuild_rollups() == 10
+    assert buckets(database.sales_rollups) == recorded
+
+@pytest.mark.asyncio
+async def test_rebuild_swaps_in_a_complete_collection(database):
+    """The live rollups are not touched until the rebuilt ones replace them in one rename."""
+    await record_sales(SALES)
+    live = database.sales_rollups
+    merged_into = []
+    aggregate = database.sales.aggregate
+
+    def watch(pipeline, **kwargs):
+        merged_into.append(pipeline[-1]["$merge"]["into"])
+        assert database.sales_rollups is live and len(live.documents) == 10  # readers still see the old buckets
+        return aggregate(pipeline, **kwargs)
+    database.sales.aggregate = watch
+
+    await rebuild_rollups()
+
+    assert set(merged_into) == {sales_rollup.REBUILD_COLLECTION}
+    assert database.sales_rollups is not live
+    assert database.sales_rollups.indexes == ["dimension_1_key_1_granularity_1_period_1"]
+    assert sales_rollup.REBUILD_COLLECTION not in database
+
+@pytest.mark.asyncio
+async def test_aware_sale_dates_are_bucketed_in_utc(database):
+    """A sale late on January 31st in New York is a February 1st sale in UTC, recorded or rebuilt."""
+    sale = {"bookstore_id": STORE, "book_id": BOOK, "amount": 10.0,
+            "sale_date": datetime(2025, 1, 31, 23, 30, tzinfo=timezone(timedelta(hours=-5)))}
+    await record_sales([sale])
+
+    months = await get_rollups(RollupDimension.BOOKSTORE, str(STORE), RollupGranularity.MONTH)
+    assert [rollup.period for rollup in months] == [datetime(2025, 2, 1)]
+
+    # as the driver reads it back: naive UTC
+    database["sales"] = FakeCollection([{**sale, "sale_date": datetime(2025, 2, 1, 4, 30)}])
+    recorded = buckets(database.sales_rollups)
+    await rebuild_rollups()
+    assert buckets(database.sales_rollups) == recorded
@@ -0,0 +1,56 @@
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from ..services.search import PrefixIndex, tokenize
+from .fakes import FakeCollection
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Émile Zola: Thérèse Raquin") == ["emile", "zola", "therese", "raquin"]
+
+def test_prefix_search():
+    """Every query word must prefix a word of the title, author or genre."""
+    index = PrefixIndex()
+    gatsby = {"_id": ObjectId(), "title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "genre": "Classic"}
+    index.add(gatsby)
+    index.add({"_id": ObjectId(), "title": "Great Expectations", "author": "Charles Dickens"})
+
+    assert [book.title for book in index.search("gre")] == ["The Great Gatsby", "Great Expectations"]
+    assert [book.title for book in index.search("great fitz")] == ["The Great Gatsby"]
+    assert index.search("tolstoy") == []
+
+    index.remove(str(gatsby["_id"]))
+    assert [book.title for book in index.search("gre")] == ["Great Expectations"]
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_late_inserts():
+    """A book committed after the refresh passed its _id, as another worker's insert can be, is still loaded."""
+    now = datetime.now(timezone.utc)
+    late = {"_id": ObjectId.from_datetime(now - timedelta(seconds=5)), "title": "Late Arrival", "author": "Slow Worker"}
+    books = FakeCollection([{"_id": ObjectId.from_datetime(now), "title": "Early Bird", "author": "Fast Worker"}])
+    index = PrefixIndex()
+    await index.refresh(books)
+
+    await books.insert_one(late)
+    assert await index.refresh(books) == 2  # the overlap reads the known book again, it is not indexed twice
+
+    assert [book.title for book in index.search("la")] == ["Late Arrival"]
+    assert len(index) == 2
+
+@pytest.mark.asyncio
+async def test_rebuild_drops_deletes_and_edits_from_other_workers():
+    gatsby = {"_id": ObjectId(), "title": "The Great Gatsby", "author": "F. Scott Fitzgerald"}
+    expectations = {"_id": ObjectId(), "title": "Great Expectations", "author": "Charles Dickens"}
+    books = FakeCollection([gatsby, expectations])
+    index = PrefixIndex()
+    await index.refresh(books)
+
+    await books.delete_one({"_id": gatsby["_id"]})
+    await books.update_one({"_id": expectations["_id"]}, {"$set": {"title": "Bleak House"}})
+    assert await index.refresh(books) == 1
+    assert len(index.search("great")) == 2
+
+    assert await index.rebuild(books) == 1
+    assert index.search("great") == []
+    assert [book.title for book in index.search("bleak")] == ["Bleak House"]
+    assert index.watermark == expectations["_id"]
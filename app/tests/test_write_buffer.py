@@ -0,0 +1,89 @@
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, DuplicateKeyError
+import asyncio
+import pytest
+
+from ..config import settings
+from ..services import write_buffer
+from ..services.write_buffer import WriteBuffer
+
+class FakeCollection:
+    """Collection stub recording insert_many batches, documents titled 'dup' fail."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        if self.error:
+            raise self.error
+        self.batches.append(documents)
+        failing = [index for index, document in enumerate(documents) if document.get("title") == "dup"]
+        if failing:
+            raise BulkWriteError({"writeErrors": [
+                {"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"} for index in failing
+            ]})
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    monkeypatch.setattr(settings, "group_commit_enabled", True)
+    monkeypatch.setattr(settings, "group_commit_max_wait_ms", 5)
+    monkeypatch.setattr(settings, "group_commit_max_batch", 100)
+
+    def collection(error=None):
+        fake = FakeCollection(error)
+        monkeypatch.setattr(write_buffer, "db", {"sales": fake})
+        return fake
+    return collection
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_share_one_insert_many(group_commit):
+    """Inserts made within the window are written together, each caller gets its own id."""
+    sales = group_commit()
+    buffer = WriteBuffer("sales")
+    documents = [{"title": f"Sale {i}"} for i in range(10)]
+
+    ids = await asyncio.gather(*(buffer.insert(document) for document in documents))
+
+    assert len(sales.batches) == 1
+    assert ids == [document["_id"] for document in sales.batches[0]]
+    assert all(isinstance(document_id, ObjectId) for document_id in ids)
+    assert buffer.stats()["largest_batch"] == 10
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_without_waiting(group_commit, monkeypatch):
+    """Reaching max_batch flushes at once instead of at the end of the window."""
+    monkeypatch.setattr(settings, "group_commit_max_wait_ms", 60_000)
+    monkeypatch.setattr(settings, "group_commit_max_batch", 3)
+    sales = group_commit()
+    buffer = WriteBuffer("sales")
+
+    await asyncio.wait_for(asyncio.gather(*(buffer.insert({"title": str(i)}) for i in range(6))), timeout=1)
+
+    assert [len(batch) for batch in sales.batches] == [3, 3]
+
+@pytest.mark.asyncio
+async def test_write_errors_only_fail_their_document(group_commit):
+    """A duplicate fails its own insert, the rest of the batch is written."""
+    group_commit()
+    buffer = WriteBuffer("sales")
+
+    results = await asyncio.gather(
+        buffer.insert({"title": "ok"}), buffer.insert({"title": "dup"}), buffer.insert({"title": "ok too"}),
+        return_exceptions=True
+    )
+
+    assert isinstance(results[0], ObjectId) and isinstance(results[2], ObjectId)
+    assert isinstance(results[1], DuplicateKeyError)
+    assert buffer.stats()["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_insert(group_commit):
+    """An error on the whole insert_many reaches every caller of the batch."""
+    group_commit(error=AutoReconnect("connection lost"))
+    buffer = WriteBuffer("sales")
+
+    results = await asyncio.gather(*(buffer.insert({"title": str(i)}) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, AutoReconnect) for result in results)
@@ -100,19 +100,19 @@ def generate_data():
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[0]["isbn"]),  # 1984
+            "isbn": books[0]["isbn"],  # 1984
             "quantity_available": 3
         },
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[1]["isbn"]),  # To Kill a Mockingbird
+            "isbn": books[1]["isbn"],  # To Kill a Mockingbird
             "quantity_available": 2
         },
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[4]["isbn"]),  # Where the Crawdads Sing
+            "isbn": books[4]["isbn"],  # Where the Crawdads Sing
             "quantity_available": 5
         }
     ]
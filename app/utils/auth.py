@@ -1,41 +1,58 @@
 import jwt
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-SECRET_KEY = "my-secret-key"
-ALGORITHM = "HS256"
+from ..config import settings
+from .cache import LRUCache
 
 security = HTTPBearer()
 
+# sha256(token) -> decoded payload, entries expire together with the token
+_verified_tokens = LRUCache(maxsize=settings.token_cache_size)
+
 def create_access_token(data: dict) -> str:
     """
     Creates a JWT token with expiration.
     The 'data' dict gets encoded into the token.
     """
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=60)
+    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expire_minutes)
     to_encode.update({"exp": expire})
     
     # This encodes and signs the data
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    print(f"Generated JWT: {encoded_jwt}")
-    return encoded_jwt
+    return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Returns the decoded token data if valid.
+    Tokens that were already verified are served from memory until they expire.
     """
     token = credentials.credentials
+    key = _token_key(token)
+
+    payload: Optional[dict] = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
 
-    print(f"Verifying JWT: {token}")
-    
     try:
         # Decode and verify the token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # never serve a token from the cache past its own expiry
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        ttl = expires_at - time.time()
+        if ttl > 0:
+            _verified_tokens.set(key, payload, ttl=ttl)
+    return payload
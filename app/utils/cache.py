@@ -0,0 +1,184 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+import copy
+import time
+
+from ..config import settings
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind the caches.
+
+    The interface is async so a shared cache (e.g. Redis) can implement it
+    without blocking the event loop. Values are Mongo documents as the driver
+    returns them, ObjectIds and datetimes included, so a shared backend has to
+    encode them as BSON rather than JSON. Every `get` hands out a value the
+    caller owns: changing it must not change what is cached.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class LRUCache:
+    """
+    In-process LRU cache with a time-to-live per entry.
+
+    Not thread safe: meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache backend kept in the worker process, values are copied in and out."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(maxsize, ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        # routes rewrite the documents they get (e.g. _id to str), they must not rewrite the cache
+        return copy.deepcopy(self._cache.get(key))
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, copy.deepcopy(value), ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class EntityCache:
+    """
+    Read-through cache of documents of one entity type, keyed by id.
+
+    A load that was in flight when its key got invalidated returned what
+    was there before the write; it is handed to its caller but not cached,
+    or the old document would be served for the whole TTL.
+    """
+
+    def __init__(self, namespace: str, backend: CacheBackend):
+        self.namespace = namespace
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        # key -> [invalidations seen, loads in flight], only while a load of the key is in flight
+        self._loads: dict[str, list[int]] = {}
+
+    def _key(self, entity_id: str) -> str:
+        return f"{self.namespace}:{entity_id}"
+
+    async def get_or_load(self, entity_id: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Return the cached document or load it and cache it. Misses are not cached."""
+        key = self._key(entity_id)
+        document = await self.backend.get(key)
+        if document is not None:
+            self.hits += 1
+            return document
+
+        self.misses += 1
+        state = self._loads.setdefault(key, [0, 0])
+        generation = state[0]
+        state[1] += 1
+        try:
+            document = await loader()
+        finally:
+            state[1] -= 1
+            if not state[1]:
+                del self._loads[key]
+
+        if document is not None:
+            if state[0] == generation:
+                await self.backend.set(key, document)
+            else:
+                self.discarded += 1
+        return document
+
+    async def invalidate(self, entity_id: str) -> None:
+        key = self._key(entity_id)
+        state = self._loads.get(key)
+        if state is not None:
+            state[0] += 1  # loads already running read the document from before the write
+        await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "discarded": self.discarded}
+
+
+entity_cache_backend: CacheBackend = MemoryCacheBackend(
+    maxsize=settings.entity_cache_size,
+    ttl=settings.entity_cache_ttl_seconds
+)
+
+book_cache = EntityCache("book", entity_cache_backend)
+bookstore_cache = EntityCache("bookstore", entity_cache_backend)
+client_cache = EntityCache("client", entity_cache_backend)
+
+ENTITY_CACHES = [book_cache, bookstore_cache, client_cache]
+
+
+def configure_cache_backend(backend: CacheBackend) -> None:
+    """Swap the backend of every entity cache, e.g. for a shared cache."""
+    global entity_cache_backend
+    entity_cache_backend = backend
+    for cache in ENTITY_CACHES:
+        cache.backend = backend
+
+
+def cache_stats() -> dict:
+    return {
+        "entities": {cache.namespace: cache.stats() for cache in ENTITY_CACHES},
+        "size": len(entity_cache_backend),
+    }
@@ -0,0 +1,96 @@
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from functools import lru_cache
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from typing import Any, Callable, Optional
+
+_MISSING = object()
+
+
+def encode_value(value: Any) -> Any:
+    """BSON value as it goes out in JSON: ObjectIds become strings, datetimes are left to orjson."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    return value
+
+
+class ReadCodec:
+    """
+    Turns Mongo documents into response rows of a model without validating them.
+
+    Documents read back from our own collections were validated on the way
+    in, so reads skip `Model(**doc)` and FastAPI's second validation of the
+    return value: one pass picks the model's fields in declaration order,
+    fills in defaults and turns ObjectIds (wherever they are stored) into
+    strings, and the rows are written with orjson.
+
+    With `fields` only those fields are emitted, and only when the document
+    has them, which is what sparse fieldsets need.
+    """
+
+    def __init__(self, model: type[BaseModel], fields: Optional[tuple[str, ...]] = None):
+        self.model = model
+        self._fields: list[tuple[str, Callable[[], Any] | object]] = []
+        for name, info in model.model_fields.items():
+            key = info.alias or name
+            if fields is not None:
+                if key in fields:
+                    self._fields.append((key, _MISSING))
+            elif info.default_factory is not None:
+                self._fields.append((key, info.default_factory))
+            elif info.default is not PydanticUndefined:
+                self._fields.append((key, lambda default=info.default: default))
+            else:
+                self._fields.append((key, _MISSING))
+
+    def row(self, document: dict) -> dict:
+        row = {}
+        for key, default in self._fields:
+            value = document.get(key, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING:
+                    continue
+                value = default()
+            row[key] = encode_value(value)
+        return row
+
+    def rows(self, documents: list[dict]) -> list[dict]:
+        return [self.row(document) for document in documents]
+
+    def construct(self, document: dict) -> BaseModel:
+        """Model instance of a trusted document, for code that needs the model itself."""
+        return self.model.model_construct(**{
+            name: encode_value(document[info.alias or name])
+            for name, info in self.model.model_fields.items()
+            if (info.alias or name) in document
+        })
+
+    def response(self, content: dict | list[dict], response: Optional[Response] = None) -> ORJSONResponse:
+        """Render one document or a list of them."""
+        return json_response(self.rows(content) if isinstance(content, list) else self.row(content), response)
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> ORJSONResponse:
+    """
+    orjson response of already encoded rows.
+
+    Headers already set on the endpoint's `response` (e.g. the next page
+    cursor) are carried over, FastAPI only merges them into responses it
+    builds itself.
+    """
+    rendered = ORJSONResponse(content)
+    if response is not None:
+        rendered.headers.update(response.headers)
+    return rendered
+
+
+@lru_cache(maxsize=None)
+def read_codec(model: type[BaseModel], fields: Optional[tuple[str, ...]] = None) -> ReadCodec:
+    """Shared codec of a model, or of a selection of its fields."""
+    return ReadCodec(model, fields)
@@ -0,0 +1,307 @@
+"""
+Synthetic dataset generator for capacity planning and load tests.
+
+Produces books, bookstores, their inventory, clients, borrowings and sales
+that reference each other consistently, at any scale:
+
+- Deterministic: the same `DatasetSpec` (seed and end date included) always
+  produces the same documents. Ids are derived from a document's position
+  (`object_id(BOOKS, 42)`), so references are computed instead of looked up
+  and no id list is ever held in memory.
+- Skewed like real traffic: book popularity and client activity follow a
+  Zipf law, every store stocks the bestsellers plus its own slice of the long
+  tail, and sales have a weekly cycle and a December peak.
+- Streamed: collections are generated lazily and written with unordered
+  `insert_many` batches, a few in flight at a time, so memory stays at
+  `batch_size * concurrency` documents however large the dataset is.
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta
+from itertools import accumulate
+from math import cos, gcd, pi
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Callable, Iterator, Optional
+import asyncio
+import logging
+import random
+import time
+
+from ..models.book import BookCondition
+from .isbn import complete_isbn13
+
+logger = logging.getLogger(__name__)
+
+# Id namespaces, bytes 5-6 of every generated ObjectId
+BOOKS, CLIENTS, BOOKSTORES, INVENTORIES, BORROWINGS, SALES = range(1, 7)
+# Timestamp part of generated ObjectIds
+ID_EPOCH = int(datetime(2024, 1, 1).timestamp())
+
+SYLLABLES = ["ka", "lo", "mi", "ran", "tel", "vor", "shi", "den", "qua", "bel", "zor", "nim", "ath", "pel", "ric", "oss"]
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "David", "Elena", "Felipe", "Grace", "Hugo", "Iris", "Jonas", "Lucia", "Marco"]
+GENRES = ["Fiction", "Mystery", "Fantasy", "Science", "History", "Biography", "Poetry", "Technology", "Romance", "Children"]
+# Mostly new copies
+CONDITIONS = [condition.value for condition in (
+    BookCondition.NEW, BookCondition.NEW, BookCondition.NEW, BookCondition.GOOD, BookCondition.GOOD,
+    BookCondition.POOR, BookCondition.VERY_POOR,
+)]
+
+
+class DatasetSpec(BaseModel):
+    """Size and shape of a generated dataset."""
+    books: int = Field(100_000, ge=0)
+    clients: int = Field(10_000, ge=0)
+    bookstores: int = Field(100, ge=0)
+    # Distinct books each bookstore stocks, half bestsellers shared by every store, half its own
+    stock_per_bookstore: int = Field(1000, ge=0)
+    borrowings: int = Field(500_000, ge=0)
+    sales: int = Field(500_000, ge=0)
+    seed: int = 42
+    # Borrowings and sales fall in the `days` before `end`
+    end: datetime = Field(default_factory=lambda: datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    days: int = Field(365, ge=1)
+    # Zipf exponents, higher means a steeper head
+    book_skew: float = 1.1
+    client_skew: float = 0.8
+    # Added to every inventory quantity, e.g. so a load test never runs out of stock
+    min_stock: int = 0
+
+
+def object_id(namespace: int, index: int) -> ObjectId:
+    """Id of the `index`-th generated document of a namespace."""
+    return ObjectId(ID_EPOCH.to_bytes(4, "big") + namespace.to_bytes(2, "big") + index.to_bytes(6, "big"))
+
+
+def book_isbn(index: int) -> str:
+    """ISBN of the `index`-th generated book, all in the 978-0 range."""
+    return complete_isbn13(f"978{index:09d}")
+
+
+def book_price(index: int) -> float:
+    """List price of the `index`-th generated book, also what its sales are charged."""
+    return round(4.99 + index * 2654435761 % 8500 / 100, 2)
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    """Cumulative Zipf weights of ranks 0..count-1, for `random.choices(cum_weights=...)`."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+class Dataset:
+    """Documents of a `DatasetSpec`, one lazily generated collection at a time."""
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self.stock = min(spec.stock_per_bookstore, spec.books)
+        self._shared_stock = self.stock // 2
+        # rank -> book index: a multiplicative permutation spreads bestsellers over the catalog
+        self._stride = next(
+            (stride for stride in range(7919, 7919 + spec.books + 1) if gcd(stride, spec.books) == 1), 1
+        ) if spec.books else 1
+        # ranks of the stocked slots follow popularity, so a Zipf draw over slots is skewed too
+        self._slot_weights = zipf_weights(self.stock, spec.book_skew)
+        self._client_weights = zipf_weights(min(spec.clients, 100_000), spec.client_skew)
+        self._day_weights = list(accumulate(self._day_weight(day) for day in range(spec.days)))
+
+    # references
+
+    def book_of_rank(self, rank: int) -> int:
+        return rank * self._stride % self.spec.books
+
+    def stocked_book(self, bookstore: int, slot: int) -> int:
+        """Book index stocked in `slot` of `bookstore`."""
+        if slot < self._shared_stock:
+            return self.book_of_rank(slot)
+        tail = self.spec.books - self._shared_stock
+        offset = slot - self._shared_stock
+        width = self.stock - self._shared_stock
+        return self.book_of_rank(self._shared_stock + (bookstore * width + offset) % tail)
+
+    def _client(self, rng: random.Random) -> int:
+        # Zipf over at most 100k ranks, a rank stands for a group of clients beyond that
+        head = len(self._client_weights)
+        rank = rng.choices(range(head), cum_weights=self._client_weights)[0]
+        client = rank + head * rng.randrange(-(-self.spec.clients // head))
+        return client if client < self.spec.clients else rank
+
+    def _slot(self, rng: random.Random) -> int:
+        return rng.choices(range(self.stock), cum_weights=self._slot_weights)[0]
+
+    def _day_weight(self, day: int) -> float:
+        """Relative sales of a day: weekends busier, a December peak and a summer dip."""
+        date = self.spec.end - timedelta(days=self.spec.days - day)
+        weekly = 1.4 if date.weekday() >= 5 else 1.0
+        seasonal = 1 + 0.35 * cos(2 * pi * (date.timetuple().tm_yday - 355) / 365)
+        return weekly * seasonal * (2.0 if date.month == 12 and date.day < 25 else 1.0)
+
+    def _date(self, rng: random.Random) -> datetime:
+        day = rng.choices(range(self.spec.days), cum_weights=self._day_weights)[0]
+        return self.spec.end - timedelta(days=self.spec.days - day, seconds=-rng.randrange(86400))
+
+    def _rng(self, namespace: int) -> random.Random:
+        # one stream per collection, so each can be generated on its own
+        return random.Random(self.spec.seed * 1000 + namespace)
+
+    # collections
+
+    def books(self) -> Iterator[dict]:
+        rng = self._rng(BOOKS)
+        vocabulary = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(5000)]
+        for index in range(self.spec.books):
+            yield {
+                "_id": object_id(BOOKS, index),
+                "isbn": book_isbn(index),
+                "title": " ".join(rng.choice(vocabulary).capitalize() for _ in range(rng.randint(1, 5))),
+                "author": f"{rng.choice(vocabulary).capitalize()} {rng.choice(vocabulary).capitalize()}",
+                "genre": rng.choice(GENRES),
+                "price": book_price(index),
+                "condition": rng.choice(CONDITIONS),
+            }
+
+    def bookstores(self) -> Iterator[dict]:
+        rng = self._rng(BOOKSTORES)
+        for index in range(self.spec.bookstores):
+            yield {
+                "_id": object_id(BOOKSTORES, index),
+                "name": f"Bookstore {index + 1}",
+                "address": f"{rng.randint(1, 999)} {rng.choice(SYLLABLES).capitalize()}{rng.choice(SYLLABLES)} Street",
+                "email": f"store{index + 1}@bookstore.example",
+            }
+
+    def book_inventories(self) -> Iterator[dict]:
+        rng = self._rng(INVENTORIES)
+        for bookstore in range(self.spec.bookstores):
+            bookstore_id = object_id(BOOKSTORES, bookstore)
+            for slot in range(self.stock):
+                yield {
+                    "_id": object_id(INVENTORIES, bookstore * self.stock + slot),
+                    "bookstore_id": bookstore_id,
+                    "isbn": book_isbn(self.stocked_book(bookstore, slot)),
+                    # bestsellers are stocked deeper
+                    "quantity_available": self.spec.min_stock + rng.randint(0, 3) + 200 // (slot + 1),
+                }
+
+    def clients(self) -> Iterator[dict]:
+        rng = self._rng(CLIENTS)
+        for index in range(self.spec.clients):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+            yield {
+                "_id": object_id(CLIENTS, index),
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name.lower()}.{last_name.lower()}.{index}@example.com",
+                "address": f"{rng.randint(1, 999)} {rng.choice(SYLLABLES).capitalize()} Avenue",
+                "is_active": rng.random() > 0.02,
+                "version": 0,
+            }
+
+    def borrowings(self) -> Iterator[dict]:
+        """Mostly from bookstores (a book they stock), some lent between clients."""
+        rng = self._rng(BORROWINGS)
+        if not (self.spec.clients and self.stock and self.spec.bookstores):
+            return
+        for index in range(self.spec.borrowings):
+            if rng.random() < 0.9:
+                bookstore = rng.randrange(self.spec.bookstores)
+                source = ("bookstore", object_id(BOOKSTORES, bookstore))
+                book = self.stocked_book(bookstore, self._slot(rng))
+            else:
+                source = ("client", object_id(CLIENTS, self._client(rng)))
+                book = self.book_of_rank(self._slot(rng))
+            borrow_date = self._date(rng)
+            due_date = borrow_date + timedelta(days=rng.choice((7, 14, 21, 30)))
+            document = {
+                "_id": object_id(BORROWINGS, index),
+                "borrower_id": object_id(CLIENTS, self._client(rng)),
+                "source_type": source[0],
+                "source_id": source[1],
+                "book_id": object_id(BOOKS, book),
+                "borrow_date": borrow_date,
+                "due_date": due_date,
+                "status": "active",
+            }
+            if due_date < self.spec.end and rng.random() < 0.85:
+                document["return_date"] = min(borrow_date + timedelta(days=rng.uniform(1, 40)), self.spec.end)
+                document["status"] = "returned_overdue" if document["return_date"] > due_date else "returned"
+            elif due_date < self.spec.end:
+                document["status"] = "overdue"
+            yield document
+
+    def sales(self) -> Iterator[dict]:
+        """Each sale is of a book its bookstore stocks, at the book's price."""
+        rng = self._rng(SALES)
+        if not (self.spec.clients and self.stock and self.spec.bookstores):
+            return
+        for index in range(self.spec.sales):
+            bookstore = rng.randrange(self.spec.bookstores)
+            book = self.stocked_book(bookstore, self._slot(rng))
+            yield {
+                "_id": object_id(SALES, index),
+                "client_id": object_id(CLIENTS, self._client(rng)),
+                "book_id": object_id(BOOKS, book),
+                "bookstore_id": object_id(BOOKSTORES, bookstore),
+                "amount": book_price(book),
+                "sale_date": self._date(rng),
+            }
+
+    def collections(self) -> dict[str, Callable[[], Iterator[dict]]]:
+        """Generator of every collection, referenced collections first."""
+        return {
+            "books": self.books,
+            "bookstores": self.bookstores,
+            "book_inventories": self.book_inventories,
+            "clients": self.clients,
+            "borrowings": self.borrowings,
+            "sales": self.sales,
+        }
+
+
+async def _batches(documents: Iterator[dict], batch_size: int) -> AsyncIterator[list[dict]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+            await asyncio.sleep(0)  # let the inserts in flight make progress
+    if batch:
+        yield batch
+
+
+async def insert_dataset(
+    database,
+    spec: DatasetSpec,
+    collections: Optional[list[str]] = None,
+    batch_size: int = 5000,
+    concurrency: int = 4,
+) -> dict[str, dict]:
+    """
+    Generate `spec` (or only `collections` of it) into `database`.
+
+    At most `concurrency` batches are in flight. Returns documents, seconds
+    and documents per second by collection.
+    """
+    dataset = Dataset(spec)
+    report = {}
+    for name, generate in dataset.collections().items():
+        if collections is not None and name not in collections:
+            continue
+        started = time.perf_counter()
+        count = 0
+        in_flight: set[asyncio.Task] = set()
+        async for batch in _batches(generate(), batch_size):
+            if len(in_flight) >= concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()  # surface write errors right away
+            in_flight.add(asyncio.create_task(database[name].insert_many(batch, ordered=False)))
+            count += len(batch)
+        if in_flight:
+            for task in await asyncio.gather(*in_flight, return_exceptions=True):
+                if isinstance(task, Exception):
+                    raise task
+
+        seconds = time.perf_counter() - started
+        report[name] = {"documents": count, "seconds": round(seconds, 2), "per_second": round(count / max(seconds, 1e-9))}
+        logger.info(f"Generated {count} {name}", extra=report[name])
+    return report
@@ -0,0 +1,59 @@
+from pydantic import BeforeValidator
+from typing import Annotated, Any
+import re
+
+# What a canonical ISBN looks like once stored
+ISBN13_PATTERN = "^97[89][0-9]{10}$"
+
+_SEPARATORS = re.compile(r"[\s-]")
+
+
+def isbn13_check_digit(first12: str) -> str:
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def isbn10_check_digit(first9: str) -> str:
+    total = sum(int(digit) * (10 - position) for position, digit in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def complete_isbn13(first12: str) -> str:
+    """ISBN-13 from its first 12 digits."""
+    return first12 + isbn13_check_digit(first12)
+
+
+def normalize_isbn(value: str | int) -> str:
+    """
+    Canonical form of an ISBN: the 13 digits of its ISBN-13.
+
+    Accepts ISBN-10 (with an 'X' check digit) and ISBN-13, with or without
+    hyphens or spaces, and integers as stored by older inventory documents.
+
+    Raises: ValueError if it is not a valid ISBN, check digit included
+    """
+    if isinstance(value, int):
+        # ints lose the leading zeros of ISBN-10s
+        value = str(value).zfill(10) if value < 10**10 else str(value)
+    isbn = _SEPARATORS.sub("", value).upper()
+
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == "X"):
+        if isbn10_check_digit(isbn[:9]) != isbn[9]:
+            raise ValueError(f"invalid ISBN-10 check digit in {value!r}")
+        return complete_isbn13("978" + isbn[:9])
+
+    if len(isbn) == 13 and isbn.isdigit() and isbn[:3] in ("978", "979"):
+        if isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise ValueError(f"invalid ISBN-13 check digit in {value!r}")
+        return isbn
+
+    raise ValueError(f"{value!r} is not an ISBN-10 or ISBN-13")
+
+
+def _normalize(value: Any) -> Any:
+    return normalize_isbn(value) if isinstance(value, (str, int)) else value
+
+
+# ISBN field of a model: validated and stored as the canonical ISBN-13
+Isbn = Annotated[str, BeforeValidator(_normalize)]
@@ -0,0 +1,146 @@
+from fastapi import HTTPException, Query, Response
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorCursor
+from bson import ObjectId, json_util
+from bson.errors import BSONError
+from typing import Any, Optional
+from enum import Enum
+import base64
+import binascii
+
+
+def encode_cursor(last_id: ObjectId, sort_value: Any = None) -> str:
+    """
+    Build an opaque cursor that bookmarks the last document of a page.
+
+    The cursor carries the document `_id` and, when a page is ordered by
+    another field, that field's value so the next page can resume from it.
+    """
+    payload = json_util.dumps({"i": last_id, "k": sort_value})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[ObjectId, Any]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Raises: HTTPException: 400 status if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["i"]
+    except (binascii.Error, ValueError, TypeError, KeyError, BSONError):
+        # ValueError covers bad JSON and UTF-8 and a bad $date, BSONError e.g. a bad $oid
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(last_id, ObjectId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id, payload.get("k")
+
+
+def keyset_filter(cursor: Optional[str], sort_field: str = "_id", descending: bool = False) -> dict:
+    """
+    Translate a cursor into a query filter that starts right after it.
+
+    Pages are ordered by `(sort_field, _id)` so ties on the sort key are
+    broken by `_id`, which keeps every page an index seek instead of a skip.
+    Documents without the sort field sort as null: first ascending, last
+    descending.
+    """
+    if not cursor:
+        return {}
+
+    last_id, last_value = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    if sort_field == "_id":
+        return {"_id": {op: last_id}}
+
+    # $gt/$lt never match null, the documents on the other side of the nulls are added explicitly
+    if last_value is None:
+        after_nulls = [] if descending else [{sort_field: {"$ne": None}}]
+        return {"$or": [{sort_field: None, "_id": {op: last_id}}, *after_nulls]}
+
+    return {"$or": [
+        {sort_field: {op: last_value}},
+        {sort_field: last_value, "_id": {op: last_id}},
+        *([{sort_field: None}] if descending else []),
+    ]}
+
+
+def keyset_sort(sort_field: str = "_id", descending: bool = False) -> list[tuple[str, int]]:
+    """Sort specification matching `keyset_filter`."""
+    direction = -1 if descending else 1
+    if sort_field == "_id":
+        return [("_id", direction)]
+    return [(sort_field, direction), ("_id", direction)]
+
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class Page:
+    """
+    Keyset page over a collection, ordered by `(sort_field, _id)`.
+
+    Built by the `paginate` dependency so every list endpoint shares the same
+    `limit`/`cursor`/`order` contract and the same limit caps.
+    """
+
+    def __init__(self, sort_field: str, limit: Optional[int], cursor: Optional[str], order: SortOrder):
+        self.sort_field = sort_field
+        self.limit = limit
+        self.cursor = cursor
+        self.descending = order == SortOrder.DESC
+
+    def find(self, collection: AsyncIOMotorCollection, query: dict, projection: Optional[dict] = None) -> AsyncIOMotorCursor:
+        """Query `collection` for this page, resuming after the cursor."""
+        keyset = keyset_filter(self.cursor, self.sort_field, self.descending)
+        if keyset:
+            query = {"$and": [query, keyset]} if query else keyset
+        if projection:
+            # the next cursor is built from the sort key of the last document
+            projection = {**projection, self.sort_field: 1}
+
+        documents = collection.find(query, projection).sort(keyset_sort(self.sort_field, self.descending))
+        if self.limit is not None:
+            documents = documents.limit(self.limit)
+        return documents
+
+    async def fetch(self, documents: AsyncIOMotorCursor, response: Response) -> list[dict]:
+        """Load the page and advertise the next cursor in a response header."""
+        limit = self.limit or DEFAULT_PAGE_LIMIT
+
+        # fetch one extra document to know whether another page exists
+        page = await documents.limit(limit + 1).to_list(limit + 1)
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            sort_value = None if self.sort_field == "_id" else last.get(self.sort_field)
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["_id"], sort_value)
+        return page
+
+
+def paginate(sort_field: str = "_id", default_order: SortOrder = SortOrder.ASC):
+    """
+    Dependency factory for paginated list endpoints.
+
+    The returned dependency reads `limit`, `cursor` and `order` from the query
+    string. JSON responses default to `DEFAULT_PAGE_LIMIT` rows, NDJSON
+    streams run to the end of the result unless a `limit` is given.
+    """
+    def dependency(
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description=f"Page size, defaults to {DEFAULT_PAGE_LIMIT}"),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+        order: SortOrder = Query(default_order, description=f"Sort direction on {sort_field}"),
+    ) -> Page:
+        return Page(sort_field, limit, cursor, order)
+
+    return dependency
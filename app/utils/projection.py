@@ -0,0 +1,72 @@
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from typing import Optional
+
+from .codec import read_codec
+
+
+def field_aliases(model: type[BaseModel]) -> dict[str, str]:
+    """Names accepted in `fields=` mapped to the stored field name ("id" and "_id" both mean "_id")."""
+    aliases = {}
+    for name, info in model.model_fields.items():
+        stored = info.alias or name
+        aliases[name] = stored
+        aliases[stored] = stored
+    return aliases
+
+
+class FieldSelection:
+    """
+    The fields a client asked for with `fields=`, or the whole model when it did not.
+
+    Gives the Mongo projection to fetch only those fields and the codec that
+    renders the documents with exactly them.
+    """
+
+    def __init__(self, model: type[BaseModel], fields: Optional[tuple[str, ...]] = None):
+        self.fields = fields
+        self.partial = fields is not None
+        self.codec = read_codec(model, fields)
+
+    @property
+    def projection(self) -> Optional[dict]:
+        if not self.partial:
+            return None
+        # Mongo always returns _id unless excluded, the cursors need it anyway
+        return {field: 1 for field in self.fields}
+
+    def dump(self, document: dict) -> dict:
+        """JSON-ready dict of the selected fields of a document."""
+        return self.codec.row(document)
+
+    def response(self, documents: dict | list[dict], response: Optional[Response] = None) -> ORJSONResponse:
+        """Render one document or a list of them with the selected fields."""
+        return self.codec.response(documents, response)
+
+
+def select_fields(model: type[BaseModel]):
+    """
+    Dependency factory for the `fields` query parameter of read endpoints.
+
+    `fields=_id,title,price` returns only those fields, fetched with a Mongo
+    projection. Unknown fields are rejected with a 400.
+    """
+    aliases = field_aliases(model)
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. _id,title. All fields by default"),
+    ) -> FieldSelection:
+        if not fields:
+            return FieldSelection(model)
+
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in aliases]
+        if unknown or not names:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown) or fields}. Available: {', '.join(sorted(set(aliases.values())))}"
+            )
+        return FieldSelection(model, tuple(sorted({aliases[name] for name in names})))
+
+    return dependency
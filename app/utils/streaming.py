@@ -0,0 +1,50 @@
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCursor
+from typing import AsyncIterator, Awaitable, Callable, Optional
+import orjson
+
+from .codec import ReadCodec
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents fetched from Mongo and flushed to the client per chunk
+STREAM_BATCH_SIZE = 500
+
+Expand = Callable[[list[dict], list[dict]], Awaitable[None]]
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for a newline-delimited JSON stream."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _ndjson_rows(cursor: AsyncIOMotorCursor, codec: ReadCodec, expand: Optional[Expand]) -> AsyncIterator[bytes]:
+    documents = []
+    async for document in cursor.batch_size(STREAM_BATCH_SIZE):
+        documents.append(document)
+        if len(documents) >= STREAM_BATCH_SIZE:
+            yield await _ndjson_chunk(documents, codec, expand)
+            documents = []
+
+    if documents:
+        yield await _ndjson_chunk(documents, codec, expand)
+
+
+async def _ndjson_chunk(documents: list[dict], codec: ReadCodec, expand: Optional[Expand]) -> bytes:
+    rows = codec.rows(documents)
+    if expand is not None:
+        await expand(documents, rows)
+    return b"\n".join(orjson.dumps(row) for row in rows) + b"\n"
+
+
+def stream_ndjson(cursor: AsyncIOMotorCursor, codec: ReadCodec, expand: Optional[Expand] = None) -> StreamingResponse:
+    """
+    Stream a Motor cursor as one JSON document per line.
+
+    Only one batch of documents is held in memory at a time, so the response
+    size no longer bounds worker memory and the first rows go out as soon as
+    Mongo returns them. `expand(documents, rows)` can add data to the rows
+    of each batch, e.g. referenced documents fetched for the whole batch.
+    """
+    return StreamingResponse(_ndjson_rows(cursor, codec, expand), media_type=NDJSON_MEDIA_TYPE)
@@ -1,7 +1,9 @@
 from fastapi import HTTPException
 from bson import ObjectId
 from bson.errors import InvalidId
-import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def validate_object_id(id_str: str, entity_name: str = "object") -> ObjectId:
@@ -17,43 +19,30 @@ def validate_object_id(id_str: str, entity_name: str = "object") -> ObjectId:
             status_code=400, 
             detail=f"Invalid {entity_name} ID format"
         )
-    
 
-async def populate_db_with_books():
-    """Populate the database with 30 sample books."""
+
+def validate_object_ids(ids: str, entity_name: str = "object", max_ids: int = 100) -> list[ObjectId]:
+    """
+    Validate a comma-separated list of IDs, keeping their order and dropping repeats.
+
+    Raises: HTTPException: 400 status if an ID is invalid or there are more than `max_ids`
+    """
+    object_ids = list(dict.fromkeys(validate_object_id(id_str.strip(), entity_name) for id_str in ids.split(",") if id_str.strip()))
+    if not object_ids:
+        raise HTTPException(status_code=400, detail=f"No {entity_name} IDs given")
+    if len(object_ids) > max_ids:
+        raise HTTPException(status_code=400, detail=f"At most {max_ids} {entity_name} IDs per request")
+    return object_ids
+
+
+async def seed_db():
+    """Replace the database contents with the sample data and generated books to page through."""
     from ..db import db
-    from ..models.book import BookCondition
-    
-    base_titles = ["The Art of", "Introduction to", "Mastering", "Guide to", "Secrets of"]
-    subjects = ["Python", "JavaScript", "Data Science", "Machine Learning", "Web Design", "Cooking"]
-    authors = ["Smith", "Johnson", "Garcia", "Brown", "Davis", "Wilson"]
-    genres = ["Technology", "Science", "Fiction", "Non-Fiction", "Education", "Biography"]
-    
-    books = []
-    for i in range(30):
-        # Generate varied ISBN (simplified)
-        isbn = f"978{random.randint(1000000000, 9999999999)}"
-        
-        # Combine random elements for variety
-        title = f"{random.choice(base_titles)} {random.choice(subjects)}"
-        if i % 3 == 0:  # Add some variation
-            title += f" Volume {(i // 3) + 1}"
-            
-        author = f"{random.choice(['John', 'Jane', 'Mike', 'Sarah', 'David'])} {random.choice(authors)}"
-        
-        book_data = {
-            "isbn": isbn,
-            "title": title,
-            "author": author,
-            "genre": random.choice(genres),
-            "price": round(random.uniform(15.99, 89.99), 2),
-            "condition": random.choice(list(BookCondition))
-        }
-        books.append(book_data)
-    
-    # Insert all books
-    await db.books.insert_many(books)
-    print(f"Added {len(books)} books to the database")
+    from .datagen import DatasetSpec, insert_dataset
+
+    await populate_db()
+    report = await insert_dataset(db, DatasetSpec(books=30), collections=["books"])
+    logger.info(f"Added {report['books']['documents']} generated books to the database")
 
 def generate_data():
     """Generates sample data."""
@@ -155,19 +144,19 @@ def generate_data():
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[0]["isbn"]),  # 1984
+            "isbn": books[0]["isbn"],  # 1984
             "quantity_available": 3
         },
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[1]["isbn"]),  # To Kill a Mockingbird
+            "isbn": books[1]["isbn"],  # To Kill a Mockingbird
             "quantity_available": 2
         },
         {
             "_id": ObjectId(),
             "bookstore_id": bookstore_id,
-            "isbn": int(books[4]["isbn"]),  # Where the Crawdads Sing
+            "isbn": books[4]["isbn"],  # Where the Crawdads Sing
             "quantity_available": 5
         }
     ]
@@ -268,23 +257,24 @@ async def populate_db():
 
     data = generate_data()
 
-    print("Inserting sample data into the database...")
+    logger.info("Inserting sample data into the database...")
     
     # Insert data into respective collections
     await db.books.insert_many(data["books"])
     await db.clients.insert_many(data["clients"])
     await db.bookstores.insert_one(data["bookstore"])
-    await db.book_inventory.insert_many(data["book_inventory"])
+    await db.book_inventories.insert_many(data["book_inventory"])
     await db.borrowings.insert_many(data["borrowings"])
     await db.sales.insert_many(data["sales"])
     
-    print("Sample data inserted successfully!")
-    print(f"Created: {len(data['books'])} books, {len(data['clients'])} clients, "
-          f"1 bookstore, {len(data['borrowings'])} borrowings, {len(data['sales'])} sales")
+    logger.info("Sample data inserted successfully!")
+    logger.info(f"Created: {len(data['books'])} books, {len(data['clients'])} clients, "
+                f"1 bookstore, {len(data['borrowings'])} borrowings, {len(data['sales'])} sales")
     
 async def clear_db():
     """Drop everything in the database."""
-    from ..db import db
-    print("Clearing database...")
-    await db.client.drop_database("bookstore")
-    print("Database cleared successfully!")
\ No newline at end of file
+    from ..config import settings
+    from ..db import client
+    logger.info("Clearing database...")
+    await client.drop_database(settings.mongodb_database)
+    logger.info("Database cleared successfully!")
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Throughput against p99 latency of creates, with and without group commit.
+
+Fires `--requests` POST /borrowings/ (or POST /sales/ with --endpoint sales)
+at each `--concurrency`, first with one insert_one per request, then with
+group commit at each `--max-wait-ms`. Sales run without transactions in
+every case so the only difference is how the insert is written. A
+standalone local mongod is enough:
+
+    mongod --dbpath /tmp/bench
+    python -m benchmarks.group_commit --requests 5000 --concurrency 16 64 256 --max-wait-ms 1 2 5
+
+Uses the `--database` database (default bookstore_group_commit), dropped
+before every case and at the end, never the configured application database.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from bson import ObjectId
+
+from app.config import settings
+from app.db import client, db
+from app.main import app
+from app.services.inventory import stripe_stock
+from app.services.write_buffer import WRITE_BUFFERS
+
+ISBN = "9780000000002"
+
+
+async def setup(endpoint: str, requests: int) -> dict:
+    """Payload of one create, with the book and stock a sale needs."""
+    bookstore_id = ObjectId()
+    if endpoint == "borrowings":
+        due_date = (datetime.now() + timedelta(days=14)).isoformat()
+        return {
+            "borrower_id": str(ObjectId()), "source_type": "bookstore", "source_id": str(bookstore_id),
+            "book_id": str(ObjectId()), "due_date": due_date,
+        }
+
+    book_id = (await db.books.insert_one({
+        "isbn": ISBN, "title": "Rush Item", "author": "Benchmark", "price": 10.0, "condition": "New"
+    })).inserted_id
+    await db.book_inventories.insert_one({"bookstore_id": bookstore_id, "isbn": ISBN, "quantity_available": requests})
+    await stripe_stock(bookstore_id, ISBN, settings.inventory_stripe_slots)  # keep stock contention out of the way
+    return {"client_id": str(ObjectId()), "book_id": str(book_id), "bookstore_id": str(bookstore_id), "amount": 10.0}
+
+
+async def run_case(endpoint: str, requests: int, concurrency: int, max_wait_ms: float | None) -> dict:
+    settings.group_commit_enabled = max_wait_ms is not None
+    settings.group_commit_max_wait_ms = max_wait_ms or 0
+    await client.drop_database(settings.mongodb_database)
+    payload = await setup(endpoint, requests)
+    before = WRITE_BUFFERS[endpoint].stats()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses: dict[int, int] = {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        async def create():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await http.post(f"/{endpoint}/", json=payload)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(create() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    after = WRITE_BUFFERS[endpoint].stats()
+    batches = after["batches"] - before["batches"]
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "group_commit": settings.group_commit_enabled,
+        "max_wait_ms": max_wait_ms,
+        "concurrency": concurrency,
+        "throughput_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "avg_batch": round((after["inserts"] - before["inserts"]) / batches, 1) if batches else None,
+        "statuses": statuses,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    # the client is created on first use, so this is still in time for it
+    settings.mongodb_database = args.database
+    settings.sale_transactions = False
+    settings.group_commit_max_batch = args.max_batch
+    try:
+        for concurrency in args.concurrency:
+            for max_wait_ms in [None, *args.max_wait_ms]:
+                print(json.dumps(await run_case(args.endpoint, args.requests, concurrency, max_wait_ms)))
+    finally:
+        await client.drop_database(settings.mongodb_database)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="bookstore_group_commit", help="scratch database, dropped")
+    parser.add_argument("--endpoint", choices=["borrowings", "sales"], default="borrowings")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[1, 2, 5])
+    parser.add_argument("--max-batch", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""
+Throughput of concurrent purchases of a single hot SKU.
+
+Every case stocks one book in one bookstore with exactly as many copies as
+sales are attempted, stripes that stock across `--slots` documents and fires
+the sales through POST /sales/ at the given concurrency. Needs a local
+mongod started as a replica set (transactions), e.g.:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+    MONGODB_URL="mongodb://localhost:27017/?replicaSet=rs0" \\
+        python -m benchmarks.hot_sku --sales 2000 --concurrency 64 --slots 1 8
+
+Uses the `--database` database (default bookstore_hot_sku), dropped before
+every case and at the end, never the configured application database.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from bson import ObjectId
+
+from app.config import settings
+from app.db import client, db
+from app.main import app
+from app.services.inventory import stripe_stock
+
+ISBN = "9780000000002"
+
+
+async def run_case(slots: int, sales: int, concurrency: int) -> dict:
+    await client.drop_database(settings.mongodb_database)
+    book_id = (await db.books.insert_one({
+        "isbn": ISBN, "title": "Hot Item", "author": "Benchmark", "price": 10.0, "condition": "New"
+    })).inserted_id
+    bookstore_id = ObjectId()
+    await db.book_inventories.insert_one({"bookstore_id": bookstore_id, "isbn": ISBN, "quantity_available": sales})
+    await stripe_stock(bookstore_id, ISBN, slots)
+
+    sale = {"client_id": str(ObjectId()), "book_id": str(book_id), "bookstore_id": str(bookstore_id), "amount": 10.0}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses: dict[int, int] = {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        async def buy():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await http.post("/sales/", json=sale)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(buy() for _ in range(sales)))
+        elapsed = time.perf_counter() - started
+
+    remaining = await db.book_inventories.aggregate([
+        {"$match": {"bookstore_id": bookstore_id}},
+        {"$group": {"_id": None, "quantity": {"$sum": "$quantity_available"}}},
+    ]).to_list(1)
+
+    latencies.sort()
+    return {
+        "slots": slots,
+        "sales": sales,
+        "concurrency": concurrency,
+        "throughput_per_s": round(sales / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "statuses": statuses,
+        "stock_left": remaining[0]["quantity"] if remaining else 0,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    # the client is created on first use, so this is still in time for it
+    settings.mongodb_database = args.database
+    try:
+        for slots in args.slots:
+            print(json.dumps(await run_case(slots, args.sales, args.concurrency)))
+    finally:
+        await client.drop_database(settings.mongodb_database)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="bookstore_hot_sku", help="scratch database, dropped")
+    parser.add_argument("--sales", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--slots", type=int, nargs="+", default=[1, 8])
+    asyncio.run(main(parser.parse_args()))
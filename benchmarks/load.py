@@ -0,0 +1,253 @@
+"""
+In-process load test of the API against a local mongod.
+
+Seeds a generated dataset in bulk, then drives every router (books,
+clients, bookstores, borrowings, sales) through an ASGI httpx client at a
+fixed concurrency, one scenario at a time, and reports throughput and
+p50/p95/p99 latency per endpoint. Results are written as JSON so runs on
+two commits can be compared:
+
+    mongod --dbpath /tmp/load
+    python -m benchmarks.load --books 1000000 --clients 100000 --borrowings 5000000 --sales 5000000 \\
+        --output load-main.json
+    # on the branch, reusing the dataset
+    python -m benchmarks.load --skip-seed --output load-branch.json --compare load-main.json
+
+Uses the `--database` database (default bookstore_load), dropped before
+seeding unless --skip-seed. The dataset comes from app.utils.datagen, the
+generator behind `python -m app.manage generate`, with a fixed end date so
+the same flags always seed the same documents. Sales compensate the stock
+decrement instead of using a transaction unless --sale-transactions, so a
+standalone mongod is enough.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Optional
+
+import httpx
+
+from app.config import settings
+from app.db import client, db
+from app.indexes import ensure_indexes
+from app.main import app
+from app.services.search import prefix_index
+from app.utils.auth import create_access_token
+from app.utils.datagen import (
+    BOOKS, BOOKSTORES, BORROWINGS, CLIENTS, SALES, Dataset, DatasetSpec, book_isbn, book_price, insert_dataset, object_id,
+)
+from app.utils.isbn import complete_isbn13
+
+# POST /books/ ISBNs are 979 + 3 digits of --run + 6 digits of the request number
+MAX_REQUESTS = 1_000_000
+
+
+def dataset_spec(args: argparse.Namespace) -> DatasetSpec:
+    # a fixed end date keeps the dataset the same across runs and commits; stock never runs out
+    return DatasetSpec(
+        books=args.books, clients=args.clients, bookstores=args.bookstores, stock_per_bookstore=args.stock_per_bookstore,
+        borrowings=args.borrowings, sales=args.sales, seed=args.seed, end=datetime(2025, 1, 1), min_stock=1_000_000,
+    )
+
+
+async def seed(args: argparse.Namespace) -> dict:
+    await client.drop_database(settings.mongodb_database)
+    report = await insert_dataset(db, dataset_spec(args), batch_size=args.batch_size)
+    for collection, stats in report.items():
+        print(json.dumps({"seeded": collection, **stats}), flush=True)
+
+    # indexes after the data, one build instead of per-insert maintenance
+    started = time.perf_counter()
+    await ensure_indexes(db)
+    report["indexes"] = {"seconds": round(time.perf_counter() - started, 2)}
+    return report
+
+
+# A scenario builds one request: (method, path, json body) from the request number and an rng
+Request = tuple[str, str, Optional[dict]]
+
+
+def scenarios(args: argparse.Namespace) -> dict[str, Callable[[int, random.Random], Request]]:
+    dataset = Dataset(dataset_spec(args))
+    book = lambda rng: object_id(BOOKS, rng.randrange(args.books))
+    a_client = lambda rng: object_id(CLIENTS, rng.randrange(args.clients))
+    bookstore = lambda rng: object_id(BOOKSTORES, rng.randrange(args.bookstores))
+    due_date = (datetime.now() + timedelta(days=14)).isoformat()
+    # search terms taken from the generated titles
+    words = sorted({word for book_data in islice(dataset.books(), 1000) for word in book_data["title"].split()})
+
+    def sale(n: int, rng: random.Random) -> Request:
+        store = rng.randrange(args.bookstores)
+        index = dataset.stocked_book(store, rng.randrange(dataset.stock))
+        return "POST", "/sales/", {
+            "client_id": str(a_client(rng)), "book_id": str(object_id(BOOKS, index)),
+            "bookstore_id": str(object_id(BOOKSTORES, store)), "amount": book_price(index),
+        }
+
+    return {
+        "GET /books/{id}": lambda n, rng: ("GET", f"/books/{book(rng)}", None),
+        "GET /books/": lambda n, rng: ("GET", "/books/?limit=50", None),
+        "GET /books/isbn/{isbn}": lambda n, rng: ("GET", f"/books/isbn/{book_isbn(rng.randrange(args.books))}", None),
+        "GET /books/search": lambda n, rng: ("GET", f"/books/search?q={rng.choice(words)}", None),
+        "POST /books/": lambda n, rng: ("POST", "/books/", {
+            "isbn": complete_isbn13(f"979{args.run % 1000:03d}{n:06d}"), "title": "Load Test", "author": "Bench", "price": 9.99,
+        }),
+        "GET /clients/{id}": lambda n, rng: ("GET", f"/clients/{a_client(rng)}", None),
+        "GET /clients/?ids=": lambda n, rng: ("GET", "/clients/?ids=" + ",".join(str(a_client(rng)) for _ in range(20)), None),
+        "POST /clients/": lambda n, rng: ("POST", "/clients/", {
+            "first_name": "Load", "last_name": "Test", "email": f"load{args.run}-{n}@example.com",
+        }),
+        "GET /bookstores/{id}": lambda n, rng: ("GET", f"/bookstores/{bookstore(rng)}", None),
+        "GET /bookstores/{id}/inventory": lambda n, rng: ("GET", f"/bookstores/{bookstore(rng)}/inventory?limit=50", None),
+        "GET /borrowings/{id}": lambda n, rng: ("GET", f"/borrowings/{object_id(BORROWINGS, rng.randrange(args.borrowings))}", None),
+        "GET /borrowings/?expand=book": lambda n, rng: ("GET", "/borrowings/?limit=50&expand=book", None),
+        "GET /borrowings/client/{id}": lambda n, rng: ("GET", f"/borrowings/client/{a_client(rng)}?limit=50", None),
+        "POST /borrowings/": lambda n, rng: ("POST", "/borrowings/", {
+            "borrower_id": str(a_client(rng)), "source_type": "bookstore", "source_id": str(bookstore(rng)),
+            "book_id": str(book(rng)), "due_date": due_date,
+        }),
+        "GET /sales/{id}": lambda n, rng: ("GET", f"/sales/{object_id(SALES, rng.randrange(args.sales))}", None),
+        "GET /sales/bookstore/{id}": lambda n, rng: ("GET", f"/sales/bookstore/{bookstore(rng)}?limit=50", None),
+        "POST /sales/": sale,
+    }
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+
+async def run_scenario(http: httpx.AsyncClient, build: Callable[[int, random.Random], Request], args: argparse.Namespace,
+                       headers: dict) -> dict:
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+
+    async def call(n: int, record: bool) -> None:
+        method, path, body = build(n, rng)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.request(method, path, json=body, headers=headers)
+            elapsed = time.perf_counter() - started
+        if record:
+            latencies.append(elapsed)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    # request numbers keep created documents unique, warmup ones included
+    await asyncio.gather(*(call(n, False) for n in range(args.warmup)))
+    started = time.perf_counter()
+    await asyncio.gather(*(call(n, True) for n in range(args.warmup, args.warmup + args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Per-endpoint changes against a previous run, regressions beyond `threshold` flagged."""
+    lines = [f"{'endpoint':36} {'req/s':>10} {'Δ':>8} {'p99 ms':>10} {'Δ':>8}"]
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            lines.append(f"{name:36} {result['throughput_per_s']:>10} {'new':>8}")
+            continue
+        throughput = result["throughput_per_s"] / before["throughput_per_s"] - 1
+        p99 = result["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        flag = "  REGRESSION" if throughput < -threshold or p99 > threshold else ""
+        lines.append(
+            f"{name:36} {result['throughput_per_s']:>10} {throughput:>+8.1%} {result['p99_ms']:>10} {p99:>+8.1%}{flag}"
+        )
+    return lines
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> None:
+    # the client is created on first use, so this is still in time for it
+    settings.mongodb_database = args.database
+    settings.overdue_sweep_enabled = False
+    settings.sale_transactions = args.sale_transactions
+
+    try:
+        seeding = None if args.skip_seed else await seed(args)
+        await app.router.startup()  # httpx does not run the lifespan handlers, raises if startup fails
+        while settings.search_prefix_index and not prefix_index.ready:
+            await asyncio.sleep(0.5)
+
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'load-test'})}"}
+        wanted = scenarios(args)
+        if args.only:
+            wanted = {name: build for name, build in wanted.items() if any(part in name for part in args.only)}
+
+        results = {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load") as http:
+            for name, build in wanted.items():
+                results[name] = await run_scenario(http, build, args, headers)
+                print(json.dumps({"endpoint": name, **results[name]}), flush=True)
+
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "seeding": seeding,
+            "results": results,
+        }
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump(report, output, indent=2)
+        if args.compare:
+            with open(args.compare) as baseline:
+                print("\n".join(compare(report, json.load(baseline), args.threshold)))
+    finally:
+        await app.router.shutdown()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset = parser.add_argument_group("dataset")
+    dataset.add_argument("--database", default="bookstore_load")
+    dataset.add_argument("--books", type=int, default=100_000)
+    dataset.add_argument("--clients", type=int, default=10_000)
+    dataset.add_argument("--bookstores", type=int, default=100)
+    dataset.add_argument("--stock-per-bookstore", type=int, default=1000)
+    dataset.add_argument("--borrowings", type=int, default=500_000)
+    dataset.add_argument("--sales", type=int, default=500_000)
+    dataset.add_argument("--seed", type=int, default=42)
+    dataset.add_argument("--batch-size", type=int, default=10_000)
+    dataset.add_argument("--skip-seed", action="store_true", help="reuse the dataset of a previous run")
+    load = parser.add_argument_group("load")
+    load.add_argument("--requests", type=int, default=2000, help="per endpoint")
+    load.add_argument("--warmup", type=int, default=200, help="per endpoint, not measured")
+    load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--only", nargs="+", help="endpoints whose name contains any of these, e.g. books sales")
+    load.add_argument("--run", type=int, default=int(time.time()), help="keeps created ISBNs and emails unique across runs")
+    load.add_argument("--sale-transactions", action="store_true",
+                      help="sell in a transaction, needs a replica set; by default sales compensate instead")
+    results = parser.add_argument_group("results")
+    results.add_argument("--output", help="write the results as JSON")
+    results.add_argument("--compare", help="JSON results of a previous run to compare against")
+    results.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args()
+    if args.warmup + args.requests > MAX_REQUESTS:
+        parser.error(f"--warmup + --requests must be at most {MAX_REQUESTS:,}, created ISBNs would collide")
+    asyncio.run(main(args))
@@ -0,0 +1,142 @@
+"""
+Latency and relevance of book search on a generated catalog.
+
+Builds the in-process prefix index over `--books` generated books and runs
+autocomplete queries made of word prefixes taken from random catalog books.
+Reports build time, p50/p95/p99 query latency and the hit rate (how often
+the book a query was taken from is in the top `--limit` results).
+
+    python -m benchmarks.search --books 1000000
+
+With `--mongo` the catalog is also inserted into the `books` collection of
+the `--database` database on MONGODB_URL (default bookstore_search_bench,
+dropped first, never the configured application database) and the same
+queries are run as ranked $text searches against the book_text index.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from bson import ObjectId
+
+from app.services.search import PrefixIndex
+
+SYLLABLES = ["ka", "lo", "mi", "ran", "tel", "vor", "shi", "den", "qua", "bel", "zor", "nim", "ath", "pel", "ric", "oss"]
+GENRES = ["Fiction", "Mystery", "Fantasy", "Science", "History", "Biography", "Poetry", "Technology"]
+
+
+def generate_catalog(count: int, seed: int) -> list[dict]:
+    """Deterministic books whose titles and authors draw from a ~50k word vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = list({
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(60000)
+    })
+    return [
+        {
+            "_id": ObjectId(),
+            "title": " ".join(rng.choice(vocabulary).capitalize() for _ in range(rng.randint(1, 5))),
+            "author": f"{rng.choice(vocabulary).capitalize()} {rng.choice(vocabulary).capitalize()}",
+            "genre": rng.choice(GENRES),
+        }
+        for _ in range(count)
+    ]
+
+
+def generate_queries(catalog: list[dict], count: int, seed: int) -> list[tuple[str, str]]:
+    """(query, source book id) pairs: prefixes of one or two words of a random book."""
+    rng = random.Random(seed + 1)
+    queries = []
+    for book in rng.sample(catalog, count):
+        words = (book["title"] + " " + book["author"]).split()
+        picked = rng.sample(words, min(len(words), rng.randint(1, 2)))
+        queries.append((" ".join(word[:rng.randint(3, len(word))] for word in picked), str(book["_id"])))
+    return queries
+
+
+def summarize(latencies: list[float], hits: int) -> dict:
+    latencies = sorted(latencies)
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+    return {
+        "queries": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "hit_rate": round(hits / len(latencies), 3),
+    }
+
+
+def bench_prefix(catalog: list[dict], queries: list[tuple[str, str]], limit: int) -> dict:
+    index = PrefixIndex()
+    started = time.perf_counter()
+    for start in range(0, len(catalog), 10000):
+        index._load(catalog[start:start + 10000])
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    hits = 0
+    for query, book_id in queries:
+        started = time.perf_counter()
+        results = index.search(query, limit)
+        latencies.append(time.perf_counter() - started)
+        hits += any(result.id == book_id for result in results)
+
+    return {"mode": "prefix", "build_seconds": round(build_seconds, 2), **summarize(latencies, hits)}
+
+
+async def bench_text(catalog: list[dict], queries: list[tuple[str, str]], limit: int, database: str) -> dict:
+    from app.config import settings
+    from app.db import client, db
+    from app.indexes import ensure_indexes
+    from app.services.search import search_books
+    from app.utils.isbn import complete_isbn13
+
+    # the client is created on first use, so this is still in time for it
+    settings.mongodb_database = database
+    try:
+        await client.drop_database(database)
+        for start in range(0, len(catalog), 10000):
+            await db.books.insert_many(
+                [
+                    {**book, "isbn": complete_isbn13(f"978{start + offset:09d}"), "price": 10.0}  # ISBNs are unique
+                    for offset, book in enumerate(catalog[start:start + 10000])
+                ],
+                ordered=False
+            )
+        await ensure_indexes(db)
+
+        latencies = []
+        hits = 0
+        for query, book_id in queries:
+            started = time.perf_counter()
+            results = await search_books(query, limit)
+            latencies.append(time.perf_counter() - started)
+            hits += any(result.id == book_id for result in results)
+        return {"mode": "text", **summarize(latencies, hits)}
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo", action="store_true", help="also benchmark $text search on MONGODB_URL")
+    parser.add_argument("--database", default="bookstore_search_bench", help="scratch database for --mongo, dropped first")
+    args = parser.parse_args()
+
+    catalog = generate_catalog(args.books, args.seed)
+    queries = generate_queries(catalog, args.queries, args.seed)
+
+    print(json.dumps(bench_prefix(catalog, queries, args.limit)))
+    if args.mongo:
+        print(json.dumps(asyncio.run(bench_text(catalog, queries, args.limit, args.database))))
+
+
+if __name__ == "__main__":
+    main()